@@ -16,9 +16,17 @@
 # along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from .gemproxy import GemObject, GemstoneSession, GemstoneError, InvalidSession, NotSupported, GemstoneApiError, GemstoneWarning
+from .gemproxy import GemObject, ImmediateGemObject, PersistentReference, GemstoneSession, GemstoneError, GemstoneTimeout, InvalidSession, NotSupported, GemstoneApiError, ResultTooLarge, GemstoneWarning
 from .gemproxylinked import LinkedSession
 from .gemproxyrpc import RPCSession
+from .sessionpool import SessionPool, PoolExhausted
+from .asyncrpc import AsyncRPCSession, AsyncGemObject
+from .executor import GemExecutor
+from .linkedpool import LinkedWorkerPool, WorkerError
+from .abortscheduler import AbortScheduler
+from .standby import WarmStandby
 
-__all__ = ['GemObject', 'GemstoneSession', 'LinkedSession', 'RPCSession', 'GemstoneError', 'InvalidSession', 'NotSupported', 'GemstoneApiError', 'GemstoneWarning',
+__all__ = ['GemObject', 'ImmediateGemObject', 'PersistentReference', 'GemstoneSession', 'LinkedSession', 'RPCSession', 'GemstoneError', 'GemstoneTimeout', 'InvalidSession', 'NotSupported', 'GemstoneApiError', 'ResultTooLarge', 'GemstoneWarning',
+           'SessionPool', 'PoolExhausted', 'AsyncRPCSession', 'AsyncGemObject', 'GemExecutor',
+           'LinkedWorkerPool', 'WorkerError', 'AbortScheduler', 'WarmStandby',
            'gemstonecontrol']
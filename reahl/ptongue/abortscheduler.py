@@ -0,0 +1,186 @@
+# Copyright (C) 2025 Reahl Software Services (Pty) Ltd
+# 
+# This file is part of parseltongue.
+#
+# parseltongue is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# parseltongue is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Aborting long-lived sessions
+============================
+
+A session sees the repository as it was when it last aborted or committed. While
+it keeps that view, the stone has to keep the commit records made since, and a
+growing commit record backlog slows down the whole system. Sessions that mostly
+read, or sit idle in a :class:`~reahl.ptongue.SessionPool`, are easily forgotten.
+
+An :class:`AbortScheduler` aborts such sessions regularly in a thread of its own::
+
+    scheduler = AbortScheduler(interval=30)
+    scheduler.add_pool(pool)
+    scheduler.add(reporting_session)
+    scheduler.add_hook(lambda session: cache.clear())
+    with scheduler:
+        ...
+
+By default, abort passes are only done on the timer. The scheduler does not listen for
+the stone's own signals that a session should abort (SignalAbort, and LostOtRoot when a
+session did not abort in time): those only reach a session that has enabled them (for
+example with `System enableSignaledAbortError`), as errors raised by whichever call it
+makes next. An application that enables them should call :meth:`AbortScheduler.notify`
+where it catches such errors, to have all its sessions aborted right away::
+
+    try:
+        session.execute('...')
+    except GemstoneError as error:
+        if is_signal_to_abort(error):  # however the application recognises these
+            scheduler.notify()
+        raise
+"""
+
+import threading
+import time
+import warnings
+import weakref
+
+from .gemproxy import GemstoneError, GemstoneWarning, InvalidSession
+
+
+class AbortScheduler:
+    """Aborts the sessions (and idle pooled sessions) added to it, every interval seconds.
+
+    A session is only aborted once it has not been used for idle_time seconds, and while no
+    thread is busy with a call to it. A session with changes that are not committed yet
+    (`System needsCommit`) is left alone, so that no work is lost; a session in a transaction
+    without such changes (as sessions in automatic transaction mode, the default, always are)
+    is aborted. Code that needs the same view of the repository for a number of calls should
+    hold the lock of its session (`session.lock`) for their duration.
+
+    Sessions are held weakly: a session that is not referenced elsewhere is not kept alive
+    by the scheduler.
+
+    :param interval: The number of seconds between abort passes.
+    :param idle_time: The number of seconds a session must have been unused to be aborted,
+                      defaults to interval.
+    """
+    def __init__(self, interval=60, idle_time=None):
+        self.interval = interval
+        self.idle_time = interval if idle_time is None else idle_time
+        self.sessions = weakref.WeakSet()
+        self.pools = weakref.WeakSet()
+        self.hooks = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.is_stopped = False
+        self.thread = None
+
+    def add(self, session):
+        """Abort session regularly."""
+        with self.lock:
+            self.sessions.add(session)
+
+    def remove(self, session):
+        with self.lock:
+            self.sessions.discard(session)
+
+    def add_pool(self, pool):
+        """Abort the sessions that are idle in pool regularly (see :meth:`~reahl.ptongue.SessionPool.abort_idle_sessions`)."""
+        with self.lock:
+            self.pools.add(pool)
+
+    def remove_pool(self, pool):
+        with self.lock:
+            self.pools.discard(pool)
+
+    def add_hook(self, hook):
+        """Call hook(session) after each session aborted by this scheduler, for example to invalidate
+        Python caches of what was read using that session.
+
+        Hooks are called in the thread of the scheduler.
+        """
+        with self.lock:
+            self.hooks.append(hook)
+
+    def start(self):
+        """Start doing abort passes in a (daemon) thread."""
+        self.is_stopped = False
+        self.wakeup.clear()
+        self.thread = threading.Thread(target=self.run, name='AbortScheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the thread started by :meth:`start`, and wait for it to finish."""
+        self.is_stopped = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def notify(self):
+        """Do an abort pass right away instead of at the end of the current interval, for example
+        because the stone signalled a commit record backlog. This may be called from any thread
+        or from a signal handler.
+
+        Nothing calls this by itself: an application that enables the stone's signals to abort
+        has to call it where it notices them (see the module documentation).
+        """
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if self.is_stopped:
+                break
+            try:
+                self.abort_sessions()
+            except Exception as ex:
+                warnings.warn('Abort pass failed: %s' % ex, GemstoneWarning)
+
+    def abort_sessions(self):
+        """Do an abort pass in the calling thread.
+
+        :return: A list of the sessions that were aborted (and are still usable).
+        """
+        with self.lock:
+            sessions = list(self.sessions)
+            pools = list(self.pools)
+            hooks = list(self.hooks)
+        aborted = [session for pool in pools for session in pool.abort_idle_sessions(idle_time=self.idle_time)]
+        aborted.extend(session for session in sessions if self.abort_if_idle(session))
+        for session in aborted:
+            for hook in hooks:
+                hook(session)
+        return aborted
+
+    def abort_if_idle(self, session):
+        if not session.lock.acquire(blocking=False):
+            return False
+        try:
+            if time.monotonic() - session.last_activity < self.idle_time or not session.is_logged_in:
+                return False
+            if session.execute('System needsCommit').to_py:
+                return False
+            session.abort()
+            return True
+        except (GemstoneError, InvalidSession) as ex:
+            warnings.warn('Could not abort %r: %s' % (session, ex), GemstoneWarning)
+            return False
+        finally:
+            session.lock.release()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,333 @@
+# Copyright (C) 2025 Reahl Software Services (Pty) Ltd
+# 
+# This file is part of parseltongue.
+#
+# parseltongue is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# parseltongue is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Asynchronous RPC sessions
+=========================
+
+An :class:`AsyncRPCSession` lets asyncio code execute Smalltalk and send messages
+without blocking the event loop while the Gem is busy::
+
+    session = await AsyncRPCSession.log_in('DataCurator', 'swordfish')
+    today = await session.execute('Date today')
+    print(await (await today.asString()).to_py)
+
+Executes and message sends are started with GemStone's non-blocking calls, after which
+the event loop waits for the session's socket to become readable, so other tasks run
+while the Gem is working. No threads are used for this.
+"""
+
+import asyncio
+import contextlib
+import ctypes
+import functools
+import time
+
+from .gemstone import *
+from .gemproxy import GemObject, ImmediateGemObject, GemstoneError, GemstoneApiError, \
+    map_selector, to_c_bytes, well_known_class_names
+from .gemproxyrpc import RPCSession
+
+
+class AsyncGemObject:
+    """Stands in for a GemObject of an :class:`AsyncRPCSession`.
+
+    Messages sent to an AsyncGemObject (spelt the same as with a :class:`~reahl.ptongue.GemObject`)
+    are sent asynchronously, and have to be awaited. So does its `to_py`::
+
+        customer = await session.UserGlobals.at('Customer')
+        name = await (await customer.name()).to_py
+
+    :param session: The AsyncRPCSession this object belongs to.
+    :param gem_object: The GemObject (of the underlying RPCSession) it stands in for.
+    """
+    __slots__ = ('session', 'gem_object')
+
+    def __init__(self, session, gem_object):
+        self.session = session
+        self.gem_object = gem_object
+
+    @property
+    def oop(self):
+        return self.gem_object.oop
+
+    @property
+    def is_nil(self):
+        return self.gem_object.is_nil
+
+    @property
+    def to_py(self):
+        """An awaitable for the Python object corresponding to this object (see :attr:`GemObject.to_py`)."""
+        return self.session.object_to_py(self.gem_object)
+
+    def __getattr__(self, name):
+        return functools.partial(self.perform_mapped_selector, name)
+
+    async def perform_mapped_selector(self, selector, *args):
+        return await self.perform(map_selector(selector, args), *args)
+
+    async def perform(self, selector, *args):
+        """Send a message to this object, without blocking the event loop while it runs.
+
+        :param selector: The method selector, either as a Symbol or a string (spelt as in Smalltalk).
+        :param args: (Async)GemObject arguments to pass to the method. If not a GemObject,
+                     the object will be transformed using session.from_py()
+        :return: An AsyncGemObject for the result of the method call.
+        """
+        return await self.session.object_perform(self.gem_object, selector, *args)
+
+    async def __aiter__(self):
+        for element in await self.session.object_elements(self.gem_object):
+            yield element
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.oop)
+
+
+class AsyncRPCSession:
+    """An asyncio interface to an :class:`~reahl.ptongue.RPCSession`.
+
+    Only one execute or send can be in progress in a session at a time. Concurrent tasks
+    using the same AsyncRPCSession are served one after the other, so use a session per
+    task (see :class:`~reahl.ptongue.SessionPool`) to let Gems work concurrently.
+
+    Only :meth:`execute`, messages sent to :class:`AsyncGemObject` objects, and their
+    `to_py` run Smalltalk code in the Gem, and they do not block the event loop while it
+    runs. Some of what they do besides is done with short calls to the Gem that block (as
+    they do with an RPCSession): converting Python arguments to objects in the Gem, fetching
+    Strings and the elements of collections, and releasing dead objects from the export set.
+    Other methods, such as :meth:`resolve_symbol`, :meth:`commit` or :meth:`from_py`, are such
+    short, blocking calls too. They cannot be used while an asynchronous call is in progress in
+    the session.
+
+    While it is in use, the underlying RPCSession is claimed by holding its `lock`. It can
+    thus be shared with other threads, which take turns with the event loop.
+
+    If a task awaiting a result is cancelled, the running code is stopped with a hard break.
+
+    :param rpc_session: A logged-in RPCSession to use.
+    """
+    def __init__(self, rpc_session):
+        self.rpc_session = rpc_session
+        self.lock = asyncio.Lock()
+        self.socket = None
+
+    @classmethod
+    async def log_in(cls, *args, **kwargs):
+        """Create an AsyncRPCSession for a new RPCSession.
+
+        Logging in is done (once) in the event loop's default executor, since it cannot
+        be done without blocking.
+
+        :param args: Arguments for :class:`~reahl.ptongue.RPCSession`.
+        :param kwargs: Keyword arguments for :class:`~reahl.ptongue.RPCSession`.
+        """
+        loop = asyncio.get_running_loop()
+        rpc_session = await loop.run_in_executor(None, functools.partial(RPCSession, *args, **kwargs))
+        return cls(rpc_session)
+
+    def wrap(self, gem_object):
+        return AsyncGemObject(self, gem_object)
+
+    def gem_object_for(self, value):
+        if isinstance(value, AsyncGemObject):
+            return value.gem_object
+        elif isinstance(value, GemObject):
+            return value
+        return self.rpc_session.from_py(value)
+
+    def check_not_busy(self):
+        if self.lock.locked():
+            raise GemstoneApiError('Cannot make a blocking call while an asynchronous call is in progress in this session.')
+
+    def from_py(self, py_object):
+        """Convert a Python object to a GemObject (see :meth:`GemstoneSession.from_py`).
+
+        :return: An AsyncGemObject.
+        """
+        self.check_not_busy()
+        return self.wrap(self.rpc_session.from_py(py_object))
+
+    def resolve_symbol(self, symbol, symbol_list=None):
+        """Resolve a symbol (see :meth:`GemstoneSession.resolve_symbol`).
+
+        :return: An AsyncGemObject.
+        """
+        self.check_not_busy()
+        symbol = symbol if isinstance(symbol, str) else self.gem_object_for(symbol)
+        symbol_list = self.gem_object_for(symbol_list) if symbol_list is not None else None
+        return self.wrap(self.rpc_session.resolve_symbol(symbol, symbol_list=symbol_list))
+
+    def __getattr__(self, name):
+        return self.resolve_symbol(name)
+
+    def abort(self):
+        self.check_not_busy()
+        self.rpc_session.abort()
+
+    def begin(self):
+        self.check_not_busy()
+        self.rpc_session.begin()
+
+    def commit(self):
+        self.check_not_busy()
+        self.rpc_session.commit()
+
+    def log_out(self):
+        self.check_not_busy()
+        self.rpc_session.log_out()
+
+    @contextlib.asynccontextmanager
+    async def claimed(self):
+        # Excludes other tasks (via self.lock) and other threads (via the lock of the RPCSession)
+        # from the session; the latter is polled for, so as not to block the event loop
+        async with self.lock:
+            session_lock = self.rpc_session.lock
+            delay = 0.001
+            while not session_lock.acquire(blocking=False):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+            try:
+                yield self.rpc_session
+            finally:
+                self.rpc_session.last_activity = time.monotonic()
+                session_lock.release()
+
+    @property
+    def is_logged_in(self):
+        return self.rpc_session.is_logged_in
+
+    async def execute(self, source, context=None, symbol_list=None):
+        """Execute a GemStone Smalltalk expression, without blocking the event loop while it runs.
+
+        :param source: String or GemObject containing Smalltalk code to execute
+        :param context: Optional context object for the execution
+        :param symbol_list: Optional symbol list for name resolution
+        :return: An AsyncGemObject for the result of execution
+        :raises GemstoneApiError: If source is not a string or GemObject
+        :raises GemstoneError: If execution fails
+        """
+        if isinstance(source, str):
+            source_str, source_oop = source.encode('utf-8'), OOP_CLASS_Utf8
+        elif isinstance(source, (GemObject, AsyncGemObject)):
+            source_str, source_oop = None, source.oop
+        else:
+            raise GemstoneApiError('Source is type {}.Expected source to be a str or GemObject'.format(source.__class__.__name__))
+        async with self.claimed() as session:
+            context_oop = self.gem_object_for(context).oop if context is not None else OOP_NIL
+            symbol_list_oop = self.gem_object_for(symbol_list).oop if symbol_list is not None else OOP_NIL
+            session.release_dead_gemstone_objects_if_due()
+            error = session.error_struct
+            if not session.gci.GciTsNbExecute(session.c_session, source_str, source_oop, context_oop, symbol_list_oop,
+                                              0, 0, ctypes.byref(error)):
+                raise GemstoneError(session, error)
+            return self.wrap(await self.result())
+
+    async def object_perform(self, instance, selector, *args):
+        if not isinstance(selector, (str, GemObject, AsyncGemObject)):
+            raise GemstoneApiError('Selector is type {}.Expected selector to be a str or GemObject'.format(selector.__class__.__name__))
+        selector_oop = OOP_ILLEGAL if isinstance(selector, str) else selector.oop
+        selector_str = to_c_bytes(selector) if isinstance(selector, str) else None
+        flags = 1
+        environment_id = 0
+        async with self.claimed() as session:
+            args = [self.gem_object_for(i) for i in args]
+            session.release_dead_gemstone_objects_if_due()
+            error = session.error_struct
+            if not session.gci.GciTsNbPerform(session.c_session, instance.oop, selector_oop, selector_str,
+                                              session.argument_array(args), len(args), flags, environment_id,
+                                              ctypes.byref(error)):
+                raise GemstoneError(session, error)
+            return self.wrap(await self.result())
+
+    async def result(self):
+        session = self.rpc_session
+        try:
+            while not self.result_is_ready():
+                await self.socket_readable()
+        except asyncio.CancelledError:
+            session.hard_break()
+            await self.discard_result()
+            raise
+        error = session.error_struct
+        return_oop = session.gci.GciTsNbResult(session.c_session, ctypes.byref(error))
+        if return_oop == OOP_ILLEGAL.value:
+            raise GemstoneError(session, error)
+        return session.get_or_create_gem_object(return_oop)
+
+    async def discard_result(self):
+        # Waits (without blocking the event loop) for a call that was broken off to end, and
+        # collects its result so that the session can be used again. This is not given up when
+        # cancelled again, since the session would be left unusable.
+        session = self.rpc_session
+        while not self.result_is_ready():
+            try:
+                await self.socket_readable()
+            except asyncio.CancelledError:
+                pass
+        session.gci.GciTsNbResult(session.c_session, ctypes.byref(session.error_struct))
+
+    def result_is_ready(self):
+        session = self.rpc_session
+        error = session.error_struct
+        ready = session.gci.GciTsNbPoll(session.c_session, 0, ctypes.byref(error))
+        if ready == -1:
+            raise GemstoneError(session, error)
+        return ready == 1
+
+    async def socket_readable(self):
+        if self.socket is None:
+            session = self.rpc_session
+            error = session.error_struct
+            socket = session.gci.GciTsSocket(session.c_session, ctypes.byref(error))
+            if socket == -1:
+                raise GemstoneError(session, error)
+            self.socket = socket
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        loop.add_reader(self.socket, lambda: readable.done() or readable.set_result(None))
+        try:
+            await readable
+        finally:
+            loop.remove_reader(self.socket)
+
+    async def object_elements(self, instance):
+        array = (await self.object_perform(instance, 'asArray')).gem_object
+        size = (await self.object_perform(array, 'size')).gem_object.to_py
+        async with self.claimed() as session:
+            return [self.wrap(i) for i in session.object_fetch_elements(array, size)]
+
+    async def object_to_py(self, instance):
+        # Strings, Floats and the like are merely fetched (with blocking calls that run no
+        # Smalltalk code in the Gem); LargeIntegers and collections are converted by sending
+        # them messages
+        if isinstance(instance, ImmediateGemObject):
+            return instance.to_py
+        async with self.claimed() as session:
+            kind = well_known_class_names.get(session.object_gemstone_class(instance).oop)
+        if kind == 'large_integer':
+            return int(await (await self.object_perform(instance, 'asString')).to_py)
+        elif kind == 'ordered_collection':
+            return [await i.to_py for i in await self.object_elements(instance)]
+        elif kind == 'identity_set':
+            return {await i.to_py for i in await self.object_elements(instance)}
+        elif kind == 'dictionary':
+            py_dict = {}
+            for key in await self.object_elements(await self.object_perform(instance, 'keys')):
+                py_dict[await key.to_py] = await (await self.object_perform(instance, 'at:', key)).to_py
+            return py_dict
+        async with self.claimed() as session:
+            return session.object_to_py(instance)
@@ -0,0 +1,115 @@
+# Copyright (C) 2025 Reahl Software Services (Pty) Ltd
+# 
+# This file is part of parseltongue.
+#
+# parseltongue is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# parseltongue is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Running work on many Gems in parallel
+=====================================
+
+A :class:`GemExecutor` is a :class:`concurrent.futures.Executor` whose work is done
+by several RPCSessions (and thus Gems) at the same time. Calls into GemStone release
+the GIL, so the Gems really work in parallel::
+
+    with GemExecutor('DataCurator', 'swordfish', max_workers=8) as executor:
+        totals = executor.map_ranges('UserGlobals at: #Invoices', total_of_range, merge=sum)
+
+"""
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from .sessionpool import SessionPool
+
+
+def index_ranges(size, count):
+    """Divide the indexes 1 to size into (at most) count ranges of (nearly) equal length.
+
+    :param size: The number of elements to divide.
+    :param count: The number of ranges to divide them into.
+    :return: A list of (first, last) tuples of 1-based, inclusive indexes.
+    """
+    count = max(1, min(count, size))
+    length, remainder = divmod(size, count)
+    ranges = []
+    first = 1
+    for i in range(count):
+        last = first + length - 1 + (1 if i < remainder else 0)
+        if last >= first:
+            ranges.append((first, last))
+        first = last + 1
+    return ranges
+
+
+class GemExecutor(Executor):
+    """An Executor that runs each call with an RPCSession of its own, max_workers calls at a time.
+
+    The callables given to :meth:`submit` (or :meth:`map`) receive a logged-in RPCSession
+    as first argument. Sessions are taken from a :class:`~reahl.ptongue.SessionPool` and
+    aborted when the call is done, so a call should commit what it wants to keep, and
+    should answer Python values (see `to_py`) rather than GemObjects.
+
+    :param username: GemStone username for repository authentication
+    :param password: GemStone password for repository authentication
+    :param max_workers: The number of calls to run in parallel (and of sessions to log in).
+    :param pool: A SessionPool to take sessions from, instead of creating one. It should
+                 allow at least max_workers sessions.
+    :param login_kwargs: Other keyword arguments for :class:`~reahl.ptongue.SessionPool`
+                         (such as stone_name).
+    """
+    def __init__(self, username=None, password=None, max_workers=4, pool=None, **login_kwargs):
+        self.max_workers = max_workers
+        self.owns_pool = pool is None
+        self.pool = pool if pool is not None else \
+            SessionPool(username, password, min_size=max_workers, max_size=max_workers, **login_kwargs)
+        self.threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='GemExecutor')
+
+    def run_in_session(self, fn, *args, **kwargs):
+        with self.pool.session() as session:
+            return fn(session, *args, **kwargs)
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(session, *args, **kwargs) to be called with a session of its own.
+
+        :return: A Future for the result of the call.
+        """
+        return self.threads.submit(self.run_in_session, fn, *args, **kwargs)
+
+    def map_ranges(self, collection_source, fn, partitions=None, merge=None):
+        """Process a (large) persistent SequenceableCollection in parallel, a range of it per session.
+
+        The collection is divided into ranges of indexes. For each range, fn is called with
+        its own session as fn(session, collection, first, last), where collection is the
+        collection as found in that session and first and last are the (1-based, inclusive)
+        indexes of the range to process.
+
+        :param collection_source: Smalltalk code that answers the collection, such as `UserGlobals at: #Customers`.
+        :param fn: The callable that processes a range.
+        :param partitions: The number of ranges, defaults to max_workers.
+        :param merge: A callable that combines the list of results of fn (in the order of the ranges)
+                      into one result. If None, the list is answered.
+        :return: The merged results.
+        """
+        size = self.submit(lambda session: session.execute(collection_source).size().to_py).result()
+        ranges = index_ranges(size, partitions or self.max_workers)
+        futures = [self.submit(self.process_range, collection_source, fn, first, last) for first, last in ranges]
+        results = [future.result() for future in futures]
+        return merge(results) if merge is not None else results
+
+    def process_range(self, session, collection_source, fn, first, last):
+        return fn(session, session.execute(collection_source), first, last)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.threads.shutdown(wait=wait, cancel_futures=cancel_futures)
+        if self.owns_pool:
+            self.pool.close()
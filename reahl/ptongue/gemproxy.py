@@ -21,13 +21,20 @@ Main Python wrapper and common classes
 
 """
 
-from weakref import WeakValueDictionary
+import weakref
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
 import functools
+import hashlib
+import numbers
+import operator
 import warnings
 import pathlib
 import os
 import re
-import packaging.version
+import struct
+import threading
+import time
 from ctypes import CDLL
 
 from .gemstone import *
@@ -68,6 +75,60 @@ well_known_python_instances = {
     None: OOP_NIL.value
 }
 
+# Smalltalk blocks compiled once per session and used to implement features that need
+# to do several things in the Gem in one go
+smalltalk_helpers = {
+    # program is: the number of sends, followed by (receiver, selector, argument count,
+    # arguments...) per send; answers (status, result or exception, description) per send
+    'perform_batch': '[:program | | count results index | '
+                     '  count := program at: 1. '
+                     '  results := Array new: count * 3. '
+                     '  index := 2. '
+                     '  1 to: count do: [:i | | receiver selector arguments | '
+                     '    receiver := program at: index. '
+                     '    selector := program at: index + 1. '
+                     '    arguments := program copyFrom: index + 3 to: index + 2 + (program at: index + 2). '
+                     '    index := index + 3 + arguments size. '
+                     '    [results at: i * 3 - 1 put: (receiver perform: selector withArguments: arguments). '
+                     '     results at: i * 3 - 2 put: 0] '
+                     '      on: Error '
+                     '      do: [:ex | results at: i * 3 - 2 put: (ex number ifNil: [-1]); '
+                     '                         at: i * 3 - 1 put: ex; '
+                     '                         at: i * 3 put: ex description. '
+                     '             ex return: nil]]. '
+                     '  results]',
+    # answer the UTF-8 encoded result of a send, so that it can be fetched along with the send;
+    # results of limit bytes or more are also kept in SessionTemps, to be fetched separately
+    'perform_utf8_0': '[:limit :receiver :selector | '
+                      '  ((receiver perform: selector) encodeAsUTF8) '
+                      '    in: [:result | result size >= limit ifTrue: [SessionTemps current at: #ParseltongueLargeResult put: result]. result]]',
+    'perform_utf8_1': '[:limit :receiver :selector :a | '
+                      '  ((receiver perform: selector with: a) encodeAsUTF8) '
+                      '    in: [:result | result size >= limit ifTrue: [SessionTemps current at: #ParseltongueLargeResult put: result]. result]]',
+    'perform_utf8_2': '[:limit :receiver :selector :a :b | '
+                      '  ((receiver perform: selector with: a with: b) encodeAsUTF8) '
+                      '    in: [:result | result size >= limit ifTrue: [SessionTemps current at: #ParseltongueLargeResult put: result]. result]]',
+    # answer (UTF-8 encoded) what GemObject.__str__ shows for object, kept as with perform_utf8_0
+    'describe': '[:limit :object | | printed | '
+                '  object isBehavior '
+                '    ifTrue: [printed := object printString] '
+                '    ifFalse: [| className description | '
+                '      className := object class printString. '
+                '      description := ((\'AEIOU\' includes: className first) ifTrue: [\'an\'] ifFalse: [\'a\']), className. '
+                '      printed := object printString. '
+                '      printed size <= ((className size * 2) max: 30) '
+                '        ifTrue: [(printed beginsWith: description) '
+                '                   ifFalse: [printed := description, \'(\', printed, \')\']] '
+                '        ifFalse: [printed := description]]. '
+                '  printed encodeAsUTF8 '
+                '    in: [:result | result size >= limit ifTrue: [SessionTemps current at: #ParseltongueLargeResult put: result]. result]]'
+}
+
+# The smalltalk_helpers can also be installed as class methods of a class in the repository
+# (see GemstoneSession.install_helper_library), named for a hash of their source
+helper_library_version = hashlib.sha256(repr(sorted(smalltalk_helpers.items())).encode('utf-8')).hexdigest()[:16]
+helper_library_name = 'ParseltongueHelpers_%s' % helper_library_version
+
 implemented_python_types = {
     'NoneType': 'boolean_or_none',
     'bool': 'boolean_or_none',
@@ -88,16 +149,90 @@ def compute_small_integer_oop(py_int):
 
 def to_c_bytes(py_string):
     return py_string.encode('utf-8') if py_string != None else None
-    
+
+def map_selector(python_selector, args):
+    smalltalk_selector = python_selector.replace('_', ':')
+    if args or '_' in python_selector:
+       smalltalk_selector += ':'
+    expected_args = smalltalk_selector.count(':')
+    if len(args) != expected_args:
+        raise TypeError('%s() takes exactly %s arguments (%s given)' % (python_selector, expected_args, len(args)))
+    return smalltalk_selector
+
+def smalltalk_literal(py_object):
+    if py_object is None or isinstance(py_object, bool):
+        return {None: 'nil', True: 'true', False: 'false'}[py_object]
+    elif isinstance(py_object, int):
+        return '(%s)' % py_object
+    elif isinstance(py_object, str) and py_object.isascii():
+        return "'%s'" % py_object.replace("'", "''")
+    return None
+
+def helper_arg_count(block_source):
+    return re.match(r'\[((?:\s*:\w+)*)', block_source).group(1).count(':')
+
+def helper_selector(name):
+    return '%s:' % name + 'with:' * (helper_arg_count(smalltalk_helpers[name]) - 1)
+
+def helper_method_source(name):
+    arg_names = ['a%s' % i for i in range(1, helper_arg_count(smalltalk_helpers[name]) + 1)]
+    keywords = helper_selector(name).split(':')
+    return '%s\n  ^%s valueWithArguments: {%s}' % (' '.join('%s: %s' % (keyword, arg) for keyword, arg in zip(keywords, arg_names)),
+                                                  smalltalk_helpers[name], '. '.join(arg_names))
+
+def serialized(method):
+    # Makes method hold the session's lock, so that only one thread at a time talks to its Gem,
+    # and notes when the session was last used
+    @functools.wraps(method)
+    def serialized_method(self, *args, **kwargs):
+        with self.lock:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.last_activity = time.monotonic()
+    return serialized_method
+
+def selector_arg_count(smalltalk_selector):
+    if smalltalk_selector.endswith(':'):
+        return smalltalk_selector.count(':')
+    elif smalltalk_selector[:1].isalpha() or smalltalk_selector[:1] == '_':
+        return 0
+    else:
+        return 1
+
 #======================================================================================================================
 class GemstoneLibrary:
+    """A GemStone shared library, loaded once per process.
+
+    Subclasses declare the prototypes of the library functions they use in `prototypes`: a dict
+    mapping each function name to its (restype, argtypes). A function is only looked up in the
+    library (and given its prototype) the first time it is used.
+    """
     registered_libraries = []
+    loaded_libraries = {}
+    loading_lock = threading.Lock()
     short_name = ''
     min_version = '1'
     max_version = '0'
+    prototypes = {}
     
     def __init__(self, lib_path):
         self.library = CDLL(str(lib_path))
+
+    def __getattr__(self, name):
+        for cls in type(self).__mro__:
+            try:
+                restype, argtypes = cls.__dict__['prototypes'][name]
+                break
+            except KeyError:
+                pass
+        else:
+            raise AttributeError(name)
+        function = getattr(self.library, name)
+        function.restype = restype
+        function.argtypes = argtypes
+        setattr(self, name, function)
+        return function
     
     @classmethod
     def register(cls, library_class):
@@ -106,6 +241,17 @@ class GemstoneLibrary:
     @classmethod
     def find_library(cls, short_name):
         lib_dir = pathlib.Path(os.environ['GEMSTONE']) / 'lib'
+        with cls.loading_lock:
+            try:
+                return cls.loaded_libraries[(short_name, lib_dir)]
+            except KeyError:
+                library = cls.load_library(short_name, lib_dir)
+                cls.loaded_libraries[(short_name, lib_dir)] = library
+                return library
+
+    @classmethod
+    def load_library(cls, short_name, lib_dir):
+        import packaging.version
         lib_names = list(lib_dir.glob('*%s-*' % short_name))
         if not lib_names:
             raise Exception('Could not find a %s library in your $GEMSTONE (%s)' % (short_name, lib_dir) )
@@ -118,9 +264,6 @@ class GemstoneLibrary:
             raise Exception('No support found for %s version %s' % (short_name, version))
         latest_matching_class = list(sorted(matching_libraries, key=lambda i: packaging.version.parse(i.min_version)))[-1]
         return latest_matching_class(lib_path)
-        
-    def __init__(self, lib_path):
-        self.library = CDLL(str(lib_path))
 
         
 class GemstoneError(Exception):
@@ -137,9 +280,29 @@ class GemstoneError(Exception):
     :param c_error: A C structure containing the error details.
     """
     def __init__(self, sess, c_error):
-        self.c_error = c_error
+        # c_error is usually the session's reusable error struct, which later calls overwrite
+        self.c_error = GciErrSType.from_buffer_copy(c_error)
         self.session = sess
 
+    @classmethod
+    def from_exception(cls, sess, exception, number, message):
+        """Create a GemstoneError for an exception that was caught inside the Gem.
+
+        Such an error has no context, so it cannot be continued.
+
+        :param sess: The :class:`GemstoneSession` where the exception occurred.
+        :param exception: A :class:`GemObject` for the caught exception.
+        :param number: The Gemstone error number of the exception.
+        :param message: The description of the exception.
+        """
+        c_error = GciErrSType()
+        c_error.exceptionObj = exception.oop
+        c_error.number = number
+        c_error.message = message.encode('utf-8')[:GCI_ERR_STR_SIZE]
+        error = cls(sess, c_error)
+        error.gem_exception = exception
+        return error
+
     @property
     def category(self):
         obj = self.session.get_or_create_gem_object(self.c_error.category) if self.c_error.category else None
@@ -258,7 +421,7 @@ class GemstoneError(Exception):
                                      used if continue_with_error is None.
         :return: The result of continuing execution as a GemObject.
         """
-        replace_top_of_stack_oop = replace_top_of_stack.oop if replace_top_of_stack else OOP_ILLEGAL
+        replace_top_of_stack_oop = replace_top_of_stack.oop if replace_top_of_stack is not None else OOP_ILLEGAL
         continue_with_error_oop = ctypes.byref(continue_with_error.c_error) if continue_with_error else None
         return self.session.object_continue_with(self.context, continue_with_error_oop, replace_top_of_stack_oop)
 
@@ -272,6 +435,22 @@ class GemstoneError(Exception):
         """
         return self.session.object_clear_stack(self.context)        
 
+
+class GemstoneTimeout(GemstoneError):
+    """Raised instead of the GemstoneError with which a call ends when it is broken off
+    because it ran past a deadline (see :meth:`GemstoneSession.deadline`).
+
+    :param sess: The :class:`GemstoneSession` where the call was broken off.
+    :param c_error: A C structure containing the details of the break.
+    :param seconds: The number of seconds the deadline allowed.
+    """
+    def __init__(self, sess, c_error, seconds):
+        super().__init__(sess, c_error)
+        self.seconds = seconds
+
+    def __str__(self):
+        return 'Call did not finish within its deadline of %s seconds' % self.seconds
+
     
 class InvalidSession(Exception):
     """Indicates a problem with the current Session."""
@@ -288,6 +467,10 @@ class GemstoneApiError(Exception):
     """Thrown when problems are detected while communicating via the underlying C API."""
     pass
 
+class ResultTooLarge(GemstoneApiError):
+    """Thrown when a result fetched along with a call is larger than the buffer it was fetched into."""
+    pass
+
 class GemstoneWarning(Warning):
     """Represents a warning condition related to this API."""
     pass
@@ -321,6 +504,7 @@ class GemObject:
     :param session: The Gemstone session this object belongs to.
     :param oop: The object-oriented pointer value in the Gemstone VM.
     """
+    __slots__ = ('oop', 'session', '__weakref__')
     
     def __init__(self, session, oop):
         self.oop = oop
@@ -380,20 +564,40 @@ class GemObject:
         """
         return self.session.object_gemstone_class(self)
 
+    def persistent_reference(self):
+        """Answer a small, picklable reference to the committed object this GemObject represents.
+
+        The reference can be turned into a GemObject again in another session (also in
+        another process) logged in to the same repository, see :meth:`GemstoneSession.attach`.
+
+        :return: A :class:`PersistentReference`.
+        :raises GemstoneApiError: If the object has not been committed.
+        """
+        return self.session.persistent_references([self])[0]
+
     def __getattr__(self, name):
         return functools.partial(self.perform_mapped_selector, name)
 
     def perform_mapped_selector(self, selector, *args):
-        smalltalk_selector = selector.replace('_', ':')
-        if args or '_' in selector:
-           smalltalk_selector += ':'
-        expected_args = smalltalk_selector.count(':')
-        if len(args) != expected_args:
-            raise TypeError('%s() takes exactly %s arguments (%s given)' % (selector, expected_args, len(args)))
-        selector_symbol = self.session.new_symbol(smalltalk_selector)
-        return self.perform(selector_symbol, *[(i if isinstance(i, self.__class__) else self.session.from_py(i)) for i in args])
+        selector_symbol = self.session.new_symbol(map_selector(selector, args))
+        return self.perform(selector_symbol, *[(i if isinstance(i, GemObject) else self.session.from_py(i)) for i in args])
 
-    def perform(self, selector, *args):
+    def lazy(self):
+        """Start a chain of message sends that are only sent to the Gem once a result is needed.
+
+        Messages sent to the returned :class:`DeferredGemObject` (and to what they return
+        in turn) are merely recorded. The whole chain is sent to the Gem in one go when its
+        result is needed: when calling :meth:`~DeferredGemObject.resolve`, asking for its
+        `to_py` or `oop`, or when passing it as an argument to a message that is not deferred::
+
+            customers = session.UserGlobals.lazy().at('App').customers()
+            names = customers.collect(name_block).to_py
+
+        :return: A :class:`DeferredGemObject` standing in for this object.
+        """
+        return DeferredGemObject(self.session, self, None, [])
+
+    def perform(self, selector, *args, timeout=None):
         """Directly perform a method on the Gemstone object.
 
         This is the low-level method that executes a method call on the
@@ -408,10 +612,52 @@ class GemObject:
                          or a string that will be converted to a Symbol.
         :param args: GemObject arguments to pass to the method. If not a GemObject,
                      the object will be transformed using session.from_py()
+        :param timeout: If given, the number of seconds the method may run before it is
+                        broken off (see :meth:`GemstoneSession.deadline`).
         :return: The result of the method call.
+        :raises GemstoneTimeout: If the method ran longer than timeout.
         """
+        if timeout is not None:
+            with self.session.deadline(timeout):
+                return self.session.object_perform(self, selector, *args)
         return self.session.object_perform(self, selector, *args)
 
+    def perform_bytes(self, selector, *args):
+        """Perform a method whose result is a byte object (such as a ByteArray or a
+        String) and fetch the bytes of that result along with the send.
+
+        This takes one round trip to the Gem, and creates no GemObject for the result::
+
+          session.execute("#[1 2 3]").perform_bytes('reverse')
+
+        :param selector: The method selector, as a str.
+        :param args: GemObject arguments to pass to the method. If not a GemObject,
+                     the object will be transformed using session.from_py()
+        :return: The bytes of the result.
+        :raises ResultTooLarge: If the result is larger than session.fused_fetch_size bytes.
+        """
+        args = [(i if isinstance(i, GemObject) else self.session.from_py(i)) for i in args]
+        return self.session.object_perform_fetch_bytes(self, selector, args, self.session.fused_fetch_size)
+
+    def perform_to_py(self, selector, *args):
+        """Perform a method whose result is a String (of any kind) and answer it as a Python str.
+
+        Unlike `perform(selector, *args).to_py`, the send and the fetch of its result
+        happen in one round trip to the Gem (for methods with up to two arguments, and
+        results of less than session.fused_fetch_size bytes)::
+
+          session.Date.today().perform_to_py('asString')
+
+        :param selector: The method selector, as a str.
+        :param args: GemObject arguments to pass to the method. If not a GemObject,
+                     the object will be transformed using session.from_py()
+        :return: The result as a Python str.
+        """
+        if len(args) > 2:
+            return self.perform(selector, *args).to_py
+        helper, helper_selector = self.session.helper('perform_utf8_%s' % len(args))
+        return self.session.fetch_utf8(helper, helper_selector, self, self.session.selector_symbol(selector), *args)
+
     def __iter__(self):
         """Provide iteration over collection objects.
 
@@ -438,27 +684,596 @@ class GemObject:
 
         :return: A human-readable string representation of the object.
         """
-        if self.perform('isBehavior').to_py:
-            printed = self.perform('printString').to_py
-        else:
-            class_name = self.perform('class').perform('printString').to_py
-            pre = 'an' if (class_name[0] in 'AEIOU') else 'a'
-            description = '%s%s' % (pre, class_name)
-            gem_printed = self.perform('printString')
-            if gem_printed.perform('size').to_py <= max(len(class_name) * 2, 30):
-                printed = gem_printed.to_py
-                if not printed.startswith(description):
-                    printed = '%s(%s)' % (description, printed)
+        helper, helper_selector = self.session.helper('describe')
+        return self.session.fetch_utf8(helper, helper_selector, self)
+
+    def __del__(self):
+        # This may run at any point (and in any thread), so it must not call into the GCI:
+        # the session releases queued objects the next time it is safe to do so
+        self.session.deallocated_unfreed_gemstone_objects.append(self.oop)
+
+
+undecoded = object()
+
+def small_double_to_py(oop):
+    # A SmallDouble holds a double with an 8 bit exponent: its oop has the exponent in the
+    # top 8 bits, then the 52 bits of the mantissa, the sign bit and the tag bits
+    bits = oop >> OOP_NUM_TAG_BITS
+    sign = bits & 1
+    mantissa = (bits >> 1) & ((1 << 52) - 1)
+    exponent = bits >> 53
+    if exponent != 0 or mantissa != 0:
+        exponent += 1023 - 127
+    return struct.unpack('<d', struct.pack('<Q', (sign << 63) | (exponent << 52) | mantissa))[0]
+
+def immediate_kind(value):
+    # Only values of the same kind are compared: Smalltalk's true is not 1, nor is 0 false
+    if value is None:
+        return 'nil'
+    elif isinstance(value, bool):
+        return 'boolean'
+    elif isinstance(value, numbers.Number):
+        return 'number'
+    elif isinstance(value, str):
+        return 'character'
+    return None
+
+def immediate_operator(operation, reflected=False):
+    def method(self, other):
+        value = self.local_value
+        if value is undecoded:
+            return NotImplemented
+        if isinstance(other, ImmediateGemObject):
+            other = other.local_value
+        elif isinstance(other, GemObject):
+            return NotImplemented
+        if immediate_kind(value) != immediate_kind(other):
+            return NotImplemented
+        return operation(other, value) if reflected else operation(value, other)
+    return method
+
+immediate_equal = immediate_operator(operator.eq)
+
+
+class ImmediateGemObject(GemObject):
+    """A GemObject for a special object: a SmallInteger, SmallDouble, Character, nil, true or false.
+
+    The value of a special object is encoded in its oop, so it never is in the export set.
+    ImmediateGemObjects are therefore not tracked by the session, and nothing needs to be
+    released when they die. (They are not necessarily the same Python object for the same
+    oop, except for nil, true and false.)
+
+    Because their values are known without asking the Gem, ImmediateGemObjects behave like
+    their Python values with Python operators (and `to_py`), without sending messages::
+
+        if collection.size() > 10 and collection.includes(item):
+            ...
+
+    The results of such operations are Python values, not GemObjects. Only values of the
+    same kind are equal: a SmallInteger 1 is not equal to true, nor 0 to false. Other kinds
+    of special objects (such as the SmallFractions of newer GemStone versions) are only
+    equal to GemObjects for the same oop, and do not support operators.
+    """
+    __slots__ = ()
+
+    @property
+    def local_value(self):
+        """The Python value of this object if it can be decoded from its oop, else `undecoded`."""
+        oop = self.oop
+        if GCI_OOP_IS_SMALL_INT(oop):
+            return ctypes.c_int64(oop).value >> OOP_NUM_TAG_BITS
+        elif (oop & OOP_TAG_SPECIAL_MASK) == OOP_TAG_SMALLDOUBLE:
+            return small_double_to_py(oop)
+        elif (oop & 0xFF) == OOP_ASCII_NUL.value:
+            return chr(oop >> 8)
+        return well_known_instances.get(oop, undecoded)
+
+    @property
+    def to_py(self):
+        value = self.local_value
+        if value is undecoded:
+            return self.session.object_to_py(self)
+        return value
+
+    def __bool__(self):
+        value = self.local_value
+        return True if value is undecoded else bool(value)
+
+    def __int__(self):
+        return int(self.to_py)
+
+    def __float__(self):
+        return float(self.to_py)
+
+    def __index__(self):
+        return operator.index(self.to_py)
+
+    def __hash__(self):
+        value = self.local_value
+        return hash(self.oop) if value is undecoded else hash(value)
+
+    def __eq__(self, other):
+        if self.local_value is undecoded:
+            return isinstance(other, ImmediateGemObject) and other.session is self.session and other.oop == self.oop
+        return immediate_equal(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __lt__ = immediate_operator(operator.lt)
+    __le__ = immediate_operator(operator.le)
+    __gt__ = immediate_operator(operator.gt)
+    __ge__ = immediate_operator(operator.ge)
+
+    __add__ = immediate_operator(operator.add)
+    __sub__ = immediate_operator(operator.sub)
+    __mul__ = immediate_operator(operator.mul)
+    __truediv__ = immediate_operator(operator.truediv)
+    __floordiv__ = immediate_operator(operator.floordiv)
+    __mod__ = immediate_operator(operator.mod)
+    __pow__ = immediate_operator(operator.pow)
+    __radd__ = immediate_operator(operator.add, reflected=True)
+    __rsub__ = immediate_operator(operator.sub, reflected=True)
+    __rmul__ = immediate_operator(operator.mul, reflected=True)
+    __rtruediv__ = immediate_operator(operator.truediv, reflected=True)
+    __rfloordiv__ = immediate_operator(operator.floordiv, reflected=True)
+    __rmod__ = immediate_operator(operator.mod, reflected=True)
+    __rpow__ = immediate_operator(operator.pow, reflected=True)
+
+    def __neg__(self):
+        return -self.to_py
+
+    def __abs__(self):
+        return abs(self.to_py)
+
+    def __del__(self):
+        pass
+
+
+class PersistentReference(namedtuple('PersistentReference', ['oop', 'repository'])):
+    """A reference to a committed object that can be pickled, and used in any session
+    logged in to the same repository (see :meth:`GemObject.persistent_reference`).
+
+    :ivar oop: The oop of the object.
+    :ivar repository: The name of the stone of the repository the object is in.
+    """
+    __slots__ = ()
+
+
+class DeferredGemObject(GemObject):
+    """Stands in for the result of a message send that has been recorded, but not yet sent.
+
+    Sending a message to a DeferredGemObject records that send too, resulting in another
+    DeferredGemObject. A chain of such sends is sent to the Gem all at once, as a single
+    piece of Smalltalk code, when the result at the end of the chain is needed. If all
+    the GemObjects used in the chain are the object at its start, or arguments that are
+    Python strings, integers, booleans or None, this happens in a single round trip.
+
+    Nothing is sent before the result is needed, so any side effects (and errors) of the
+    sends in the chain only happen then. Only the result at the end of a chain is kept:
+    if you resolve a DeferredGemObject from the middle of a chain separately, the sends
+    leading up to it are performed again.
+
+    DeferredGemObjects are not intended to be instantiated directly, use :meth:`GemObject.lazy`.
+
+    :param session: The Gemstone session this object belongs to.
+    :param receiver: The (possibly deferred) GemObject the message is sent to.
+    :param selector: The selector of the message, as a Smalltalk string or a GemObject Symbol.
+                     If None, this object merely stands in for receiver.
+    :param args: The arguments of the message.
+    """
+    __slots__ = ('receiver', 'selector', 'args', 'resolved')
+
+    def __init__(self, session, receiver, selector, args):
+        self.session = session
+        self.receiver = receiver
+        self.selector = selector
+        self.args = args
+        self.resolved = None
+
+    @property
+    def oop(self):
+        return self.resolve().oop
+
+    @property
+    def to_py(self):
+        return self.resolve().to_py
+
+    def lazy(self):
+        return self
+
+    def perform_mapped_selector(self, selector, *args):
+        return self.perform(map_selector(selector, args), *args)
+
+    def perform(self, selector, *args):
+        """Record sending a message to the object this DeferredGemObject stands in for.
+
+        :param selector: The method selector, either as a GemObject Symbol or a string
+                         (spelt as in Smalltalk).
+        :param args: Arguments to pass to the method. These may be (deferred) GemObjects
+                     or Python objects which will be transformed using session.from_py().
+        :return: A DeferredGemObject for the result of the send.
+        """
+        if isinstance(selector, str) and selector_arg_count(selector) != len(args):
+            raise TypeError('%s takes exactly %s arguments (%s given)' % (selector, selector_arg_count(selector), len(args)))
+        return self.__class__(self.session, self, selector, list(args))
+
+    def resolve(self):
+        """Send the recorded chain of messages to the Gem, if not done already.
+
+        :return: The :class:`GemObject` that resulted from the chain.
+        """
+        if self.resolved is None:
+            if self.selector is None:
+                self.resolved = self.receiver
+            else:
+                self.resolved = self.send_chain()
+        return self.resolved
+
+    def send_chain(self):
+        externals = {}
+        statements = []
+        temporaries = {}
+
+        def reference(value):
+            if isinstance(value, DeferredGemObject):
+                if value.resolved is not None:
+                    return reference(value.resolved)
+                if value.selector is None:
+                    return reference(value.receiver)
+                if id(value) not in temporaries:
+                    receiver = reference(value.receiver)
+                    args = [reference(i) for i in value.args]
+                    if isinstance(value.selector, str):
+                        message = message_source(receiver, value.selector, args)
+                    else:
+                        message = '%s perform: %s withArguments: {%s}' % (receiver, reference(value.selector), '. '.join(args))
+                    temporaries[id(value)] = 't%s' % (len(temporaries) + 1)
+                    statements.append('%s := %s' % (temporaries[id(value)], message))
+                return temporaries[id(value)]
+            literal = smalltalk_literal(value)
+            if literal is not None:
+                return literal
+            gem_object = value if isinstance(value, GemObject) else self.session.from_py(value)
+            if gem_object.oop not in externals:
+                externals[gem_object.oop] = ('c%s' % (len(externals) + 1), gem_object)
+            return externals[gem_object.oop][0]
+
+        def message_source(receiver, selector, args):
+            if not args:
+                return '%s %s' % (receiver, selector)
+            elif not selector.endswith(':'):
+                return '%s %s %s' % (receiver, selector, args[0])
             else:
-                printed = description
-        return printed
+                keywords = re.findall(r'[^:]+:', selector)
+                return '%s %s' % (receiver, ' '.join(['%s %s' % (keyword, arg) for keyword, arg in zip(keywords, args)]))
+
+        result = reference(self)
+        if len(externals) == 1:
+            [(name, context)] = externals.values()
+            initialisations = ['%s := self' % name]
+        else:
+            context = self.session.new_array_of_oops(list(externals))
+            initialisations = ['%s := self at: %s' % (name, index) for index, (name, gem_object) in enumerate(externals.values(), 1)]
+        names = [name for name, gem_object in externals.values()] + list(temporaries.values())
+        source = '| %s | %s. ^%s' % (' '.join(names), '. '.join(initialisations + statements), result)
+        return self.session.execute(source, context=context)
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.receiver, self.selector)
+
+    def __str__(self):
+        return str(self.resolve())
 
     def __del__(self):
-        if self.session.is_logged_in:
-            if len(self.session.deallocated_unfreed_gemstone_objects) > self.session.export_set_free_batch_size:
-                self.session.remove_dead_gemstone_objects()
-            self.session.deallocated_unfreed_gemstone_objects.add(self.oop)
-            
+        pass
+
+
+class CallSite:
+    """A reusable way of sending the same message to many different receivers.
+
+    Sending a message via a GemObject's attributes (or via :meth:`GemObject.perform`)
+    translates the selector, checks the number of arguments and looks up its Symbol on
+    every call. A CallSite does all of that once, up front, and thereafter only passes
+    the receiver and arguments to the Gem::
+
+        at_put = session.method('at:put:')
+        for key, value in pairs:
+            at_put(dictionary, key, value)
+
+    Arguments that are not GemObjects are transformed using session.from_py().
+
+    The Symbol of the selector is remembered by the session, so a CallSite stays usable
+    after :meth:`GemstoneSession.forget_gem_objects` (for example, when its session was
+    returned to a :class:`~reahl.ptongue.SessionPool` and checked out again).
+
+    CallSites are not intended to be instantiated directly, use :meth:`GemstoneSession.method`.
+
+    :param session: The Gemstone session in which messages will be sent.
+    :param selector: The Smalltalk selector to send, for example 'at:put:'.
+    """
+    def __init__(self, session, selector):
+        self.session = session
+        self.selector = selector
+        self.arg_count = selector_arg_count(selector)
+        self.selector_symbol = session.selector_symbol(selector)
+
+    def __call__(self, receiver, *args):
+        """Send the message of this CallSite to the given receiver.
+
+        :param receiver: The GemObject to which the message is sent.
+        :param args: The arguments to send along, as GemObjects or Python objects.
+        :return: The result of the send as a GemObject.
+        """
+        if len(args) != self.arg_count:
+            raise TypeError('%s takes exactly %s arguments (%s given)' % (self.selector, self.arg_count, len(args)))
+        converted = [i if isinstance(i, GemObject) else self.session.from_py(i) for i in args]
+        c_args = self.session.argument_array(converted)
+        return self.session.object_perform_symbol(receiver, self.selector_symbol, c_args, self.arg_count)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.selector)
+
+
+class PreparedStatement:
+    """Smalltalk code that is compiled once, and can then be run many times with different arguments.
+
+    The code is compiled as the body of a Smalltalk block that takes the named arguments.
+    Its result is therefore the value of its last statement (it should not use ^ to return)::
+
+        find = session.prepare('Customers detect: [:each | each id = id] ifNone: [nil]', ['id'])
+        first = find(1)
+        second = find(id=2)
+
+    PreparedStatements are not intended to be instantiated directly, use :meth:`GemstoneSession.prepare`.
+
+    :param session: The Gemstone session in which the code will be run.
+    :param source: The Smalltalk code to compile.
+    :param arg_names: The names of the arguments used in source.
+    :param context: Optional object which is self in source.
+    :param symbol_list: Optional symbol list for name resolution.
+    """
+    value_selectors = ['value', 'value:', 'value:value:', 'value:value:value:', 'value:value:value:value:']
+
+    def __init__(self, session, source, arg_names=(), context=None, symbol_list=None):
+        self.session = session
+        self.source = source
+        self.arg_names = list(arg_names)
+        block_args = ''.join([':%s ' % i for i in self.arg_names])
+        self.block = session.keep_beyond_object_scopes(
+            session.execute('[%s%s%s]' % (block_args, '| ' if self.arg_names else '', source), context=context, symbol_list=symbol_list))
+        if len(self.arg_names) < len(self.value_selectors):
+            self.call_site = session.method(self.value_selectors[len(self.arg_names)])
+        else:
+            self.call_site = None
+
+    def __call__(self, *args, **kwargs):
+        """Run the code with the given arguments.
+
+        :param args: Values for the arguments, in the order of arg_names.
+        :param kwargs: Values for the arguments, by name.
+        :return: The result as a GemObject.
+        """
+        values = list(args) + [kwargs.pop(name) for name in self.arg_names[len(args):] if name in kwargs]
+        if kwargs or len(values) != len(self.arg_names):
+            raise TypeError('%s takes exactly the arguments %s' % (self.__class__.__name__, ', '.join(self.arg_names)))
+        if self.call_site:
+            return self.call_site(self.block, *values)
+        converted = [i if isinstance(i, GemObject) else self.session.from_py(i) for i in values]
+        return self.block.perform('valueWithArguments:', self.session.new_array_of_oops([i.oop for i in converted]))
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.source, self.arg_names)
+
+
+class SendBatch:
+    """A number of independent message sends that are sent to the Gem together.
+
+    Each send is recorded locally, and only when the batch is sent are all of them
+    performed in the Gem. The number of round trips needed for this does not grow with
+    the number of sends in the batch (except for the first use of each distinct selector
+    that is given as a string)::
+
+        with session.batch() as batch:
+            for customer in customers:
+                batch.perform(customer, 'name')
+        names = [i.to_py for i in batch.results]
+
+    A send that fails does not prevent the others from being performed. In its place
+    in :attr:`results` is a :class:`GemstoneError` instead of a GemObject.
+
+    SendBatches are not intended to be instantiated directly, use :meth:`GemstoneSession.batch`.
+
+    :ivar results: After the batch was sent, a list with the result of each send in the
+                   order they were recorded.
+    :param session: The Gemstone session in which the sends will be performed.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.sends = []
+        self.results = None
+
+    def __len__(self):
+        return len(self.sends)
+
+    def perform(self, receiver, selector, *args):
+        """Record a send to be performed when the batch is sent.
+
+        :param receiver: The GemObject to which the message will be sent.
+        :param selector: The method selector, either as a GemObject Symbol or a string
+                         (spelt as in Smalltalk).
+        :param args: Arguments to pass to the method. If not a GemObject, the object will be
+                     transformed using session.from_py() right away.
+        :return: The index in :attr:`results` where the result of this send will be.
+        """
+        self.sends.append((receiver, selector, [i if isinstance(i, GemObject) else self.session.from_py(i) for i in args]))
+        return len(self.sends) - 1
+
+    def send(self):
+        """Perform all the recorded sends in the Gem.
+
+        :return: The list of :attr:`results`.
+        """
+        session = self.session
+        symbols = {}
+        program = [compute_small_integer_oop(len(self.sends))]
+        for receiver, selector, args in self.sends:
+            if not isinstance(selector, GemObject):
+                if selector not in symbols:
+                    symbols[selector] = session.new_symbol(selector)
+                selector = symbols[selector]
+            program.extend([receiver.oop, selector.oop, compute_small_integer_oop(len(args))])
+            program.extend([i.oop for i in args])
+
+        self.results = []
+        if self.sends:
+            helper, helper_selector = session.helper('perform_batch')
+            outcomes = helper.perform(helper_selector, session.new_array_of_oops(program))
+            elements = session.object_fetch_elements(outcomes, len(self.sends) * 3)
+            for index in range(0, len(elements), 3):
+                status, value, description = elements[index:index+3]
+                number = session.object_small_integer_to_py(status)
+                if number == 0:
+                    self.results.append(value)
+                else:
+                    self.results.append(GemstoneError.from_exception(session, value, number, description.to_py or ''))
+        return self.results
+
+class ObjectScope:
+    """Keeps track of the GemObjects created while it is active, see :meth:`GemstoneSession.object_scope`.
+
+    :param session: The Gemstone session this scope belongs to.
+    :param enclosing: The ObjectScope this one is nested in, if any.
+    :param release_all: Whether to clear the whole export set when releasing.
+    """
+    def __init__(self, session, enclosing=None, release_all=False):
+        self.session = session
+        self.enclosing = enclosing
+        self.release_all = release_all
+        self.oops = set()
+
+    def keep(self, gem_object):
+        """Prevent the object of gem_object from being released when this scope ends.
+
+        :param gem_object: A GemObject created inside this scope.
+        :return: gem_object
+        """
+        if gem_object.oop in self.oops:
+            self.oops.discard(gem_object.oop)
+            if self.enclosing is not None:
+                self.enclosing.oops.add(gem_object.oop)
+        return gem_object
+
+    def release(self):
+        with self.session.lock:
+            if self.release_all:
+                surviving = [oop for oop, ref in list(self.session.instances.refs.items())
+                             if oop not in self.oops and ref() is not None]
+                self.session.release_all_oops()
+                if surviving:
+                    self.session.save_oops(surviving)
+            elif self.oops:
+                self.session.release_oops(list(self.oops))
+        self.oops.clear()
+
+class Deadline:
+    """Breaks off what a session is executing once it runs past a deadline, see :meth:`GemstoneSession.deadline`.
+
+    A soft break is sent when the deadline passes, and a hard break if the session is
+    still executing grace seconds later.
+
+    :param session: The Gemstone session to watch.
+    :param seconds: The number of seconds from when it is started until the deadline.
+    :param grace: The number of seconds to wait after the soft break before sending a hard
+                  break, or None to only send a soft break.
+    """
+    def __init__(self, session, seconds, grace):
+        self.session = session
+        self.seconds = seconds
+        self.grace = grace
+        self.expired = False
+        self.cancelled = False
+        self.timer = None
+        # Held while a break is sent, so that no break is sent once cancel has returned
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            self.schedule(self.seconds, self.expire)
+
+    def schedule(self, delay, action):
+        # Only called with self.lock held
+        if not self.cancelled:
+            self.timer = threading.Timer(delay, action)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def expire(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.expired = True
+            self.session.soft_break()
+            if self.grace is not None:
+                self.schedule(self.grace, self.escalate)
+
+    def escalate(self):
+        with self.lock:
+            if not self.cancelled:
+                self.session.hard_break()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            timer = self.timer
+        if timer is not None:
+            timer.cancel()
+            if timer is not threading.current_thread():
+                timer.join()
+
+    def timed_out(self, error):
+        if error.context is not None:
+            error.clear_stack()
+        return GemstoneTimeout(self.session, error.c_error, self.seconds)
+
+
+#======================================================================================================================
+class IdentityMap:
+    """Maps oops to the GemObjects that represent them in a session, without keeping those alive.
+
+    Entries of GemObjects that have died are only removed by :meth:`forget_if_dead`, which the
+    session calls for the oops it is about to release.
+    """
+    __slots__ = ('refs',)
+
+    def __init__(self):
+        self.refs = {}
+
+    def get(self, oop):
+        ref = self.refs.get(oop)
+        return ref() if ref is not None else None
+
+    def add(self, gem_object):
+        self.refs[gem_object.oop] = weakref.ref(gem_object)
+
+    def forget_if_dead(self, oop):
+        ref = self.refs.get(oop)
+        if ref is not None and ref() is None:
+            del self.refs[oop]
+            return True
+        return ref is None
+
+    def __contains__(self, oop):
+        return self.get(oop) is not None
+
+    def __len__(self):
+        return len(self.refs)
+
+
 #======================================================================================================================
 class GemstoneSession:
     """A Python interface for managing a connection to a Gemstone database.
@@ -472,20 +1287,128 @@ class GemstoneSession:
 
     GemstoneSession is not intended to be instantiated directly, its subclasses are:
     LinkedSession or RPCSession.
+
+    A session can be shared by threads: each call to its Gem holds the session's `lock`
+    for its duration, so threads using the same session take turns. Finding the
+    GemObject for an oop (the common case) does not take the lock. Use a session per
+    thread for work in different threads to run in parallel.
+
+    The time (as per `time.monotonic`) at which a call to the Gem last ended is kept in
+    `last_activity`.
     """
     def __init__(self):
-        self.instances = WeakValueDictionary()
-        self.deallocated_unfreed_gemstone_objects = set()
+        self.lock = threading.RLock()
+        self.last_activity = time.monotonic()
+        self.instances = IdentityMap()
+        self.well_known_gem_objects = {oop: ImmediateGemObject(self, oop) for oop in well_known_instances}
+        self.deallocated_unfreed_gemstone_objects = deque()
         self.initial_fetch_size = 200
         self.export_set_free_batch_size = 1000
-        
-    def get_or_create_gem_object(self, oop):
+        self.export_set_free_interval = 10
+        self.last_export_set_free = time.monotonic()
+        self.resolved_symbols = {}
+        self.helper_blocks = {}
+        self.helper_library = None
+        self.helper_library_checked = False
+        self.prepared_statements = OrderedDict()
+        self.prepared_statement_cache_size = 256
+        self.selector_symbols = {}
+        self.fused_fetch_size = 65536
+        self.buffers = threading.local()
+        self.repository_name = None
+
+    @property
+    def error_struct(self):
+        """A GciErrSType for GCI calls to report errors in, reused by all calls made from the same thread."""
+        try:
+            return self.buffers.error
+        except AttributeError:
+            self.buffers.error = GciErrSType()
+            return self.buffers.error
+
+    @property
+    def object_scopes(self):
+        """The stack of ObjectScopes active in the calling thread (see :meth:`object_scope`)."""
         try:
-            return self.instances[oop]
+            return self.buffers.object_scopes
+        except AttributeError:
+            self.buffers.object_scopes = []
+            return self.buffers.object_scopes
+
+    def argument_array(self, args):
+        """Answer an array of the oops of args to pass to a GCI call.
+
+        The array is reused by all calls made from the same thread with the same number of arguments.
+        """
+        try:
+            arrays = self.buffers.argument_arrays
+        except AttributeError:
+            arrays = self.buffers.argument_arrays = {}
+        # Some GemObjects (such as DeferredGemObjects) send messages to find their oop, which
+        # may reuse this array: so all oops are found before any are written into it
+        oops = [arg.oop for arg in args]
+        try:
+            array = arrays[len(oops)]
         except KeyError:
-            new_gem_object = GemObject(self, oop)
-            self.instances[oop] = new_gem_object
-            return new_gem_object
+            array = arrays[len(oops)] = (OopType * len(oops))()
+        array[:] = oops
+        return array
+
+    def byte_buffer(self, size):
+        """Answer a buffer of at least size bytes for GCI calls to fetch bytes into.
+
+        The buffer is reused (and grown when needed) by all calls made from the same thread.
+        """
+        buffer = getattr(self.buffers, 'bytes', None)
+        if buffer is None or len(buffer) < size:
+            buffer = self.buffers.bytes = (ByteType * size)()
+        return buffer
+
+    def release_dead_gemstone_objects_if_due(self):
+        """Release the objects of GemObjects that no longer exist in Python from the export set,
+        if enough of them have been queued, or if they have been queued long enough.
+
+        Called before sending anything to the Gem, where it is safe to do so.
+        """
+        queued = len(self.deallocated_unfreed_gemstone_objects)
+        if queued > self.export_set_free_batch_size or \
+           (queued and time.monotonic() - self.last_export_set_free > self.export_set_free_interval):
+            self.remove_dead_gemstone_objects()
+
+    @serialized
+    def remove_dead_gemstone_objects(self):
+        unreferenced_gemstone_objects = self.take_unreferenced_gemstone_objects()
+        if unreferenced_gemstone_objects:
+            self.release_oops(unreferenced_gemstone_objects)
+
+    def take_unreferenced_gemstone_objects(self):
+        self.last_export_set_free = time.monotonic()
+        queued = set()
+        while True:
+            try:
+                queued.add(self.deallocated_unfreed_gemstone_objects.popleft())
+            except IndexError:
+                break
+        return [oop for oop in queued if self.instances.forget_if_dead(oop)]
+
+    def get_or_create_gem_object(self, oop):
+        if GCI_OOP_IS_SPECIAL(oop):
+            try:
+                return self.well_known_gem_objects[oop]
+            except KeyError:
+                return ImmediateGemObject(self, oop)
+        gem_object = self.instances.get(oop)
+        if gem_object is None:
+            # Checked again while holding the lock, so that threads cannot create two GemObjects
+            # for the same oop, or release an oop just after a new GemObject was created for it
+            with self.lock:
+                gem_object = self.instances.get(oop)
+                if gem_object is None:
+                    gem_object = GemObject(self, oop)
+                    self.instances.add(gem_object)
+                    if self.object_scopes:
+                        self.object_scopes[-1].oops.add(oop)
+        return gem_object
             
     def from_py(self, py_object):
         """Convert a Python object to its corresponding Gemstone representation.
@@ -558,8 +1481,7 @@ class GemstoneSession:
             raise GemstoneApiError('Expected oop to represent a Small Integer.')
             
     def object_large_integer_to_py(self, instance):
-        string_result = self.object_latin1_to_py(self.object_perform(instance, 'asString'))
-        return int(string_result)
+        return int(self.object_perform_fetch_bytes(instance, 'asString', [], self.fused_fetch_size).decode('latin-1'))
         
     def object_ordered_collection_to_py(self, instance):
         py_list = []
@@ -583,7 +1505,395 @@ class GemstoneSession:
             item = items.at(self.from_py(i))
             py_set.add(item.to_py)
         return py_set
-        
+
+    def resolve_symbol(self, symbol, symbol_list=None):
+        """Resolve a symbol to the object it refers to in a symbol list.
+
+        There is a shorthand for this method. These lines are equivalent::
+
+            session.SymbolName
+            session.resolve_symbol('SymbolName')
+
+        Resolved objects are remembered by the session (per symbol list), so resolving
+        the same symbol again does not communicate with the Gem. What is remembered is
+        forgotten on every abort, begin or commit, or when :meth:`clear_symbol_cache`
+        is called.
+
+        :param symbol: The name of the symbol to resolve, either as a Python string
+                      or a GemStone Symbol object
+        :param symbol_list: The symbol list to use for resolution, defaults to None
+                           (which uses the default symbol list from the user's profile)
+        :return: The object that the symbol refers to
+        :raises GemstoneApiError: If symbol is not a string or GemObject, or if a
+                                 LinkedSession is not the current session
+        :raises GemstoneError: If the symbol cannot be resolved or another error occurs
+        """
+        # Only oops are remembered: holding on to the GemObjects would keep them in the export set
+        key = (symbol.oop if isinstance(symbol, GemObject) else symbol, symbol_list.oop if symbol_list is not None else None)
+        try:
+            return self.get_or_create_gem_object(self.resolved_symbols[key])
+        except (KeyError, TypeError):
+            resolved = self.lookup_symbol(symbol, symbol_list=symbol_list)
+            self.resolved_symbols[key] = resolved.oop
+            return resolved
+
+    def clear_symbol_cache(self):
+        """Forget all objects remembered by :meth:`resolve_symbol` and :meth:`preload`."""
+        self.resolved_symbols.clear()
+
+    def preload(self, names, symbol_list=None):
+        """Resolve many symbols at once, so that later calls to :meth:`resolve_symbol`
+        for them need not communicate with the Gem.
+
+        This is meant to be called right after logging in (or after a transaction
+        boundary) with the names of globals you use often::
+
+            session.preload(['OrderedCollection', 'Dictionary', 'Date'])
+
+        Names that cannot be resolved are skipped.
+
+        :param names: The names of the symbols to resolve, as Python strings.
+        :param symbol_list: The symbol list to use for resolution, defaults to None
+                           (which uses the default symbol list from the user's profile)
+        :return: A dict with the names that could be resolved, and their values.
+        """
+        names = list(names)
+        if not names:
+            return {}
+        symbol_list_key = symbol_list.oop if symbol_list is not None else None
+        # Names that are not found are marked by putting the resolved Array itself in their place
+        source = ('| symbols names resolved | '
+                  'symbols := %s. '
+                  'names := #(%s). '
+                  'resolved := Array new: names size. '
+                  '1 to: names size do: [:i | | association | '
+                  '    association := symbols resolveSymbol: (names at: i). '
+                  '    resolved at: i put: (association isNil ifTrue: [resolved] ifFalse: [association value])]. '
+                  '^resolved') % ('self' if symbol_list is not None else 'GsCurrentSession currentSession symbolList',
+                                  ' '.join(["#'%s'" % name.replace("'", "''") for name in names]))
+        resolved = self.execute(source, context=symbol_list)
+        preloaded = {}
+        for name, value in zip(names, self.object_fetch_elements(resolved, len(names))):
+            if value.oop != resolved.oop:
+                self.resolved_symbols[(name, symbol_list_key)] = value.oop
+                preloaded[name] = value
+        return preloaded
+
+    def helper_block(self, name):
+        try:
+            return self.helper_blocks[name]
+        except KeyError:
+            block = self.keep_beyond_object_scopes(self.execute(smalltalk_helpers[name]))
+            self.helper_blocks[name] = block
+            return block
+
+    def helper(self, name):
+        """Answer what to send to run one of the smalltalk_helpers: a (receiver, selector) pair.
+
+        The receiver is the installed helper library if it is present (see
+        :meth:`install_helper_library`), else a block compiled once in this session.
+        """
+        if not self.helper_library_checked:
+            self.helper_library = self.find_helper_library()
+            self.helper_library_checked = True
+        if self.helper_library is not None:
+            return self.helper_library, helper_selector(name)
+        block = self.helper_block(name)
+        return block, ':'.join(['value'] * helper_arg_count(smalltalk_helpers[name])) + ':'
+
+    def selector_symbol(self, selector):
+        """Answer a GemObject for the Symbol of selector, which is remembered by the session after the first time."""
+        try:
+            return self.selector_symbols[selector]
+        except KeyError:
+            symbol = self.selector_symbols[selector] = self.keep_beyond_object_scopes(self.new_symbol(selector))
+            return symbol
+
+    @serialized
+    def fetch_utf8(self, helper, helper_selector, *args):
+        # Sends one of the helpers that answer UTF-8 bytes, and fetches those bytes along with the
+        # send; if they do not fit, fetches the result the helper kept for that case. The lock is
+        # held throughout, so no other thread's large result can take the place of that result.
+        try:
+            return helper.perform_bytes(helper_selector, self.from_py(self.fused_fetch_size), *args).decode('utf-8')
+        except ResultTooLarge:
+            return self.execute('SessionTemps current removeKey: #ParseltongueLargeResult').to_py
+
+    def find_helper_library(self):
+        """Find the current version of the helper library in the symbol list of this session.
+
+        :return: The helper library class, or None if it is not installed.
+        """
+        library = self.keep_beyond_object_scopes(
+            self.execute("GsCurrentSession currentSession symbolList objectNamed: #'%s'" % helper_library_name))
+        return None if library.is_nil else library
+
+    def install_helper_library(self, symbol_dictionary=None):
+        """Install the Smalltalk code used by features like :meth:`batch` and :meth:`GemObject.perform_to_py`
+        as class methods of a class in the repository.
+
+        Once it is installed (and committed) sessions perform these methods instead of compiling
+        the same code on first use in each session. The class is named for a hash of the code, so
+        that sessions only use a library that matches the version of parseltongue they run. Older
+        versions found in symbol_dictionary are removed.
+
+        This method does not commit.
+
+        :param symbol_dictionary: The SymbolDictionary to install the library in, defaults to None
+                                  (which installs it in UserGlobals)
+        :return: The helper library class.
+        """
+        method_sources = ' '.join(["'%s'" % helper_method_source(name).replace("'", "''") for name in sorted(smalltalk_helpers)])
+        source = ('| symbolList dictionary name library | '
+                  'symbolList := GsCurrentSession currentSession symbolList. '
+                  'dictionary := %s. '
+                  "name := #'%s'. "
+                  "(dictionary keys select: [:each | (each beginsWith: 'ParseltongueHelpers_') and: [each ~= name]]) "
+                  '   do: [:each | dictionary removeKey: each]. '
+                  'library := Object subclass: name instVarNames: #() classVars: #() classInstVars: #() '
+                  '   poolDictionaries: #() inDictionary: dictionary options: #(). '
+                  '#(%s) do: [:each | '
+                  "   library class compileMethod: each dictionaries: symbolList category: 'helpers' environmentId: 0]. "
+                  '^library') % ('self' if symbol_dictionary is not None else 'UserGlobals', helper_library_name, method_sources)
+        self.helper_library = self.keep_beyond_object_scopes(self.execute(source, context=symbol_dictionary))
+        self.helper_library_checked = True
+        return self.helper_library
+
+    def prepare(self, source, arg_names=(), context=None, symbol_list=None):
+        """Compile Smalltalk code once so that it can be run many times with different arguments.
+
+        Use this instead of formatting Python values into the source passed to :meth:`execute`::
+
+            add = session.prepare('a + b', ['a', 'b'])
+            assert add(1, 2).to_py == 3
+
+        Preparing the same source (with the same arguments, context and symbol list) again
+        in a session returns the PreparedStatement compiled the first time, as long as it is
+        among the session.prepared_statement_cache_size statements prepared (or re-prepared)
+        most recently. The blocks of statements that drop out of this cache are released
+        once nothing else refers to them. Set prepared_statement_cache_size to 0 to not cache
+        statements at all, for example if sources are built dynamically.
+
+        :param source: The Smalltalk code, which is compiled as the body of a block.
+        :param arg_names: The names of the arguments used in source.
+        :param context: Optional object which is self in source.
+        :param symbol_list: Optional symbol list for name resolution.
+        :return: A :class:`PreparedStatement`.
+        """
+        key = (source, tuple(arg_names), context.oop if context is not None else None, symbol_list.oop if symbol_list is not None else None)
+        with self.lock:
+            statement = self.prepared_statements.get(key)
+            if statement is not None:
+                self.prepared_statements.move_to_end(key)
+                return statement
+        statement = PreparedStatement(self, source, arg_names=arg_names, context=context, symbol_list=symbol_list)
+        with self.lock:
+            self.prepared_statements[key] = statement
+            while len(self.prepared_statements) > self.prepared_statement_cache_size:
+                self.prepared_statements.popitem(last=False)
+        return statement
+
+    def execute_to_str(self, source, context=None, symbol_list=None, max_size=None):
+        """Execute Smalltalk code whose result is a String (of any kind), and answer that
+        String as a Python str, fetched in the same call as the execution::
+
+            document = session.execute_to_str('App current customers asJson')
+
+        The source is run as the body of a block, so it should not use ^ to return
+        its result.
+
+        :param source: The Smalltalk code to execute, as a Python string.
+        :param context: Optional object which is self in source.
+        :param symbol_list: The symbol list to use for name resolution, defaults to None
+                           (which uses the default symbol list from the user's profile)
+        :param max_size: The maximum size (in UTF-8 bytes) expected, defaults to session.fused_fetch_size
+        :return: The result as a Python str.
+        """
+        return self.execute_to_bytes('[%s] value encodeAsUTF8' % source, context=context,
+                                     symbol_list=symbol_list, max_size=max_size).decode('utf-8')
+
+    @property
+    def repository(self):
+        """The name of the stone this session is logged in to, which identifies its repository
+        in :class:`PersistentReference` objects."""
+        if self.repository_name is None:
+            self.repository_name = self.execute_to_str('System stoneName')
+        return self.repository_name
+
+    def persistent_references(self, gem_objects):
+        """Answer a :class:`PersistentReference` for each of the given GemObjects (see
+        :meth:`GemObject.persistent_reference`), checking that they are committed in one round trip.
+
+        :param gem_objects: GemObjects that represent committed objects.
+        :return: A list of PersistentReferences, in the order of gem_objects.
+        :raises GemstoneApiError: If any of the objects has not been committed.
+        """
+        oops = [i.oop for i in gem_objects if not GCI_OOP_IS_SPECIAL(i.oop)]
+        if oops:
+            objects = self.new_array_of_oops(oops)
+            uncommitted = self.execute('self reject: [:each | each isCommitted]', context=objects).size().to_py
+            if uncommitted:
+                raise GemstoneApiError('%s of the objects have not been committed' % uncommitted)
+        return [PersistentReference(i.oop, self.repository) for i in gem_objects]
+
+    def attach(self, reference):
+        """Answer the GemObject for a :class:`PersistentReference` obtained in this or another session.
+
+        :param reference: A PersistentReference to an object in the repository of this session.
+        :return: A GemObject.
+        :raises GemstoneApiError: If reference refers to an object in another repository.
+        """
+        return self.attach_all([reference])[0]
+
+    @serialized
+    def attach_all(self, references):
+        """Answer the GemObjects for many :class:`PersistentReference` objects at once.
+
+        The objects are added to the export set of this session in one call, without
+        looking them up from some root.
+
+        :param references: PersistentReferences to objects in the repository of this session.
+        :return: A list of GemObjects, in the order of references.
+        :raises GemstoneApiError: If any reference refers to an object in another repository.
+        """
+        for reference in references:
+            if reference.repository != self.repository:
+                raise GemstoneApiError('Reference to oop %s is for repository %s, not %s' % (reference.oop, reference.repository, self.repository))
+        oops = [i.oop for i in references if not GCI_OOP_IS_SPECIAL(i.oop)]
+        if oops:
+            self.save_oops(oops)
+        return [self.get_or_create_gem_object(i.oop) for i in references]
+
+    @contextmanager
+    def batch(self):
+        """Collect independent message sends in a :class:`SendBatch`, and send them all
+        to the Gem at the end of the with block::
+
+            with session.batch() as batch:
+                batch.perform(account, 'balance')
+                batch.perform(user_globals, 'at:', some_key)
+            balance, value = batch.results
+
+        If the with block is left because of an exception, nothing is sent.
+
+        :return: A context manager yielding the :class:`SendBatch`.
+        """
+        batch = SendBatch(self)
+        yield batch
+        batch.send()
+
+    @contextmanager
+    def object_scope(self, release_all=False):
+        """Release the objects of all GemObjects created inside the with block from the export set when it ends.
+
+        Python can then forget these GemObjects at will, instead of them being released in batches
+        as Python collects them. Objects needed after the block should be kept using :meth:`ObjectScope.keep`::
+
+            with session.object_scope() as scope:
+                for customer in customers:
+                    invoice = customer.newInvoice()
+                    if invoice.isOverdue().to_py:
+                        scope.keep(invoice)
+
+        GemObjects that are used after their scope ended without having been kept refer to
+        objects the Gem need not hold on to anymore.
+
+        Scopes can be nested. A GemObject kept in a nested scope belongs to the scope enclosing it.
+        A scope only collects the GemObjects created by the thread that opened it.
+
+        :param release_all: If True, clear the whole export set when the block ends (using a single
+                            call), and then add back the objects of all GemObjects still alive that were
+                            not created inside the block. This is cheaper if few GemObjects outside of
+                            the block are alive.
+        :return: A context manager yielding an :class:`ObjectScope`.
+        """
+        scope = ObjectScope(self, enclosing=self.object_scopes[-1] if self.object_scopes else None, release_all=release_all)
+        self.object_scopes.append(scope)
+        try:
+            yield scope
+        finally:
+            self.object_scopes.pop()
+            scope.release()
+
+    @contextmanager
+    def deadline(self, seconds, grace=2):
+        """Break off calls to the Gem made inside the with block that are still running when
+        the given number of seconds have passed since the block was entered::
+
+            with session.deadline(30):
+                report = session.execute('Reports generateMonthly')
+
+        When the deadline passes, a soft break is sent to the session (see `soft_break`). If
+        the call has not ended grace seconds later, a hard break is sent (see `hard_break`). The
+        call that was broken off raises a :class:`GemstoneTimeout`, and the stack of the Smalltalk
+        process it ran in is cleared, so the session can be used afterwards.
+
+        The deadline is watched by a separate thread, which is stopped when the block ends. Ending
+        the block waits for a break that is being sent at that moment, so no break is sent
+        after the block has ended.
+
+        :param seconds: The number of seconds the block is allowed.
+        :param grace: The number of seconds to wait for a soft break to take effect before
+                      sending a hard break, or None to never send a hard break.
+        :return: A context manager yielding the :class:`Deadline`.
+        """
+        deadline = Deadline(self, seconds, grace)
+        deadline.start()
+        try:
+            yield deadline
+        except GemstoneError as ex:
+            deadline.cancel()
+            if deadline.expired and not isinstance(ex, GemstoneTimeout):
+                raise deadline.timed_out(ex) from ex
+            raise
+        finally:
+            deadline.cancel()
+
+    def kept_gem_objects(self):
+        """Answer the GemObjects the session holds on to itself, such as compiled helpers, prepared
+        statements and the Symbols of CallSites."""
+        kept = list(self.helper_blocks.values()) + list(self.selector_symbols.values())
+        if self.helper_library is not None:
+            kept.append(self.helper_library)
+        kept.extend(statement.block for statement in self.prepared_statements.values())
+        return kept
+
+    @serialized
+    def forget_gem_objects(self):
+        """Release all objects from the export set, and forget all GemObjects, except those the session
+        holds on to itself (see :meth:`kept_gem_objects`).
+
+        GemObjects obtained from the session before should not be used afterwards.
+        """
+        kept = self.kept_gem_objects()
+        self.release_all_oops()
+        self.deallocated_unfreed_gemstone_objects.clear()
+        self.instances = IdentityMap()
+        for gem_object in kept:
+            self.instances.add(gem_object)
+        kept_oops = [i.oop for i in kept if not GCI_OOP_IS_SPECIAL(i.oop)]
+        if kept_oops:
+            self.save_oops(kept_oops)
+
+    def keep_beyond_object_scopes(self, gem_object):
+        for scope in self.object_scopes:
+            scope.oops.discard(gem_object.oop)
+        return gem_object
+
+    def method(self, selector):
+        """Obtain a :class:`CallSite` for sending the given selector repeatedly.
+
+        Use this instead of sending messages via GemObject attributes in loops that send
+        the same message to many receivers::
+
+            size = session.method('size')
+            sizes = [size(i).to_py for i in collections]
+
+        :param selector: The Smalltalk selector, spelt as in Smalltalk (eg, 'at:put:').
+        :return: A :class:`CallSite` for the selector.
+        """
+        return CallSite(self, selector)
+
     def __getattr__(self, name):
         return self.resolve_symbol(name)
 
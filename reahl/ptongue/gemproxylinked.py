@@ -24,12 +24,14 @@ a gem embedded in the calling process.
 """
 import ctypes
 from contextlib import contextmanager
-from atexit import register
+from atexit import register, unregister
+import os
 import warnings
 from ctypes import cdll, CDLL, create_string_buffer
 
 from .gemstone import *
-from .gemproxy import GemstoneLibrary, GemstoneWarning, GemstoneSession, to_c_bytes, GemstoneError, GemstoneApiError, GemObject
+from .gemproxy import GemstoneLibrary, GemstoneWarning, GemstoneSession, to_c_bytes, GemstoneError, GemstoneApiError, GemObject, \
+    ResultTooLarge, serialized
 
 
 is_gembuilder_initialised = False
@@ -41,141 +43,49 @@ class GciLnk(GemstoneLibrary):
     short_name = 'gcilnk'
     min_version = '3.4.0'
     max_version = '3.7.9999'
-    
-    def __init__(self, lib_path):
-        super().__init__(lib_path)
-
-        self.GciSetNet = self.library.GciSetNet
-        self.GciSetNet.restype = None
-        self.GciSetNet.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
-
-        self.GciInit = self.library.GciInit
-        self.GciInit.restype = BoolType
-        self.GciInit.argtypes = []
-
-        self.GciShutdown = self.library.GciShutdown
-        self.GciShutdown.restype = None
-        self.GciShutdown.argtypes = []
-
-        self.GciEncrypt = self.library.GciEncrypt
-        self.GciEncrypt.restype = ctypes.c_char_p
-        self.GciEncrypt.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint]
-
-        self.GciLoginEx = self.library.GciLoginEx
-        self.GciLoginEx.restype = BoolType
-        self.GciLoginEx.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint, ctypes.c_int]
-
-        self.GciLogout = self.library.GciLogout
-        self.GciLogout.restype = None
-        self.GciLogout.argtypes = []
-
-        self.GciErr = self.library.GciErr
-        self.GciErr.restype = BoolType
-        self.GciErr.argtypes = [ctypes.POINTER(GciErrSType)]
-
-        self.GciBegin = self.library.GciBegin
-        self.GciBegin.restype = None
-        self.GciBegin.argtypes = []
-
-        self.GciAbort = self.library.GciAbort
-        self.GciAbort.restype = None
-        self.GciAbort.argtypes = []
-
-        self.GciCommit = self.library.GciCommit
-        self.GciCommit.restype = BoolType
-        self.GciCommit.argtypes = []
-
-        self.GciGetSessionId = self.library.GciGetSessionId
-        self.GciGetSessionId.restype = GciSessionIdType
-        self.GciGetSessionId.argtypes = []
-
-        self.GciReleaseOops = self.library.GciReleaseOops
-        self.GciReleaseOops.restype = None
-        self.GciReleaseOops.argtypes = [ctypes.POINTER(OopType), ctypes.c_int]
-
-        self.GciIsRemote = self.library.GciIsRemote
-        self.GciIsRemote.restype = BoolType
-        self.GciIsRemote.argtypes = []
-
-        self.GciSessionIsRemote = self.library.GciSessionIsRemote
-        self.GciSessionIsRemote.restype = BoolType
-        self.GciSessionIsRemote.argtypes = []
-
-        self.GciIsKindOf = self.library.GciIsKindOf
-        self.GciIsKindOf.restype = BoolType
-        self.GciIsKindOf.argtypes = [OopType, OopType]
-
-        self.GciExecuteStrFromContext = self.library.GciExecuteStrFromContext
-        self.GciExecuteStrFromContext.restype = OopType
-        self.GciExecuteStrFromContext.argtypes = [ctypes.c_char_p, OopType, OopType]
-
-        self.GciExecuteFromContext = self.library.GciExecuteFromContext
-        self.GciExecuteFromContext.restype = OopType
-        self.GciExecuteFromContext.argtypes = [OopType, OopType, OopType]
-
-        self.GciPerform = self.library.GciPerform
-        self.GciPerform.restype = OopType
-        self.GciPerform.argtypes = [OopType, ctypes.c_char_p, ctypes.POINTER(OopType), ctypes.c_int]
-
-        self.GciPerformSymDbg = self.library.GciPerformSymDbg
-        self.GciPerformSymDbg.restype = OopType
-        self.GciPerformSymDbg.argtypes = [OopType, OopType, ctypes.POINTER(OopType), ctypes.c_int, ctypes.c_int]
-
-        self.GciNewSymbol = self.library.GciNewSymbol
-        self.GciNewSymbol.restype = OopType
-        self.GciNewSymbol.argtypes = [ctypes.c_char_p]
-
-        self.GciResolveSymbol = self.library.GciResolveSymbol
-        self.GciResolveSymbol.restype = OopType
-        self.GciResolveSymbol.argtypes = [ctypes.c_char_p, OopType]
-
-        self.GciResolveSymbolObj = self.library.GciResolveSymbolObj
-        self.GciResolveSymbolObj.restype = OopType
-        self.GciResolveSymbolObj.argtypes = [OopType, OopType]
-
-        self.GciFetchClass = self.library.GciFetchClass
-        self.GciFetchClass.restype = OopType
-        self.GciFetchClass.argtypes = [OopType]
-
-        self.GciFetchBytes_ = self.library.GciFetchBytes_
-        self.GciFetchBytes_.restype = int64
-        self.GciFetchBytes_.argtypes = [OopType, int64, ctypes.POINTER(ByteType), int64]
-
-        self.GciFetchUtf8Bytes_ = self.library.GciFetchUtf8Bytes_
-        self.GciFetchUtf8Bytes_.restype = int64
-        self.GciFetchUtf8Bytes_.argtypes = [OopType, int64, ctypes.POINTER(ByteType), int64, ctypes.POINTER(OopType), ctypes.c_int]
-
-        self.GciOopToFlt = self.library.GciOopToFlt
-        self.GciOopToFlt.restype = ctypes.c_double
-        self.GciOopToFlt.argtypes = [OopType]
-
-        self.GciNewUtf8String = self.library.GciNewUtf8String
-        self.GciNewUtf8String.restype = OopType
-        self.GciNewUtf8String.argtypes = [ctypes.c_char_p, BoolType]
-
-        self.GciFltToOop = self.library.GciFltToOop
-        self.GciFltToOop.restype = OopType
-        self.GciFltToOop.argtypes = [ctypes.c_double]
 
-        self.GciContinueWith = self.library.GciContinueWith
-        self.GciContinueWith.restype = OopType
-        self.GciContinueWith.argtypes = [OopType, OopType, ctypes.c_int, ctypes.POINTER(GciErrSType)]
-
-        self.GciClearStack = self.library.GciClearStack
-        self.GciClearStack.restype = None
-        self.GciClearStack.argtypes = [OopType]
-
-        self.GciSetHaltOnError = self.library.GciSetHaltOnError
-        self.GciSetHaltOnError.restype = ctypes.c_int
-        self.GciSetHaltOnError.argtypes = [ctypes.c_int]
-
-        self.GciSoftBreak = self.library.GciSoftBreak
-        self.GciSoftBreak.restype = None
-        self.GciSoftBreak.argtypes = []
-
-        self.GciHardBreak = self.library.GciHardBreak
-        self.GciHardBreak.restype = None
-        self.GciHardBreak.argtypes = []
+    prototypes = {
+        'GciSetNet': (None, [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]),
+        'GciInit': (BoolType, []),
+        'GciShutdown': (None, []),
+        'GciEncrypt': (ctypes.c_char_p, [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint]),
+        'GciLoginEx': (BoolType, [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint, ctypes.c_int]),
+        'GciLogout': (None, []),
+        'GciErr': (BoolType, [ctypes.POINTER(GciErrSType)]),
+        'GciBegin': (None, []),
+        'GciAbort': (None, []),
+        'GciCommit': (BoolType, []),
+        'GciGetSessionId': (GciSessionIdType, []),
+        'GciReleaseOops': (None, [ctypes.POINTER(OopType), ctypes.c_int]),
+        'GciReleaseAllOops': (None, []),
+        'GciIsRemote': (BoolType, []),
+        'GciSessionIsRemote': (BoolType, []),
+        'GciIsKindOf': (BoolType, [OopType, OopType]),
+        'GciExecuteStrFromContext': (OopType, [ctypes.c_char_p, OopType, OopType]),
+        'GciExecuteStrFetchBytes': (int64, [ctypes.c_char_p, int64, OopType, OopType, OopType, ctypes.POINTER(ByteType), int64]),
+        'GciExecuteFromContext': (OopType, [OopType, OopType, OopType]),
+        'GciPerform': (OopType, [OopType, ctypes.c_char_p, ctypes.POINTER(OopType), ctypes.c_int]),
+        'GciPerformSymDbg': (OopType, [OopType, OopType, ctypes.POINTER(OopType), ctypes.c_int, ctypes.c_int]),
+        'GciPerformFetchBytes': (int64, [OopType, ctypes.c_char_p, ctypes.POINTER(OopType), ctypes.c_int, ctypes.POINTER(ByteType), int64]),
+        'GciNewSymbol': (OopType, [ctypes.c_char_p]),
+        'GciResolveSymbol': (OopType, [ctypes.c_char_p, OopType]),
+        'GciResolveSymbolObj': (OopType, [OopType, OopType]),
+        'GciFetchClass': (OopType, [OopType]),
+        'GciFetchBytes_': (int64, [OopType, int64, ctypes.POINTER(ByteType), int64]),
+        'GciFetchUtf8Bytes_': (int64, [OopType, int64, ctypes.POINTER(ByteType), int64, ctypes.POINTER(OopType), ctypes.c_int]),
+        'GciOopToFlt': (ctypes.c_double, [OopType]),
+        'GciNewUtf8String': (OopType, [ctypes.c_char_p, BoolType]),
+        'GciFltToOop': (OopType, [ctypes.c_double]),
+        'GciFetchOops': (ctypes.c_int, [OopType, int64, ctypes.POINTER(OopType), ctypes.c_int]),
+        'GciSaveObjs': (None, [ctypes.POINTER(OopType), ctypes.c_int]),
+        'GciNewOop': (OopType, [OopType]),
+        'GciStoreOops': (None, [OopType, int64, ctypes.POINTER(OopType), ctypes.c_int]),
+        'GciContinueWith': (OopType, [OopType, OopType, ctypes.c_int, ctypes.POINTER(GciErrSType)]),
+        'GciClearStack': (None, [OopType]),
+        'GciSetHaltOnError': (ctypes.c_int, [ctypes.c_int]),
+        'GciSoftBreak': (None, []),
+        'GciHardBreak': (None, []),
+    }
 
 
 GemstoneLibrary.register(GciLnk)
@@ -204,6 +114,18 @@ def get_current_linked_session():
     global current_linked_session
     return current_linked_session
 
+def reset_gembuilder_after_fork():
+    # A forked child process has to initialise GemBuilder (and log in) itself: it cannot
+    # use the linked session of its parent, nor shut down GemBuilder on its parent's behalf
+    global is_gembuilder_initialised
+    global current_linked_session
+    unregister(gembuilder_dealloc)
+    is_gembuilder_initialised = False
+    current_linked_session = None
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_gembuilder_after_fork)
+
 #======================================================================================================================
 class LinkedSession(GemstoneSession):
     """
@@ -259,17 +181,34 @@ class LinkedSession(GemstoneSession):
             encrypted_char = gci.GciEncrypt(unencrypted_password.encode('utf-8'), out_buff, out_buff_size)
         return out_buff.value
 
-    def remove_dead_gemstone_objects(self):
-        error = GciErrSType()
-        unreferenced_gemstone_objects = [oop for oop in self.deallocated_unfreed_gemstone_objects if oop not in self.instances]
-        if unreferenced_gemstone_objects:
-            dead_oop_count = len(unreferenced_gemstone_objects)
-            c_dead_oops = (OopType * dead_oop_count)(*unreferenced_gemstone_objects)
-            gci.GciReleaseOops(c_dead_oops, dead_oop_count)
-            if gci.GciErr(ctypes.byref(error)):
-                raise GemstoneError(self, error)
-        self.deallocated_unfreed_gemstone_objects.clear()
+    @serialized
+    def release_oops(self, oops):
+        error = self.error_struct
+        c_oops = (OopType * len(oops))(*oops)
+        gci.GciReleaseOops(c_oops, len(oops))
+        if gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
 
+    @serialized
+    def release_all_oops(self):
+        if not self.is_current_session:
+            raise GemstoneApiError('Expected session to be the current session.')
+        error = self.error_struct
+        gci.GciReleaseAllOops()
+        if gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+
+    @serialized
+    def save_oops(self, oops):
+        if not self.is_current_session:
+            raise GemstoneApiError('Expected session to be the current session.')
+        error = self.error_struct
+        c_oops = (OopType * len(oops))(*oops)
+        gci.GciSaveObjs(c_oops, len(oops))
+        if gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+
+    @serialized
     def abort(self):
         """
         Abort the current transaction.
@@ -279,13 +218,16 @@ class LinkedSession(GemstoneSession):
         :raises GemstoneApiError: If this session is not the current active session
         :raises GemstoneError: If an error occurs during the GemStone operation
         """
-        error = GciErrSType()
+        error = self.error_struct
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
+        self.clear_symbol_cache()
+        self.remove_dead_gemstone_objects()
         gci.GciAbort()
         if gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
 
+    @serialized
     def begin(self):
         """
         Begin a new transaction.
@@ -295,13 +237,16 @@ class LinkedSession(GemstoneSession):
         :raises GemstoneApiError: If this session is not the current active session
         :raises GemstoneError: If an error occurs during the GemStone operation
         """
-        error = GciErrSType()
+        error = self.error_struct
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
+        self.clear_symbol_cache()
+        self.remove_dead_gemstone_objects()
         gci.GciBegin()
         if gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
 
+    @serialized
     def commit(self):
         """
         Commit the current transaction.
@@ -311,9 +256,11 @@ class LinkedSession(GemstoneSession):
         :raises GemstoneApiError: If this session is not the current active session
         :raises GemstoneError: If the commit fails or an error occurs during the GemStone operation
         """
-        error = GciErrSType()
+        error = self.error_struct
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
+        self.clear_symbol_cache()
+        self.remove_dead_gemstone_objects()
         if not gci.GciCommit() and gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
 
@@ -364,7 +311,7 @@ class LinkedSession(GemstoneSession):
         :raises GemstoneApiError: If this session is not the current active session
         :raises GemstoneError: If an error occurs during the GemStone operation
         """
-        error = GciErrSType()
+        error = self.error_struct
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
         session_is_remote = gci.GciSessionIsRemote()
@@ -393,8 +340,9 @@ class LinkedSession(GemstoneSession):
         global current_linked_session
         return self is current_linked_session
 
+    @serialized
     def py_to_string_(self, py_str):
-        error = GciErrSType()
+        error = self.error_struct
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
         return_oop = gci.GciNewUtf8String(py_str.encode('utf-8'), True)
@@ -402,16 +350,18 @@ class LinkedSession(GemstoneSession):
             raise GemstoneError(self, error)
         return return_oop
 
+    @serialized
     def py_to_float_(self, py_float):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = gci.GciFltToOop(py_float)
         if return_oop == OOP_NIL.value and gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
         return return_oop
 
-    def execute(self, source, context=None, symbol_list=None):
+    @serialized
+    def execute(self, source, context=None, symbol_list=None, timeout=None):
         """
         Execute GemStone Smalltalk code.
         
@@ -421,26 +371,67 @@ class LinkedSession(GemstoneSession):
                        (which uses the default nil context)
         :param symbol_list: The symbol list to use for name resolution, defaults to None
                            (which uses the default symbol list from the user\'s profile)
+        :param timeout: If given, the number of seconds the code may run before it is
+                        broken off (see :meth:`~reahl.ptongue.GemstoneSession.deadline`)
         :return: The result of executing the Smalltalk code
         :raises GemstoneApiError: If this session is not the current active session,
                                  or if the source is not of the expected type
+        :raises GemstoneTimeout: If the code ran longer than timeout
         :raises GemstoneError: If an error occurs during execution
         """
+        if timeout is not None:
+            with self.deadline(timeout):
+                return self.execute(source, context=context, symbol_list=symbol_list)
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
         if isinstance(source, str):
-            return_oop = gci.GciExecuteStrFromContext(source.encode('utf-8'), context.oop if context else OOP_NO_CONTEXT, 
-                                                      symbol_list.oop if symbol_list else OOP_NIL)
+            return_oop = gci.GciExecuteStrFromContext(source.encode('utf-8'), context.oop if context is not None else OOP_NO_CONTEXT, 
+                                                      symbol_list.oop if symbol_list is not None else OOP_NIL)
         elif isinstance(source, GemObject):
-            return_oop = gci.GciExecuteFromContext(source.oop, context.oop if context else OOP_NO_CONTEXT, 
-                                                   symbol_list.oop if symbol_list else OOP_NIL)
+            return_oop = gci.GciExecuteFromContext(source.oop, context.oop if context is not None else OOP_NO_CONTEXT, 
+                                                   symbol_list.oop if symbol_list is not None else OOP_NIL)
         else:
             raise GemstoneApiError('Source is type {}.Expected source to be a str or GemObject'.format(source.__class__.__name__))
         if return_oop == OOP_NIL.value and gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
+    def execute_to_bytes(self, source, context=None, symbol_list=None, max_size=None):
+        """
+        Execute GemStone Smalltalk code whose result is a byte object (such as a String
+        or ByteArray), and fetch the bytes of that result in the same call.
+        
+        :param source: The Smalltalk code to execute, as a Python string
+        :param context: The context object in which to execute the code, defaults to None
+                       (which uses the default nil context)
+        :param symbol_list: The symbol list to use for name resolution, defaults to None
+                           (which uses the default symbol list from the user\'s profile)
+        :param max_size: The maximum number of bytes expected, defaults to session.fused_fetch_size
+        :return: The bytes of the result of executing the Smalltalk code
+        :raises GemstoneApiError: If this session is not the current active session
+        :raises ResultTooLarge: If the result is max_size bytes or larger
+        :raises GemstoneError: If an error occurs during execution
+        """
+        if not self.is_current_session:
+            raise GemstoneApiError('Expected session to be the current session.')
+        max_size = max_size or self.fused_fetch_size
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
+        dest = self.byte_buffer(max_size)
+        bytes_returned = gci.GciExecuteStrFetchBytes(source.encode('utf-8'), -1, OOP_CLASS_Utf8,
+                                                     context.oop if context is not None else OOP_NO_CONTEXT,
+                                                     symbol_list.oop if symbol_list is not None else OOP_NIL,
+                                                     dest, max_size)
+        if bytes_returned <= 0 and gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+        if bytes_returned == max_size:
+            raise ResultTooLarge('The result may be larger than {} bytes'.format(max_size))
+        return ctypes.string_at(dest, bytes_returned)
+
+    @serialized
     def new_symbol(self, py_string):
         """
         Create a new GemStone Symbol object.
@@ -452,43 +443,28 @@ class LinkedSession(GemstoneSession):
         """
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = gci.GciNewSymbol(py_string.encode('utf-8'))
         if gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
-    def resolve_symbol(self, symbol, symbol_list=None):
-        """
-        Resolve a symbol to its value in a symbol dictionary.
-
-        There is a shorthand for this method. These lines are equivalent::
-        
-            session.SymbolName
-            session.resolve_symbol('SymbolName')
-        
-        :param symbol: The name of the symbol to resolve, either as a Python string
-                      or a GemStone Symbol object
-        :param symbol_list: The symbol list to use for resolution, defaults to None
-                           (which uses the default symbol list from the user's profile)
-        :return: The object that the symbol refers to
-        :raises GemstoneApiError: If this session is not the current active session,
-                                 or if symbol is not of the expected type
-        :raises GemstoneError: If the symbol cannot be resolved or another error occurs
-        """
+    @serialized
+    def lookup_symbol(self, symbol, symbol_list=None):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        error = self.error_struct
         if isinstance(symbol, str):
-            return_oop = gci.GciResolveSymbol(symbol.encode('utf-8') , symbol_list.oop if symbol_list else OOP_NIL)
+            return_oop = gci.GciResolveSymbol(symbol.encode('utf-8') , symbol_list.oop if symbol_list is not None else OOP_NIL)
         elif isinstance(symbol, GemObject):
-            return_oop = gci.GciResolveSymbolObj(symbol.oop, symbol_list.oop if symbol_list else OOP_NIL)
+            return_oop = gci.GciResolveSymbolObj(symbol.oop, symbol_list.oop if symbol_list is not None else OOP_NIL)
         else:
             raise GemstoneApiError('Symbol is type {}.Expected symbol to be a str or GemObject'.format(symbol.__class__.__name__))
         if return_oop == OOP_ILLEGAL.value and gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
         
+    @serialized
     def log_out(self):
         """
         Log out from the GemStone session.
@@ -500,7 +476,9 @@ class LinkedSession(GemstoneSession):
         """
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        self.clear_symbol_cache()
+        self.deallocated_unfreed_gemstone_objects.clear()
+        error = self.error_struct
         gci.GciLogout()
         if gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
@@ -508,50 +486,55 @@ class LinkedSession(GemstoneSession):
         global current_linked_session
         current_linked_session = None
 
+    @serialized
     def object_is_kind_of(self, instance, a_class):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        error = self.error_struct
         is_kind_of_result = gci.GciIsKindOf(instance.oop, a_class.oop)
         if is_kind_of_result == False and gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
         return bool(is_kind_of_result)
 
+    @serialized
     def object_gemstone_class(self, instance):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = gci.GciFetchClass(instance.oop)
         if return_oop == OOP_NIL.value and gci.GciErr(ctypes.byref(error)):
            raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
     def object_float_to_py(self, instance):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        error = GciErrSType()
+        error = self.error_struct
         result = gci.GciOopToFlt(instance.oop)
         if result != result and gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
         return result
 
+    @serialized
     def object_string_to_py(self, instance):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
         start_index = 1
         num_bytes  = self.initial_fetch_size
         bytes_returned = num_bytes
-        error = GciErrSType()
+        error = self.error_struct
         py_bytes = b''
         utf8_string = OopType(OOP_NIL.value)
 
+        dest = self.byte_buffer(num_bytes + 1)
+
         while bytes_returned == num_bytes:
-            dest = (ByteType * (num_bytes + 1))()
             bytes_returned = gci.GciFetchUtf8Bytes_(instance.oop, start_index, dest, num_bytes, ctypes.byref(utf8_string), 0)
             if bytes_returned == 0 and gci.GciErr(ctypes.byref(error)):
                 raise GemstoneError(self, error)
 
-            py_bytes += bytearray(dest[:bytes_returned])
+            py_bytes += ctypes.string_at(dest, bytes_returned)
             start_index = start_index + num_bytes
             if utf8_string.value != OOP_NIL.value:
                 gci.GciReleaseOops(ctypes.byref(utf8_string), 1)
@@ -562,6 +545,7 @@ class LinkedSession(GemstoneSession):
     def object_latin1_to_py(self, instance):
         return self.object_bytes_to_py(instance).decode('latin-1')
 
+    @serialized
     def object_bytes_to_py(self, instance):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
@@ -569,28 +553,30 @@ class LinkedSession(GemstoneSession):
         start_index = 1
         num_bytes  = self.initial_fetch_size
         bytes_returned = num_bytes
-        error = GciErrSType()
+        error = self.error_struct
 
         py_bytes = b''
+        dest = self.byte_buffer(num_bytes + 1)
         while bytes_returned == num_bytes:
-            dest = (ByteType * (num_bytes + 1))()
             bytes_returned = gci.GciFetchBytes_(instance.oop, start_index, dest, num_bytes)
             if bytes_returned == 0 and gci.GciErr(ctypes.byref(error)):
                 raise GemstoneError(self, error)
 
-            py_bytes +=  bytearray(dest[:bytes_returned])
+            py_bytes += ctypes.string_at(dest, bytes_returned)
             start_index = start_index + num_bytes
         return py_bytes
 
+    @serialized
     def object_perform(self, instance, selector, *args):
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
         if not isinstance(selector, (str, GemObject)):
             raise GemstoneApiError('Selector is type {}.Expected selector to be a str or GemObject'.format(selector.__class__.__name__))
-        error = GciErrSType()
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
         if not self.is_current_session:
             raise GemstoneApiError('Expected session to be the current session.')
-        cargs = (OopType * len(args))(*[i.oop for i in args])
+        cargs = self.argument_array(args)
 
         if isinstance(selector, str):
             return_oop = gci.GciPerform(instance.oop, selector.encode('utf-8'), cargs, len(args))
@@ -601,15 +587,73 @@ class LinkedSession(GemstoneSession):
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
+    def object_perform_fetch_bytes(self, instance, selector, args, max_size):
+        if not self.is_current_session:
+            raise GemstoneApiError('Expected session to be the current session.')
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
+        cargs = self.argument_array(args)
+        dest = self.byte_buffer(max_size)
+        bytes_returned = gci.GciPerformFetchBytes(instance.oop, selector.encode('utf-8'), cargs, len(args), dest, max_size)
+        if bytes_returned <= 0 and gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+        if bytes_returned == max_size:
+            raise ResultTooLarge('The result of {} may be larger than {} bytes'.format(selector, max_size))
+        return ctypes.string_at(dest, bytes_returned)
+
+    @serialized
+    def object_perform_symbol(self, instance, selector_symbol, c_args, arg_count):
+        if not self.is_current_session:
+            raise GemstoneApiError('Expected session to be the current session.')
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
+        return_oop = gci.GciPerformSymDbg(instance.oop, selector_symbol.oop, c_args, arg_count, 0)
+        if return_oop == OOP_NIL.value and gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+        return self.get_or_create_gem_object(return_oop)
+
+    @serialized
+    def new_array_of_oops(self, oops):
+        if not self.is_current_session:
+            raise GemstoneApiError('Expected session to be the current session.')
+        error = self.error_struct
+        array_oop = gci.GciNewOop(OOP_CLASS_ARRAY)
+        if array_oop == OOP_NIL.value and gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+        array = self.get_or_create_gem_object(array_oop)
+        if oops:
+            c_oops = (OopType * len(oops))(*oops)
+            gci.GciStoreOops(array_oop, 1, c_oops, len(oops))
+            if gci.GciErr(ctypes.byref(error)):
+                raise GemstoneError(self, error)
+        return array
+
+    @serialized
+    def object_fetch_elements(self, instance, count):
+        if not self.is_current_session:
+            raise GemstoneApiError('Expected session to be the current session.')
+        error = self.error_struct
+        c_oops = (OopType * count)()
+        fetched = gci.GciFetchOops(instance.oop, 1, c_oops, count)
+        if fetched < count and gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+        gci.GciSaveObjs(c_oops, fetched)
+        if gci.GciErr(ctypes.byref(error)):
+            raise GemstoneError(self, error)
+        return [self.get_or_create_gem_object(oop) for oop in c_oops[:fetched]]
+
+    @serialized
     def object_continue_with(self, gemstone_process, continue_with_error_oop, replace_top_of_stack_oop):
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = gci.GciContinueWith(gemstone_process.oop, replace_top_of_stack_oop, 0, continue_with_error_oop)
         if return_oop == OOP_ILLEGAL.value and gci.GciErr(ctypes.byref(error)):
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
     def object_clear_stack(self, gemstone_process):
-        error = GciErrSType()
+        error = self.error_struct
         success = gci.GciClearStack(gemstone_process.oop)
         if gci.GciErr(ctypes.byref(error)):        
             raise GemstoneError(self, error)
@@ -20,6 +20,18 @@ RPC Sessions
 
 This module provides thread-safe remote procedure call (RPC) connectivity to 
 GemStone/S 64 Bit object databases.
+
+Each RPCSession has its own connection to its own Gem. Calls into the GemStone
+library release the GIL, so threads that each use their own RPCSession run in
+parallel, also on free-threaded builds of Python. Threads that share an RPCSession
+take turns: every call to the Gem holds the session's lock. The exceptions are
+:meth:`RPCSession.soft_break` and :meth:`RPCSession.hard_break`, which are meant to
+be called from another thread while a call is in progress, and the probes
+:attr:`RPCSession.is_logged_in` and :attr:`RPCSession.is_remote`, which answer
+right away even while another thread's call is in progress.
+
+An :class:`~reahl.ptongue.AsyncRPCSession` holds the lock of its RPCSession while
+an asynchronous call is in progress, so other threads can share that RPCSession too.
 """
 import ctypes
 import os
@@ -27,118 +39,56 @@ import warnings
 
 from .gemstone import *
 from .gemproxy import GemstoneLibrary, GemObject, GemstoneSession, GemstoneError, to_c_bytes, InvalidSession, \
-    GemstoneApiError, GemstoneWarning
+    GemstoneApiError, GemstoneWarning, ResultTooLarge, serialized
 
 
 class GciTs(GemstoneLibrary):
     short_name = 'gcits'
 
+    prototypes = {
+        'GciTsEncrypt': (ctypes.c_char_p, [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]),
+        'GciTsLogout': (BoolType, [GciSession, ctypes.POINTER(GciErrSType)]),
+        'GciTsSessionIsRemote': (ctypes.c_int, [GciSession]),
+        'GciTsExecute': (OopType, [GciSession, ctypes.c_char_p, OopType, OopType, OopType, ctypes.c_int, ctypes.c_ushort, ctypes.POINTER(GciErrSType)]),
+        'GciTsPerform': (OopType, [GciSession, OopType, OopType, ctypes.c_char_p, ctypes.POINTER(OopType), ctypes.c_int, ctypes.c_int, ctypes.c_ushort, ctypes.POINTER(GciErrSType)]),
+        'GciTsPerformFetchBytes': (ctypes.c_int64, [GciSession, OopType, ctypes.c_char_p, ctypes.POINTER(OopType), ctypes.c_int, ctypes.POINTER(ByteType), ctypes.c_ssize_t, ctypes.POINTER(GciErrSType)]),
+        'GciTsExecuteFetchBytes': (ctypes.c_int64, [GciSession, ctypes.c_char_p, ctypes.c_ssize_t, OopType, OopType, OopType, ctypes.POINTER(ByteType), ctypes.c_ssize_t, ctypes.POINTER(GciErrSType)]),
+        'GciTsResolveSymbol': (OopType, [GciSession, ctypes.c_char_p, OopType, ctypes.POINTER(GciErrSType)]),
+        'GciTsResolveSymbolObj': (OopType, [GciSession, OopType, OopType, ctypes.POINTER(GciErrSType)]),
+        'GciTsNewSymbol': (OopType, [GciSession, ctypes.c_char_p, ctypes.POINTER(GciErrSType)]),
+        'GciTsIsKindOf': (ctypes.c_int, [GciSession, OopType, OopType, ctypes.POINTER(GciErrSType)]),
+        'GciTsFetchClass': (OopType, [GciSession, OopType, ctypes.POINTER(GciErrSType)]),
+        'GciTsAbort': (BoolType, [GciSession, ctypes.POINTER(GciErrSType)]),
+        'GciTsCommit': (BoolType, [GciSession, ctypes.POINTER(GciErrSType)]),
+        'GciTsBegin': (BoolType, [GciSession, ctypes.POINTER(GciErrSType)]),
+        'GciTsOopToDouble': (BoolType, [GciSession, OopType, ctypes.POINTER(ctypes.c_double), ctypes.POINTER(GciErrSType)]),
+        'GciTsOopToI64': (BoolType, [GciSession, OopType, ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(GciErrSType)]),
+        'GciTsDoubleToOop': (OopType, [GciSession, ctypes.c_double, ctypes.POINTER(GciErrSType)]),
+        'GciTsI64ToOop': (OopType, [GciSession, ctypes.c_int64, ctypes.POINTER(GciErrSType)]),
+        'GciTsFetchUtf8': (ctypes.c_int64, [GciSession, OopType, ctypes.POINTER(ByteType), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(GciErrSType)]),
+        'GciTsFetchUtf8Bytes': (ctypes.c_int64, [GciSession, OopType, ctypes.c_int64, ctypes.POINTER(ByteType), ctypes.c_int64, ctypes.POINTER(OopType), ctypes.POINTER(GciErrSType), ctypes.c_int]),
+        'GciTsFetchBytes': (ctypes.c_int64, [GciSession, OopType, ctypes.c_int64, ctypes.POINTER(ByteType), ctypes.c_int64, ctypes.POINTER(GciErrSType)]),
+        'GciTsNewUtf8String': (OopType, [GciSession, ctypes.c_char_p, BoolType, ctypes.POINTER(GciErrSType)]),
+        'GciTsReleaseObjs': (BoolType, [GciSession, ctypes.POINTER(OopType), ctypes.c_int, ctypes.POINTER(GciErrSType)]),
+        'GciTsReleaseAllObjs': (BoolType, [GciSession, ctypes.POINTER(GciErrSType)]),
+        'GciTsFetchOops': (ctypes.c_int, [GciSession, OopType, ctypes.c_int64, ctypes.POINTER(OopType), ctypes.c_int, ctypes.POINTER(GciErrSType)]),
+        'GciTsSaveObjs': (BoolType, [GciSession, ctypes.POINTER(OopType), ctypes.c_int, ctypes.POINTER(GciErrSType)]),
+        'GciTsNewObj': (OopType, [GciSession, OopType, ctypes.POINTER(GciErrSType)]),
+        'GciTsStoreOops': (BoolType, [GciSession, OopType, ctypes.c_int64, ctypes.POINTER(OopType), ctypes.c_int, ctypes.POINTER(GciErrSType), ctypes.c_ushort]),
+        'GciTsContinueWith': (OopType, [GciSession, OopType, OopType, ctypes.POINTER(GciErrSType), ctypes.c_int, ctypes.POINTER(GciErrSType)]),
+        'GciTsClearStack': (BoolType, [GciSession, OopType, ctypes.POINTER(GciErrSType)]),
+        'GciTsBreak': (BoolType, [GciSession, BoolType, ctypes.POINTER(GciErrSType)]),
+        'GciTsNbExecute': (BoolType, [GciSession, ctypes.c_char_p, OopType, OopType, OopType, ctypes.c_int, ctypes.c_ushort, ctypes.POINTER(GciErrSType)]),
+        'GciTsNbPerform': (BoolType, [GciSession, OopType, OopType, ctypes.c_char_p, ctypes.POINTER(OopType), ctypes.c_int, ctypes.c_int, ctypes.c_ushort, ctypes.POINTER(GciErrSType)]),
+        'GciTsNbResult': (OopType, [GciSession, ctypes.POINTER(GciErrSType)]),
+        'GciTsNbPoll': (ctypes.c_int, [GciSession, ctypes.c_int, ctypes.POINTER(GciErrSType)]),
+        'GciTsSocket': (ctypes.c_int, [GciSession, ctypes.POINTER(GciErrSType)]),
+    }
+
     def __init__(self, lib_path):
         super().__init__(lib_path)
         self.initial_fetch_size = 200
-        
-        self.GciTsEncrypt = self.library.GciTsEncrypt
-        self.GciTsEncrypt.restype = ctypes.c_char_p
-        self.GciTsEncrypt.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]
-        
-        self.GciTsLogout = self.library.GciTsLogout
-        self.GciTsLogout.restype = BoolType
-        self.GciTsLogout.argtypes = [GciSession, ctypes.POINTER(GciErrSType)]
-        
-        self.GciTsSessionIsRemote = self.library.GciTsSessionIsRemote
-        self.GciTsSessionIsRemote.restype = ctypes.c_int
-        self.GciTsSessionIsRemote.argtypes = [GciSession]
-
-        self.GciTsExecute = self.library.GciTsExecute
-        self.GciTsExecute.restype = OopType
-        self.GciTsExecute.argtypes = [GciSession, ctypes.c_char_p, OopType, OopType, OopType, ctypes.c_int, ctypes.c_ushort, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsPerform = self.library.GciTsPerform
-        self.GciTsPerform.restype = OopType
-        self.GciTsPerform.argtypes = [GciSession, OopType, OopType, ctypes.c_char_p, ctypes.POINTER(OopType), ctypes.c_int, ctypes.c_int,
-                                      ctypes.c_ushort, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsResolveSymbol = self.library.GciTsResolveSymbol
-        self.GciTsResolveSymbol.restype = OopType
-        self.GciTsResolveSymbol.argtypes = [GciSession, ctypes.c_char_p, OopType, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsResolveSymbolObj = self.library.GciTsResolveSymbolObj
-        self.GciTsResolveSymbolObj.restype = OopType
-        self.GciTsResolveSymbolObj.argtypes = [GciSession, OopType, OopType, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsNewSymbol = self.library.GciTsNewSymbol
-        self.GciTsNewSymbol.restype = OopType
-        self.GciTsNewSymbol.argtypes = [GciSession, ctypes.c_char_p, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsIsKindOf = self.library.GciTsIsKindOf
-        self.GciTsIsKindOf.restype = ctypes.c_int
-        self.GciTsIsKindOf.argtypes = [GciSession, OopType, OopType, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsFetchClass = self.library.GciTsFetchClass
-        self.GciTsFetchClass.restype = OopType
-        self.GciTsFetchClass.argtypes = [GciSession, OopType, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsAbort = self.library.GciTsAbort        
-        self.GciTsAbort.restype = BoolType
-        self.GciTsAbort.argtypes = [GciSession, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsCommit = self.library.GciTsCommit        
-        self.GciTsCommit.restype = BoolType
-        self.GciTsCommit.argtypes = [GciSession, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsBegin = self.library.GciTsBegin
-        self.GciTsBegin.restype = BoolType
-        self.GciTsBegin.argtypes = [GciSession, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsOopToDouble = self.library.GciTsOopToDouble
-        self.GciTsOopToDouble.restype = BoolType
-        self.GciTsOopToDouble.argtypes = [GciSession, OopType, ctypes.POINTER(ctypes.c_double), ctypes.POINTER(GciErrSType)]
-
-        self.GciTsOopToI64 = self.library.GciTsOopToI64
-        self.GciTsOopToI64.restype = BoolType
-        self.GciTsOopToI64.argtypes = [GciSession, OopType, ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(GciErrSType)]
-
-        self.GciTsDoubleToOop = self.library.GciTsDoubleToOop
-        self.GciTsDoubleToOop.restype = OopType
-        self.GciTsDoubleToOop.argtypes = [GciSession, ctypes.c_double, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsI64ToOop = self.library.GciTsI64ToOop
-        self.GciTsI64ToOop.restype = OopType
-        self.GciTsI64ToOop.argtypes = [GciSession, ctypes.c_int64, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsFetchUtf8 = self.library.GciTsFetchUtf8
-        self.GciTsFetchUtf8.restype = ctypes.c_int64
-        self.GciTsFetchUtf8.argtypes = [GciSession, OopType, ctypes.POINTER(ByteType), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(GciErrSType)]
-
-        self.GciTsFetchUtf8Bytes = self.library.GciTsFetchUtf8Bytes
-        self.GciTsFetchUtf8Bytes.restype = ctypes.c_int64
-        self.GciTsFetchUtf8Bytes.argtypes = [GciSession, OopType, ctypes.c_int64, ctypes.POINTER(ByteType), ctypes.c_int64, ctypes.POINTER(OopType), ctypes.POINTER(GciErrSType), ctypes.c_int]
-
-        self.GciTsFetchBytes = self.library.GciTsFetchBytes
-        self.GciTsFetchBytes.restype = ctypes.c_int64
-        self.GciTsFetchBytes.argtypes = [GciSession, OopType, ctypes.c_int64, ctypes.POINTER(ByteType), ctypes.c_int64, ctypes.POINTER(GciErrSType)]
 
-        self.GciTsNewUtf8String = self.library.GciTsNewUtf8String
-        self.GciTsNewUtf8String.restype = OopType
-        self.GciTsNewUtf8String.argtypes = [GciSession, ctypes.c_char_p, BoolType, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsReleaseObjs = self.library.GciTsReleaseObjs
-        self.GciTsReleaseObjs.restype = BoolType
-        self.GciTsReleaseObjs.argtypes = [GciSession, ctypes.POINTER(OopType), ctypes.c_int, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsContinueWith = self.library.GciTsContinueWith
-        self.GciTsContinueWith.restype = OopType
-        self.GciTsContinueWith.argtypes = [GciSession, OopType, OopType, ctypes.POINTER(GciErrSType), ctypes.c_int, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsClearStack = self.library.GciTsClearStack
-        self.GciTsClearStack.restype = BoolType
-        self.GciTsClearStack.argtypes = [GciSession, OopType, ctypes.POINTER(GciErrSType)]
-
-        self.GciTsBreak = self.library.GciTsBreak
-        self.GciTsBreak.restype = BoolType
-        self.GciTsBreak.argtypes = [GciSession, BoolType, ctypes.POINTER(GciErrSType)]
-
-        
     def encrypt_password(self, unencrypted_password):
         if not unencrypted_password:
             return None
@@ -155,13 +105,9 @@ class GciTs34(GciTs):
     min_version = '3.4.0'
     max_version = '3.4.9999'
 
-    def __init__(self, lib_path):
-        super().__init__(lib_path)
-
-        self.GciTsLogin = self.library.GciTsLogin
-        self.GciTsLogin.restype = GciSession
-        self.GciTsLogin.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, BoolType, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
-                                    ctypes.c_uint, ctypes.c_int, ctypes.POINTER(GciErrSType)]
+    prototypes = {
+        'GciTsLogin': (GciSession, [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, BoolType, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint, ctypes.c_int, ctypes.POINTER(GciErrSType)]),
+    }
 
     def log_in(self, stone_name, host_username, host_password, netldi_task, username, password):
         error = GciErrSType()
@@ -189,15 +135,10 @@ class GciTs35(GciTs):
     min_version = '3.5.0'
     max_version = '3.7.9999'
 
-    def __init__(self, lib_path):
-        super().__init__(lib_path)
-        
-        self.GciTsLogin = self.library.GciTsLogin
-        self.GciTsLogin.restype = GciSession
-        self.GciTsLogin.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, BoolType, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
-                                    ctypes.c_uint, ctypes.c_int, ctypes.POINTER(BoolType), ctypes.POINTER(GciErrSType)]
+    prototypes = {
+        'GciTsLogin': (GciSession, [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, BoolType, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint, ctypes.c_int, ctypes.POINTER(BoolType), ctypes.POINTER(GciErrSType)]),
+    }
 
-        
     def log_in(self, stone_name, host_username, host_password, netldi_task, username, password):
         error = GciErrSType()
         executed_session_init = ctypes.c_int()
@@ -251,42 +192,62 @@ class RPCSession(GemstoneSession):
     def encrypt_password(self, unencrypted_password):
         return self.gci.encrypt_password(unencrypted_password)
         
-    def remove_dead_gemstone_objects(self):
-        error = GciErrSType()
-        unreferenced_gemstone_objects = [oop for oop in self.deallocated_unfreed_gemstone_objects if oop not in self.instances]
-        if unreferenced_gemstone_objects:
-            c_dead_oops = (OopType * len(unreferenced_gemstone_objects))(*unreferenced_gemstone_objects)
-            if not self.gci.GciTsReleaseObjs(self.c_session, c_dead_oops, len(unreferenced_gemstone_objects), ctypes.byref(error)):
-                raise GemstoneError(self, error)
-        self.deallocated_unfreed_gemstone_objects.clear()
+    @serialized
+    def release_oops(self, oops):
+        error = self.error_struct
+        c_oops = (OopType * len(oops))(*oops)
+        if not self.gci.GciTsReleaseObjs(self.c_session, c_oops, len(oops), ctypes.byref(error)):
+            raise GemstoneError(self, error)
 
+    @serialized
+    def release_all_oops(self):
+        error = self.error_struct
+        if not self.gci.GciTsReleaseAllObjs(self.c_session, ctypes.byref(error)):
+            raise GemstoneError(self, error)
+
+    @serialized
+    def save_oops(self, oops):
+        error = self.error_struct
+        c_oops = (OopType * len(oops))(*oops)
+        if not self.gci.GciTsSaveObjs(self.c_session, c_oops, len(oops), ctypes.byref(error)):
+            raise GemstoneError(self, error)
+
+    @serialized
     def abort(self):
         """
         Abort the current transaction.
         
         :raises GemstoneError: If the abort operation fails
         """
-        error = GciErrSType()
+        self.clear_symbol_cache()
+        self.remove_dead_gemstone_objects()
+        error = self.error_struct
         if not self.gci.GciTsAbort(self.c_session, ctypes.byref(error)):
             raise GemstoneError(self, error)
 
+    @serialized
     def begin(self):
         """
         Begin a new transaction.
         
         :raises GemstoneError: If the begin operation fails
         """
-        error = GciErrSType()
+        self.clear_symbol_cache()
+        self.remove_dead_gemstone_objects()
+        error = self.error_struct
         if not self.gci.GciTsBegin(self.c_session, ctypes.byref(error)):
             raise GemstoneError(self, error)
 
+    @serialized
     def commit(self):
         """
         Commit the current transaction.
         
         :raises GemstoneError: If the commit operation fails
         """
-        error = GciErrSType()
+        self.clear_symbol_cache()
+        self.remove_dead_gemstone_objects()
+        error = self.error_struct
         if not self.gci.GciTsCommit(self.c_session, ctypes.byref(error)):
             raise GemstoneError(self, error)
 
@@ -309,7 +270,7 @@ class RPCSession(GemstoneSession):
 
         :raises GemstoneError: If the request could not be delivered to the gem.
         """
-        error = GciErrSType()
+        error = self.error_struct
         if not self.gci.GciTsBreak(self.c_session, FALSE, ctypes.byref(error)):
             raise GemstoneError(self, error)
 
@@ -327,7 +288,7 @@ class RPCSession(GemstoneSession):
 
         :raises GemstoneError: If the request could not be delivered to the gem.
         """
-        error = GciErrSType()
+        error = self.error_struct
         if not self.gci.GciTsBreak(self.c_session, TRUE, ctypes.byref(error)):
             raise GemstoneError(self, error)
 
@@ -354,41 +315,51 @@ class RPCSession(GemstoneSession):
         remote = self.gci.GciTsSessionIsRemote(self.c_session)
         return remote != -1
 
+    @serialized
     def py_to_string_(self, py_str):
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = self.gci.GciTsNewUtf8String(self.c_session, py_str.encode('utf-8'), True, ctypes.byref(error))
         if return_oop == OOP_ILLEGAL.value:
             raise GemstoneError(self, error)
         return return_oop
 
+    @serialized
     def py_to_float_(self, py_float):
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = self.gci.GciTsDoubleToOop(self.c_session, py_float, ctypes.byref(error))
         if return_oop == OOP_ILLEGAL.value:
             raise GemstoneError(self, error)
         return return_oop
 
-    def execute(self, source, context=None, symbol_list=None):
+    @serialized
+    def execute(self, source, context=None, symbol_list=None, timeout=None):
         """
         Execute a GemStone Smalltalk expression.
         
         :param source: String or GemObject containing Smalltalk code to execute
         :param context: Optional context object for the execution
         :param symbol_list: Optional symbol list for name resolution
+        :param timeout: If given, the number of seconds the code may run before it is
+                        broken off (see :meth:`~reahl.ptongue.GemstoneSession.deadline`)
         :return: GemObject representing the result of execution
         :raises GemstoneApiError: If source is not a string or GemObject
+        :raises GemstoneTimeout: If the code ran longer than timeout
         :raises GemstoneError: If execution fails
         """
-        error = GciErrSType()
+        if timeout is not None:
+            with self.deadline(timeout):
+                return self.execute(source, context=context, symbol_list=symbol_list)
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
         if isinstance(source, str):
             return_oop = self.gci.GciTsExecute(self.c_session, source.encode('utf-8'), OOP_CLASS_Utf8,
-                                               context.oop if context else OOP_NIL, 
-                                               symbol_list.oop if symbol_list else OOP_NIL,
+                                               context.oop if context is not None else OOP_NIL, 
+                                               symbol_list.oop if symbol_list is not None else OOP_NIL,
                                                0, 0,  ctypes.byref(error))
         elif isinstance(source, GemObject):
             return_oop = self.gci.GciTsExecute(self.c_session, None, source.oop,
-                                               context.oop if context else OOP_NIL, 
-                                               symbol_list.oop if symbol_list else OOP_NIL,
+                                               context.oop if context is not None else OOP_NIL, 
+                                               symbol_list.oop if symbol_list is not None else OOP_NIL,
                                                0, 0,  ctypes.byref(error))
         else:
             raise GemstoneApiError('Source is type {}.Expected source to be a str or GemObject'.format(source.__class__.__name__))
@@ -396,6 +367,35 @@ class RPCSession(GemstoneSession):
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
+    def execute_to_bytes(self, source, context=None, symbol_list=None, max_size=None):
+        """
+        Execute a GemStone Smalltalk expression whose result is a byte object (such as
+        a String or ByteArray), and fetch the bytes of that result in the same call.
+        
+        :param source: String containing Smalltalk code to execute
+        :param context: Optional context object for the execution
+        :param symbol_list: Optional symbol list for name resolution
+        :param max_size: The maximum number of bytes expected, defaults to session.fused_fetch_size
+        :return: The bytes of the result of execution
+        :raises ResultTooLarge: If the result is max_size bytes or larger
+        :raises GemstoneError: If execution fails
+        """
+        max_size = max_size or self.fused_fetch_size
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
+        dest = self.byte_buffer(max_size)
+        bytes_returned = self.gci.GciTsExecuteFetchBytes(self.c_session, source.encode('utf-8'), -1, OOP_CLASS_Utf8,
+                                                         context.oop if context is not None else OOP_NIL,
+                                                         symbol_list.oop if symbol_list is not None else OOP_NIL,
+                                                         dest, max_size, ctypes.byref(error))
+        if bytes_returned == -1:
+            raise GemstoneError(self, error)
+        if bytes_returned == max_size:
+            raise ResultTooLarge('The result may be larger than {} bytes'.format(max_size))
+        return ctypes.string_at(dest, bytes_returned)
+
+    @serialized
     def new_symbol(self, py_string):
         """
         Create a new GemStone symbol.
@@ -404,87 +404,82 @@ class RPCSession(GemstoneSession):
         :return: GemObject representing the created symbol
         :raises GemstoneError: If symbol creation fails
         """
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = self.gci.GciTsNewSymbol(self.c_session, py_string.encode('utf-8'), ctypes.byref(error))
         if return_oop == OOP_ILLEGAL.value:
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
-    def resolve_symbol(self, symbol, symbol_list=None):
-        """
-        Resolve a symbol in the GemStone symbol list.
-
-        There is a shorthand for this method. These lines are equivalent::
-        
-            session.SymbolName
-            session.resolve_symbol('SymbolName')
-
-        :param symbol: String or GemObject symbol to resolve
-        :param symbol_list: Optional symbol list for resolution
-        :return: GemObject representing the resolved symbol
-        :raises GemstoneApiError: If symbol is not a string or GemObject
-        :raises GemstoneError: If resolution fails
-        """
-        error = GciErrSType()
+    @serialized
+    def lookup_symbol(self, symbol, symbol_list=None):
+        error = self.error_struct
         if isinstance(symbol, str):
             return_oop = self.gci.GciTsResolveSymbol(self.c_session, symbol.encode('utf-8'), 
-                                                     symbol_list.oop if symbol_list else OOP_NIL, ctypes.byref(error))
+                                                     symbol_list.oop if symbol_list is not None else OOP_NIL, ctypes.byref(error))
         elif isinstance(symbol, GemObject):
             return_oop = self.gci.GciTsResolveSymbolObj(self.c_session, symbol.oop, 
-                                                        symbol_list.oop if symbol_list else OOP_NIL, ctypes.byref(error))
+                                                        symbol_list.oop if symbol_list is not None else OOP_NIL, ctypes.byref(error))
         else:
             raise GemstoneApiError('Symbol is type {}.Expected symbol to be a str or GemObject'.format(symbol.__class__.__name__))
         if return_oop == OOP_ILLEGAL.value:
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
            
+    @serialized
     def log_out(self):
         """
         Log out from the GemStone session.
         
         :raises GemstoneError: If logout fails
         """
-        error = GciErrSType()
+        self.clear_symbol_cache()
+        self.deallocated_unfreed_gemstone_objects.clear()
+        error = self.error_struct
         if not self.gci.GciTsLogout(self.c_session, ctypes.byref(error)):
             raise GemstoneError(self, error)
 
+    @serialized
     def object_is_kind_of(self, instance, a_class):
-        error = GciErrSType()
+        error = self.error_struct
         is_kind_of_result = self.gci.GciTsIsKindOf(self.c_session, instance.oop, a_class.oop, ctypes.byref(error))
         if is_kind_of_result == -1:
             raise GemstoneError(self, error)
         return bool(is_kind_of_result)
 
+    @serialized
     def object_gemstone_class(self, instance):
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = self.gci.GciTsFetchClass(self.c_session, instance.oop, ctypes.byref(error))
         if return_oop == OOP_ILLEGAL.value:
            raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
     def object_float_to_py(self, instance):
-        error = GciErrSType()
+        error = self.error_struct
         result = ctypes.c_double()
         if not self.gci.GciTsOopToDouble(self.c_session, instance.oop, ctypes.byref(result), ctypes.byref(error)):
             raise GemstoneError(self, error)
         return result.value
 
+    @serialized
     def object_string_to_py(self, instance):
-        error = GciErrSType()
+        error = self.error_struct
         start_index = 1
         num_bytes  = self.initial_fetch_size
         bytes_returned = num_bytes
-        error = GciErrSType()
+        error = self.error_struct
         py_bytes = b''
         utf8_string = OopType(OOP_NIL.value)
 
+        dest = self.byte_buffer(num_bytes + 1)
+
         while bytes_returned == num_bytes:
-            dest = (ByteType * (num_bytes + 1))()
             bytes_returned = self.gci.GciTsFetchUtf8Bytes(self.c_session, instance.oop, start_index, dest, num_bytes, ctypes.byref(utf8_string), ctypes.byref(error), 0)
             if bytes_returned == -1:
                 raise GemstoneError(self, error)
 
-            py_bytes += bytearray(dest[:bytes_returned])
+            py_bytes += ctypes.string_at(dest, bytes_returned)
             start_index = start_index + num_bytes
             if utf8_string.value != OOP_NIL.value:
                 if not self.gci.GciTsReleaseObjs(self.c_session, ctypes.byref(utf8_string), 1, ctypes.byref(error)):
@@ -494,32 +489,35 @@ class RPCSession(GemstoneSession):
     def object_latin1_to_py(self, instance):
         return self.object_bytes_to_py(instance).decode('latin-1')
         
+    @serialized
     def object_bytes_to_py(self, instance):
-        error = GciErrSType()
+        error = self.error_struct
         start_index = 1
         num_bytes  = self.initial_fetch_size
         bytes_returned = num_bytes
         py_bytes = b''
+        dest = self.byte_buffer(num_bytes + 1)
         while bytes_returned == num_bytes:
-            dest = (ByteType * (num_bytes + 1))()
             bytes_returned = self.gci.GciTsFetchBytes(self.c_session, instance.oop, start_index,
                                                       dest, num_bytes, ctypes.byref(error));
             if bytes_returned == -1:
                 raise GemstoneError(self, error)
 
-            py_bytes += bytearray(dest[:bytes_returned])
+            py_bytes += ctypes.string_at(dest, bytes_returned)
             start_index = start_index + num_bytes
         return py_bytes
 
+    @serialized
     def object_perform(self, instance, selector, *args):
-        error = GciErrSType()
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
         if not isinstance(selector, (str, GemObject)):
             raise GemstoneApiError('Selector is type {}.Expected selector to be a str or GemObject'.format(selector.__class__.__name__))
 
         selector_oop = selector.oop if isinstance(selector, GemObject) else OOP_ILLEGAL
         selector_str = to_c_bytes(selector) if isinstance(selector, str) else None
 
-        cargs = (OopType * len(args))(*[i.oop for i in args])
+        cargs = self.argument_array(args)
         flags = 1
         environment_id = 0
 
@@ -536,16 +534,67 @@ class RPCSession(GemstoneSession):
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
+    def object_perform_fetch_bytes(self, instance, selector, args, max_size):
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
+        cargs = self.argument_array(args)
+        dest = self.byte_buffer(max_size)
+        bytes_returned = self.gci.GciTsPerformFetchBytes(self.c_session, instance.oop, selector.encode('utf-8'), cargs, len(args),
+                                                         dest, max_size, ctypes.byref(error))
+        if bytes_returned == -1:
+            raise GemstoneError(self, error)
+        if bytes_returned == max_size:
+            raise ResultTooLarge('The result of {} may be larger than {} bytes'.format(selector, max_size))
+        return ctypes.string_at(dest, bytes_returned)
+
+    @serialized
+    def object_perform_symbol(self, instance, selector_symbol, c_args, arg_count):
+        self.release_dead_gemstone_objects_if_due()
+        error = self.error_struct
+        flags = 1
+        environment_id = 0
+        return_oop = self.gci.GciTsPerform(self.c_session, instance.oop, selector_symbol.oop, None,
+                                           c_args, arg_count, flags, environment_id, ctypes.byref(error))
+        if return_oop == OOP_ILLEGAL.value:
+            raise GemstoneError(self, error)
+        return self.get_or_create_gem_object(return_oop)
+
+    @serialized
+    def new_array_of_oops(self, oops):
+        error = self.error_struct
+        array_oop = self.gci.GciTsNewObj(self.c_session, OOP_CLASS_ARRAY, ctypes.byref(error))
+        if array_oop == OOP_ILLEGAL.value:
+            raise GemstoneError(self, error)
+        array = self.get_or_create_gem_object(array_oop)
+        if oops:
+            c_oops = (OopType * len(oops))(*oops)
+            if not self.gci.GciTsStoreOops(self.c_session, array_oop, 1, c_oops, len(oops), ctypes.byref(error), 0):
+                raise GemstoneError(self, error)
+        return array
+
+    @serialized
+    def object_fetch_elements(self, instance, count):
+        error = self.error_struct
+        c_oops = (OopType * count)()
+        fetched = self.gci.GciTsFetchOops(self.c_session, instance.oop, 1, c_oops, count, ctypes.byref(error))
+        if fetched == -1:
+            raise GemstoneError(self, error)
+        if not self.gci.GciTsSaveObjs(self.c_session, c_oops, fetched, ctypes.byref(error)):
+            raise GemstoneError(self, error)
+        return [self.get_or_create_gem_object(oop) for oop in c_oops[:fetched]]
 
+    @serialized
     def object_continue_with(self, gemstone_process, continue_with_error_oop, replace_top_of_stack_oop):
-        error = GciErrSType()
+        error = self.error_struct
         return_oop = self.gci.GciTsContinueWith(self.c_session, gemstone_process.oop, replace_top_of_stack_oop, continue_with_error_oop, 0, ctypes.byref(error))
         if return_oop == OOP_ILLEGAL.value:
             raise GemstoneError(self, error)
         return self.get_or_create_gem_object(return_oop)
 
+    @serialized
     def object_clear_stack(self, gemstone_process):
-        error = GciErrSType()
+        error = self.error_struct
         success = self.gci.GciTsClearStack(self.c_session, gemstone_process.oop, ctypes.byref(error))
         if not success:
             raise GemstoneError(self, error)
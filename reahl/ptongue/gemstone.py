@@ -23,6 +23,7 @@ TRUE = 1
 #--------------------------------------------------[ gcioop.ht ]---
 OOP_TAG_SPECIAL_MASK = 0x6
 OOP_TAG_SMALLINT =     0x2
+OOP_TAG_SMALLDOUBLE =  0x6
 OOP_NUM_TAG_BITS = 3
 
 #--------------------------------------------------[ gcicmn.ht ]---
@@ -30,6 +31,9 @@ uintptr_t = ctypes.c_uint
 def GCI_OOP_IS_SMALL_INT(oop):
     return (oop & OOP_TAG_SPECIAL_MASK) == OOP_TAG_SMALLINT
 
+def GCI_OOP_IS_SPECIAL(oop):
+    return (oop & OOP_TAG_SPECIAL_MASK) != 0
+
 
 #--------------------------------------------------[ gci.ht ]---
 OopType = ctypes.c_uint64
@@ -139,6 +143,7 @@ OOP_CLASS_Unicode32 =      OopType(154881)
 OOP_CLASS_ORDERED_COLLECTION = OopType(92673)
 OOP_CLASS_N_DICTIONARY =   OopType(101377)
 OOP_CLASS_IDENTITY_SET =   OopType(73985)
+OOP_CLASS_ARRAY =          OopType(66817)
 
 
 OOP_FALSE =            OopType(0x0C)
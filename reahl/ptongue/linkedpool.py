@@ -0,0 +1,181 @@
+# Copyright (C) 2025 Reahl Software Services (Pty) Ltd
+# 
+# This file is part of parseltongue.
+#
+# parseltongue is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# parseltongue is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Worker processes with linked sessions
+=====================================
+
+Only one :class:`~reahl.ptongue.LinkedSession` can be logged in per process. A
+:class:`LinkedWorkerPool` forks a number of worker processes that each log in a
+LinkedSession of their own, so that work can be spread over several cores while
+each worker still talks to its Gem at linked speed::
+
+    def customer_name(session, key):
+        return session.UserGlobals.at('Customers').at(key).name().to_py
+
+    with LinkedWorkerPool('DataCurator', 'swordfish', workers=4) as pool:
+        for name in pool.imap(customer_name, keys):
+            print(name)
+
+The functions given to a pool are passed to the workers by reference (as with
+:mod:`multiprocessing`), so they must be defined at the top level of a module.
+They receive the worker's LinkedSession as first argument and should answer Python
+values. The session is aborted after each task. If that fails, the worker logs in a
+new session (with a warning), and the outcome of the task is still reported.
+"""
+
+import functools
+import multiprocessing
+from multiprocessing.util import Finalize
+import os
+import warnings
+
+from .gemproxy import GemstoneError, GemstoneApiError, GemstoneWarning
+from .gemproxylinked import LinkedSession, get_current_linked_session
+
+
+class WorkerError(GemstoneApiError):
+    """Raised in the parent process for a GemstoneError raised by a task in a worker.
+
+    :param number: The GemStone error number of the original error.
+    :param description: The description of the original error.
+    """
+    def __init__(self, number, description):
+        super().__init__(number, description)
+
+    @property
+    def number(self):
+        return self.args[0]
+
+    @property
+    def description(self):
+        return self.args[1]
+
+    def __str__(self):
+        return self.description
+
+
+worker_session = None
+worker_login_kwargs = None
+worker_finalizer = None
+
+def start_worker(login_kwargs):
+    global worker_login_kwargs
+    worker_login_kwargs = login_kwargs
+    log_in_worker_session()
+
+def log_in_worker_session():
+    global worker_session, worker_finalizer
+    worker_session = LinkedSession(**worker_login_kwargs)
+    worker_finalizer = Finalize(worker_session, worker_session.log_out, exitpriority=10)
+
+def replace_worker_session():
+    worker_finalizer.cancel()
+    try:
+        worker_session.log_out()
+    except (GemstoneError, GemstoneApiError):
+        pass
+    log_in_worker_session()
+
+def run_task(fn, *args, **kwargs):
+    try:
+        return fn(worker_session, *args, **kwargs)
+    except GemstoneError as ex:
+        raise WorkerError(ex.number, str(ex)) from None
+    finally:
+        end_task()
+
+def end_task():
+    # Failing to abort must not hide the outcome of the task; the session is replaced instead
+    try:
+        worker_session.abort()
+    except (GemstoneError, GemstoneApiError) as ex:
+        warnings.warn('Could not abort the session of worker %s, logging in anew: %s' % (os.getpid(), ex), GemstoneWarning)
+        try:
+            replace_worker_session()
+        except (GemstoneError, GemstoneApiError) as ex:
+            warnings.warn('Could not log in anew in worker %s: %s' % (os.getpid(), ex), GemstoneWarning)
+
+
+class LinkedWorkerPool:
+    """A number of forked worker processes, each with its own LinkedSession.
+
+    The workers are forked when the pool is created, before anything is done with
+    GemStone in them. The process creating the pool should not have a LinkedSession
+    logged in at that time.
+
+    :param username: GemStone user account name used for authentication
+    :param password: GemStone password used for authentication
+    :param stone_name: Name of the GemStone repository to connect to, defaults to 'gs64stone'
+    :param host_username: If specified, the OS username used for connecting to the server
+    :param host_password: Password for host_username, if required, defaults to empty string
+    :param workers: The number of worker processes, defaults to the number of CPUs.
+    :param maxtasksperchild: If given, a worker is replaced (and logs in anew) after this many tasks.
+    """
+    def __init__(self, username, password, stone_name='gs64stone', host_username=None, host_password='',
+                 workers=None, maxtasksperchild=None):
+        linked_session = get_current_linked_session()
+        if linked_session is not None and linked_session.is_logged_in:
+            raise GemstoneApiError('Cannot fork workers while this process has a logged in LinkedSession.')
+        login_kwargs = dict(username=username, password=password, stone_name=stone_name,
+                            host_username=host_username, host_password=host_password)
+        self.pool = multiprocessing.get_context('fork').Pool(workers, initializer=start_worker, initargs=(login_kwargs,),
+                                                             maxtasksperchild=maxtasksperchild)
+
+    def apply(self, fn, *args, **kwargs):
+        """Call fn(session, *args, **kwargs) in a worker and answer its result."""
+        return self.submit(fn, *args, **kwargs).get()
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(session, *args, **kwargs) to be called in a worker.
+
+        :return: A :class:`multiprocessing.pool.AsyncResult` for the result.
+        """
+        return self.pool.apply_async(functools.partial(run_task, fn), args, kwargs)
+
+    def map(self, fn, iterable, chunksize=1):
+        """Call fn(session, item) in the workers for each item of iterable.
+
+        :return: A list of the results, in the order of iterable.
+        """
+        return self.pool.map(functools.partial(run_task, fn), iterable, chunksize)
+
+    def imap(self, fn, iterable, chunksize=1):
+        """Like :meth:`map`, but yields results as they become available (still in order)."""
+        return self.pool.imap(functools.partial(run_task, fn), iterable, chunksize)
+
+    def imap_unordered(self, fn, iterable, chunksize=1):
+        """Like :meth:`imap`, but yields results in the order they are done."""
+        return self.pool.imap_unordered(functools.partial(run_task, fn), iterable, chunksize)
+
+    def close(self):
+        """Wait for the submitted tasks to be done, then log out the workers and let them exit."""
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        """Stop the workers right away, abandoning the tasks they are busy with."""
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
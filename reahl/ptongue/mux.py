@@ -0,0 +1,386 @@
+# Copyright (C) 2025 Reahl Software Services (Pty) Ltd
+# 
+# This file is part of parseltongue.
+#
+# parseltongue is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# parseltongue is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Session multiplexer
+===================
+
+A process that keeps a small pool of logged-in RPCSessions, and lets many short-lived
+client processes on the same host use them over a Unix socket. Clients thus neither
+wait for a login, nor each cause a Gem to be started. Start it with::
+
+    GEMSTONE_PASSWORD=swordfish python -m reahl.ptongue.mux --socket /tmp/ptongue.sock --sessions 4 DataCurator
+
+and use it from a client with a :class:`MuxClient`::
+
+    with MuxClient('/tmp/ptongue.sock') as client:
+        today = client.execute('Date today')
+        print(today.asString().to_py)
+
+A client connection is given a session from the pool when it sends its first request,
+and keeps it until it disconnects; the session is then aborted and returned to the pool.
+A session that breaks (with a fatal error, or by being logged out) is discarded right
+away; the error response then has `session_lost` set, and the objects the client referred
+to are gone. The next request is given a new session.
+
+Requests and responses are JSON objects, each sent as a 4 byte (network order) length
+followed by its UTF-8 encoding. A request names its `op` (execute, perform, to_py, release,
+abort or commit). A response has `ok` and either a `result` or an `error` (with `number`
+for GemStone errors). Objects in the Gem are referred to as `{"oop": n}`; sets are sent as
+`{"set": [...]}`, dictionaries as `{"dict": [[key, value], ...]}` and bytes as `{"bytes": base64}`.
+A request that cannot be read is answered with an error, after which the connection is closed.
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+
+from .gemproxy import GemObject, GemstoneError, GemstoneApiError, InvalidSession, NotSupported, map_selector
+from .sessionpool import SessionPool
+
+
+message_header = struct.Struct('!I')
+max_message_size = 64 * 1024 * 1024
+
+
+class MuxError(GemstoneApiError):
+    """Raised by a :class:`MuxClient` when the multiplexer could not do what was requested.
+
+    :param description: A description of the error.
+    :param number: The GemStone error number, if the error happened in the Gem.
+    """
+    def __init__(self, description, number=None):
+        super().__init__(description, number)
+
+    @property
+    def description(self):
+        return self.args[0]
+
+    @property
+    def number(self):
+        return self.args[1]
+
+    def __str__(self):
+        return self.description
+
+
+def encode_message(message):
+    data = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    return message_header.pack(len(data)) + data
+
+def send_message(connection, message):
+    connection.sendall(encode_message(message))
+
+def receive_exactly(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def receive_message(connection):
+    header = receive_exactly(connection, message_header.size)
+    if header is None:
+        return None
+    (size,) = message_header.unpack(header)
+    if size > max_message_size:
+        raise MuxError('Message of %s bytes is larger than the maximum of %s bytes' % (size, max_message_size))
+    data = receive_exactly(connection, size)
+    if data is None:
+        return None
+    return json.loads(data.decode('utf-8'))
+
+def encode_value(value):
+    if isinstance(value, dict):
+        return {'dict': [[encode_value(key), encode_value(item)] for key, item in value.items()]}
+    elif isinstance(value, (set, frozenset)):
+        return {'set': [encode_value(item) for item in value]}
+    elif isinstance(value, (list, tuple)):
+        return [encode_value(item) for item in value]
+    elif isinstance(value, (bytes, bytearray)):
+        return {'bytes': base64.b64encode(value).decode('ascii')}
+    return value
+
+def decode_value(value, reference):
+    if isinstance(value, dict):
+        if 'oop' in value:
+            return reference(value['oop'])
+        elif 'set' in value:
+            return {decode_value(item, reference) for item in value['set']}
+        elif 'dict' in value:
+            return {decode_value(key, reference): decode_value(item, reference) for key, item in value['dict']}
+        elif 'bytes' in value:
+            return base64.b64decode(value['bytes'])
+        raise MuxError('Cannot decode %r' % value)
+    elif isinstance(value, list):
+        return [decode_value(item, reference) for item in value]
+    return value
+
+
+#======================================================================================================================
+class MuxConnection(socketserver.BaseRequestHandler):
+    operations = ('execute', 'perform', 'to_py', 'release', 'abort', 'commit')
+
+    def setup(self):
+        self.objects = {}
+        self.session = None
+
+    def handle(self):
+        while True:
+            try:
+                request = receive_message(self.request)
+            except (MuxError, ValueError) as ex:
+                # What follows in the stream cannot be trusted to be a message anymore
+                send_message(self.request, {'ok': False, 'error': '%s: %s' % (ex.__class__.__name__, ex)})
+                break
+            if request is None:
+                break
+            self.request.sendall(self.respond(request))
+
+    def finish(self):
+        self.objects.clear()
+        if self.session is not None:
+            self.server.pool.checkin(self.session)
+
+    def discard_session(self):
+        self.objects.clear()
+        session, self.session = self.session, None
+        if session is not None:
+            self.server.pool.checkin(session, discard=True)
+
+    def respond(self, request):
+        try:
+            if not isinstance(request, dict) or request.get('op') not in self.operations:
+                raise MuxError('Unknown op: %r' % (request.get('op') if isinstance(request, dict) else request))
+            if self.session is None:
+                self.session = self.server.pool.checkout(timeout=self.server.checkout_timeout)
+            result = getattr(self, 'op_%s' % request['op'])(request)
+            return encode_message({'ok': True, 'result': result})
+        except GemstoneError as ex:
+            response = {'ok': False, 'error': str(ex), 'number': ex.number}
+            if ex.is_fatal or (self.session is not None and not self.session.is_logged_in):
+                self.discard_session()
+                response.update(error='%s (the session was lost, with all objects referred to)' % response['error'],
+                                session_lost=True)
+            return encode_message(response)
+        except InvalidSession as ex:
+            self.discard_session()
+            return encode_message({'ok': False, 'session_lost': True,
+                                   'error': '%s: %s (the session was lost, with all objects referred to)' % (ex.__class__.__name__, ex)})
+        except (GemstoneApiError, NotSupported, KeyError, TypeError, ValueError) as ex:
+            return encode_message({'ok': False, 'error': '%s: %s' % (ex.__class__.__name__, ex)})
+
+    def reference(self, oop):
+        try:
+            return self.objects[oop]
+        except KeyError:
+            raise MuxError('No object with oop %s is held by this connection' % oop)
+
+    def decode(self, value):
+        value = decode_value(value, self.reference)
+        return value if isinstance(value, GemObject) else self.session.from_py(value)
+
+    def export(self, gem_object):
+        self.objects[gem_object.oop] = gem_object
+        return {'oop': gem_object.oop}
+
+    def op_execute(self, request):
+        context = self.decode(request['context']) if request.get('context') is not None else None
+        return self.export(self.session.execute(request['source'], context=context))
+
+    def op_perform(self, request):
+        receiver = self.decode(request['receiver'])
+        args = [self.decode(i) for i in request.get('args', [])]
+        return self.export(receiver.perform(request['selector'], *args))
+
+    def op_to_py(self, request):
+        return encode_value(self.decode(request['object']).to_py)
+
+    def op_release(self, request):
+        for oop in request['oops']:
+            self.objects.pop(oop, None)
+
+    def op_abort(self, request):
+        self.session.abort()
+
+    def op_commit(self, request):
+        self.session.commit()
+
+
+class SessionMultiplexer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A server that lets clients connecting to socket_path use the sessions of pool.
+
+    The socket is only accessible to the user running the server.
+
+    :param socket_path: The path of the Unix socket to listen on.
+    :param pool: The :class:`~reahl.ptongue.SessionPool` to take sessions from.
+    :param checkout_timeout: The number of seconds a client waits for a session when all are
+                             in use, before its request is answered with a PoolExhausted error.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path, pool, checkout_timeout=30):
+        self.pool = pool
+        self.checkout_timeout = checkout_timeout
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+        super().__init__(socket_path, MuxConnection)
+
+    def server_bind(self):
+        # The socket file is created with the permissions the umask allows, so it is
+        # created under a umask that leaves it accessible only to this user
+        old_umask = os.umask(0o077)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+#======================================================================================================================
+class RemoteObject:
+    """Stands in, in a client, for an object held by a :class:`SessionMultiplexer` for that client.
+
+    Messages are sent to a RemoteObject as to a :class:`~reahl.ptongue.GemObject`::
+
+        client.execute('Date today').addDays(2).asString().to_py
+
+    :param client: The MuxClient this object belongs to.
+    :param oop: The oop of the object in the Gem.
+    """
+    __slots__ = ('client', 'oop')
+
+    def __init__(self, client, oop):
+        self.client = client
+        self.oop = oop
+
+    @property
+    def to_py(self):
+        return self.client.to_py(self)
+
+    def perform(self, selector, *args):
+        return self.client.perform(self, selector, *args)
+
+    def __getattr__(self, name):
+        return lambda *args: self.perform(map_selector(name, args), *args)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, self.oop)
+
+
+class MuxClient:
+    """A connection to a :class:`SessionMultiplexer`.
+
+    Objects answered by the multiplexer are held for the client until it releases them
+    (see :meth:`release`) or disconnects.
+
+    :param socket_path: The path of the Unix socket the multiplexer listens on.
+    """
+    def __init__(self, socket_path):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(socket_path)
+
+    def request(self, op, **fields):
+        send_message(self.connection, dict(fields, op=op))
+        response = receive_message(self.connection)
+        if response is None:
+            raise MuxError('The multiplexer closed the connection')
+        if not response['ok']:
+            raise MuxError(response['error'], response.get('number'))
+        return decode_value(response['result'], lambda oop: RemoteObject(self, oop))
+
+    def encode(self, value):
+        if isinstance(value, RemoteObject):
+            return {'oop': value.oop}
+        return encode_value(value)
+
+    def execute(self, source, context=None):
+        """Execute Smalltalk source (see :meth:`GemstoneSession.execute`).
+
+        :return: A :class:`RemoteObject` for the result.
+        """
+        return self.request('execute', source=source, context=self.encode(context) if context is not None else None)
+
+    def perform(self, receiver, selector, *args):
+        """Send selector (spelt as in Smalltalk) with args to receiver.
+
+        :return: A :class:`RemoteObject` for the result.
+        """
+        return self.request('perform', receiver=self.encode(receiver), selector=selector, args=[self.encode(i) for i in args])
+
+    def to_py(self, remote_object):
+        return self.request('to_py', object=self.encode(remote_object))
+
+    def release(self, *remote_objects):
+        """Let the multiplexer forget the given objects."""
+        self.request('release', oops=[i.oop for i in remote_objects])
+
+    def abort(self):
+        self.request('abort')
+
+    def commit(self):
+        self.request('commit')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+#======================================================================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m reahl.ptongue.mux',
+                                     description='Serve a pool of GemStone sessions to local clients over a Unix socket.')
+    parser.add_argument('username', help='the GemStone user to log in as')
+    parser.add_argument('--password', default=os.environ.get('GEMSTONE_PASSWORD'),
+                        help='the password of username (defaults to $GEMSTONE_PASSWORD)')
+    parser.add_argument('--socket', required=True, help='the path of the Unix socket to listen on')
+    parser.add_argument('--stone', default='gs64stone', help='the name of the stone to log in to')
+    parser.add_argument('--netldi-task', default='gemnetobject', help='the NetLDI service name')
+    parser.add_argument('--sessions', type=int, default=4, help='the maximum number of sessions')
+    parser.add_argument('--min-sessions', type=int, default=1, help='the number of sessions to log in at startup')
+    parser.add_argument('--checkout-timeout', type=float, default=30,
+                        help='the number of seconds a client waits for a session when all are in use')
+    args = parser.parse_args(argv)
+    if args.password is None:
+        parser.error('a password is needed, via --password or $GEMSTONE_PASSWORD')
+
+    with SessionPool(args.username, args.password, stone_name=args.stone, netldi_task=args.netldi_task,
+                     min_size=args.min_sessions, max_size=args.sessions) as pool:
+        with SessionMultiplexer(args.socket, pool, checkout_timeout=args.checkout_timeout) as server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == '__main__':
+    main()
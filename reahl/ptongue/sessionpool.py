@@ -0,0 +1,250 @@
+# Copyright (C) 2025 Reahl Software Services (Pty) Ltd
+# 
+# This file is part of parseltongue.
+#
+# parseltongue is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# parseltongue is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Pools of logged-in sessions
+===========================
+
+Logging in an RPCSession creates a gem for it, which takes long. A
+:class:`SessionPool` keeps RPCSessions logged in so that they can be
+reused by code that needs a session for a short while, such as a web
+request::
+
+    pool = SessionPool('DataCurator', 'swordfish', min_size=2, max_size=10)
+    with pool.session() as session:
+        session.resolve_symbol('Date').today()
+
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import threading
+import time
+
+from .gemproxy import GemstoneError, GemstoneApiError, InvalidSession
+from .gemproxyrpc import RPCSession
+
+
+class PoolExhausted(GemstoneApiError):
+    """Raised when no session became available in a :class:`SessionPool` before a checkout timed out."""
+
+
+class SessionPool:
+    """A pool of logged-in RPCSessions.
+
+    The pool logs in min_size sessions (concurrently) when it is created, and more as
+    they are needed, up to max_size sessions in total.
+
+    A session returned to the pool is aborted, and the objects obtained by its borrower are
+    released from its export set (see :meth:`~reahl.ptongue.GemstoneSession.forget_gem_objects`).
+    Sessions that fail to abort, have hit a fatal error, or turn out
+    to be logged out when checked out, are logged out and replaced.
+
+    :param username: GemStone username for repository authentication
+    :param password: GemStone password for repository authentication
+    :param stone_name: Name of the stone (repository) to connect to
+    :param host_username: Operating system username for host authentication
+    :param host_password: Operating system password for host authentication
+    :param netldi_task: Network service name
+    :param min_size: The number of sessions to log in when the pool is created.
+    :param max_size: The maximum number of sessions in the pool (checked out or not).
+    """
+    def __init__(self, username, password, stone_name='gs64stone',
+                 host_username=None, host_password=None, netldi_task='gemnetobject',
+                 min_size=1, max_size=10):
+        if not 0 <= min_size <= max_size:
+            raise GemstoneApiError('Expected 0 <= min_size <= max_size, got min_size={} and max_size={}'.format(min_size, max_size))
+        self.login_args = dict(username=username, password=password, stone_name=stone_name,
+                               host_username=host_username, host_password=host_password, netldi_task=netldi_task)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_sessions = deque()
+        self.checked_out = set()
+        self.size = 0
+        self.is_closed = False
+        self.condition = threading.Condition()
+        try:
+            self.prewarm(min_size)
+        except:
+            self.close()
+            raise
+
+    def create_session(self):
+        return RPCSession(**self.login_args)
+
+    def prewarm(self, count):
+        """Log in count more sessions (concurrently), and add them to the idle sessions in the pool.
+
+        :param count: The number of sessions to log in, limited by max_size.
+        """
+        with self.condition:
+            count = min(count, self.max_size - self.size)
+            self.size += count
+        if count <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(self.create_session) for i in range(count)]
+        sessions = [future.result() for future in futures if not future.exception()]
+        with self.condition:
+            self.size -= count - len(sessions)
+            self.idle_sessions.extend(sessions)
+            self.condition.notify_all()
+        for future in futures:
+            if future.exception():
+                raise future.exception()
+
+    def checkout(self, timeout=None):
+        """Take a session from the pool, logging in a new one if none is idle and the pool is not full.
+
+        :param timeout: The number of seconds to wait for a session if the pool is full, or None to wait indefinitely.
+        :return: An RPCSession, which should be given back using :meth:`checkin`.
+        :raises PoolExhausted: If no session became available within timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        dead_sessions = []
+        try:
+            with self.condition:
+                while True:
+                    if self.is_closed:
+                        raise GemstoneApiError('This SessionPool is closed.')
+                    while self.idle_sessions:
+                        session = self.idle_sessions.pop()
+                        if session.is_logged_in:
+                            self.checked_out.add(session)
+                            return session
+                        self.size -= 1
+                        dead_sessions.append(session)
+                    if self.size < self.max_size:
+                        self.size += 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolExhausted('No session became available within %s seconds' % timeout)
+                    self.condition.wait(remaining)
+        finally:
+            for session in dead_sessions:
+                self.log_out(session)
+        try:
+            session = self.create_session()
+        except:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.checked_out.add(session)
+        return session
+
+    def checkin(self, session, discard=False):
+        """Give a session obtained via :meth:`checkout` back to the pool.
+
+        The session is aborted, and the objects of its GemObjects released, first; if that fails
+        (or if discard is True) it is logged out and removed from the pool instead.
+
+        :param session: The session to give back.
+        :param discard: If True, do not reuse the session (for example, after a fatal error).
+        :raises GemstoneApiError: If session is not checked out of this pool (for example, because
+                                  it was checked in already).
+        """
+        with self.condition:
+            if session not in self.checked_out:
+                raise GemstoneApiError('%r is not checked out of this SessionPool' % session)
+            self.checked_out.remove(session)
+        self.renew(session, discard=discard)
+
+    def renew(self, session, discard=False):
+        # Aborts session and makes it idle again, or logs it out; answers whether it was kept
+        if not discard:
+            try:
+                session.abort()
+                session.forget_gem_objects()
+            except (GemstoneError, InvalidSession):
+                discard = True
+        with self.condition:
+            kept = not (discard or self.is_closed)
+            if kept:
+                self.idle_sessions.append(session)
+            else:
+                self.size -= 1
+            self.condition.notify()
+        if not kept:
+            self.log_out(session)
+        return kept
+
+    def abort_idle_sessions(self, idle_time=0):
+        """Abort the sessions that are idle in the pool, so that they do not keep old views of the
+        repository (and thus commit records) alive on the stone.
+
+        The idle sessions are taken out of the pool while they are aborted, and given back
+        as with :meth:`checkin`.
+
+        :param idle_time: Only abort sessions that have not been used for at least this many seconds.
+        :return: A list of the sessions that were aborted and given back (not those that were
+                 discarded because they failed to abort).
+        """
+        with self.condition:
+            now = time.monotonic()
+            sessions = [session for session in self.idle_sessions if now - session.last_activity >= idle_time]
+            for session in sessions:
+                self.idle_sessions.remove(session)
+        return [session for session in sessions if self.renew(session)]
+
+    @contextmanager
+    def session(self, timeout=None):
+        """Check out a session for the duration of a with block::
+
+            with pool.session() as session:
+                ...
+
+        The session is discarded if a fatal GemstoneError is raised in the with block.
+
+        :param timeout: See :meth:`checkout`.
+        """
+        session = self.checkout(timeout=timeout)
+        try:
+            yield session
+        except GemstoneError as error:
+            self.checkin(session, discard=error.is_fatal)
+            raise
+        except:
+            self.checkin(session)
+            raise
+        else:
+            self.checkin(session)
+
+    def log_out(self, session):
+        try:
+            session.log_out()
+        except (GemstoneError, InvalidSession):
+            pass
+
+    def close(self):
+        """Log out all idle sessions. Sessions still checked out are logged out when they are checked in."""
+        with self.condition:
+            self.is_closed = True
+            sessions = list(self.idle_sessions)
+            self.idle_sessions.clear()
+            self.size -= len(sessions)
+            self.condition.notify_all()
+        for session in sessions:
+            self.log_out(session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,267 @@
+# Copyright (C) 2025 Reahl Software Services (Pty) Ltd
+# 
+# This file is part of parseltongue.
+#
+# parseltongue is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# parseltongue is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Warm standby sessions
+=====================
+
+When a Gem dies, or the stone is restarted, its session hits a fatal error and
+has to be replaced, and logging in a new RPCSession takes long. A :class:`WarmStandby`
+keeps one or more sessions logged in as standbys, so that it can fail over to one
+of them right away::
+
+    standby = WarmStandby('DataCurator', 'swordfish')
+    names = standby.call(lambda session: session.execute('Customers collect: [:each | each name]').to_py,
+                         idempotent=True)
+
+The broken session is replaced by a new standby in the background. If logging in
+fails (for example, while the stone is restarting), it is tried again after a delay
+that doubles with each failure, up to max_backoff seconds.
+
+A WarmStandby also has the :meth:`~WarmStandby.abort_idle_sessions` method of a
+:class:`~reahl.ptongue.SessionPool`, so that its standby sessions can be kept from
+holding on to old views by an :class:`~reahl.ptongue.AbortScheduler`.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import warnings
+
+from .gemproxy import GemstoneError, GemstoneApiError, GemstoneWarning, InvalidSession
+from .gemproxyrpc import RPCSession
+
+
+class WarmStandby:
+    """An active RPCSession, with standby sessions logged in to take its place when it breaks.
+
+    A session is considered broken if it raised a fatal GemstoneError, or is not logged
+    in anymore. GemObjects belong to the session they were obtained from, and cannot be
+    used with the session that replaced it.
+
+    :param username: GemStone username for repository authentication
+    :param password: GemStone password for repository authentication
+    :param stone_name: Name of the stone (repository) to connect to
+    :param host_username: Operating system username for host authentication
+    :param host_password: Operating system password for host authentication
+    :param netldi_task: Network service name
+    :param standbys: The number of standby sessions to keep logged in.
+    :param initial_backoff: The number of seconds to wait before retrying a failed login.
+    :param max_backoff: The maximum number of seconds to wait between login attempts.
+    """
+    def __init__(self, username, password, stone_name='gs64stone',
+                 host_username=None, host_password=None, netldi_task='gemnetobject',
+                 standbys=1, initial_backoff=0.5, max_backoff=30):
+        if standbys < 1:
+            raise GemstoneApiError('Expected at least 1 standby session, got {}'.format(standbys))
+        self.login_args = dict(username=username, password=password, stone_name=stone_name,
+                               host_username=host_username, host_password=host_password, netldi_task=netldi_task)
+        self.standbys = standbys
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.standby_sessions = deque()
+        self.condition = threading.Condition()
+        self.closed = threading.Event()
+        with ThreadPoolExecutor(max_workers=standbys + 1) as executor:
+            futures = [executor.submit(self.create_session) for i in range(standbys + 1)]
+        sessions = [future.result() for future in futures if not future.exception()]
+        if len(sessions) < len(futures):
+            for session in sessions:
+                self.log_out(session)
+            raise next(future.exception() for future in futures if future.exception())
+        self.active = sessions.pop()
+        self.standby_sessions.extend(sessions)
+
+    def create_session(self):
+        return RPCSession(**self.login_args)
+
+    @property
+    def session(self):
+        """The currently active session."""
+        return self.active
+
+    def is_broken(self, session, error=None):
+        """Answer whether session is broken, given the error it raised (if any)."""
+        if isinstance(error, GemstoneError) and error.is_fatal:
+            return True
+        return not session.is_logged_in
+
+    def fail_over(self, broken_session):
+        """Make a standby session the active session instead of broken_session.
+
+        If no standby session is ready, a new session is logged in right away (without holding
+        up other threads). The broken session is logged out and replaced by a new standby in the
+        background. If broken_session is not the active session (because another thread failed
+        it over already), nothing is done.
+
+        :param broken_session: The (previously active) session that broke.
+        :return: The new active session.
+        :raises GemstoneError: If no standby was ready and logging in a new session failed. The
+                               broken session then stays active, and a standby is logged in in
+                               the background for the next attempt.
+        """
+        with self.condition:
+            if broken_session is not self.active:
+                return self.active
+            session = self.take_standby()
+        if session is None:
+            try:
+                session = self.create_session()
+            except:
+                self.replace_in_background(None)
+                raise
+        with self.condition:
+            if broken_session is self.active and not self.closed.is_set():
+                self.active = session
+                self.replace_in_background(broken_session)
+                return session
+            # Another thread failed over (or the WarmStandby was closed) while this one was logging in
+            is_spare = len(self.standby_sessions) < self.standbys and not self.closed.is_set()
+            if is_spare:
+                self.standby_sessions.append(session)
+                self.condition.notify_all()
+            active = self.active
+        if not is_spare:
+            self.log_out(session)
+        return active
+
+    def take_standby(self):
+        # Only called with self.condition held
+        while self.standby_sessions:
+            session = self.standby_sessions.popleft()
+            if session.is_logged_in:
+                return session
+            self.replace_in_background(session)
+        return None
+
+    def replace_in_background(self, broken_session):
+        thread = threading.Thread(target=self.replace, args=(broken_session,), name='WarmStandby', daemon=True)
+        thread.start()
+
+    def replace(self, broken_session):
+        if broken_session is not None:
+            self.log_out(broken_session)
+        delay = self.initial_backoff
+        while not self.closed.is_set():
+            with self.condition:
+                if len(self.standby_sessions) >= self.standbys:
+                    return
+            try:
+                session = self.create_session()
+            except Exception as ex:
+                warnings.warn('Could not log in a standby session, retrying in %s seconds: %s' % (delay, ex), GemstoneWarning)
+                self.closed.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+            else:
+                with self.condition:
+                    # Another replacement may have filled the standbys while this one logged in
+                    if not self.closed.is_set() and len(self.standby_sessions) < self.standbys:
+                        self.standby_sessions.append(session)
+                        self.condition.notify_all()
+                        return
+                self.log_out(session)
+                return
+
+    def wait_for_standbys(self, timeout=None):
+        """Wait until all standby sessions are logged in.
+
+        :param timeout: The number of seconds to wait, or None to wait indefinitely.
+        :return: True if all standby sessions are logged in, False if timeout passed first.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: len(self.standby_sessions) >= self.standbys, timeout)
+
+    def call(self, fn, *args, idempotent=False, **kwargs):
+        """Call fn(session, *args, **kwargs) with the active session, failing over if the session breaks.
+
+        :param fn: The callable to call.
+        :param idempotent: If True, fn only reads (or can safely be repeated), and is called again
+                           with the new active session if the session breaks. Otherwise, the error
+                           is raised after failing over.
+        :return: The result of fn.
+        :raises: The error raised by fn if it broke the session and failing over failed too; the
+                 error of failing over is then its `__cause__`.
+        """
+        session = self.active
+        try:
+            return fn(session, *args, **kwargs)
+        except (GemstoneError, InvalidSession) as ex:
+            if not self.is_broken(session, error=ex):
+                raise
+            try:
+                new_session = self.fail_over(session)
+            except Exception as login_error:
+                raise ex from login_error
+            if not idempotent:
+                raise
+        return fn(new_session, *args, **kwargs)
+
+    def abort_idle_sessions(self, idle_time=0):
+        """Abort the standby sessions, so that they do not keep old views of the repository alive.
+
+        The sessions are taken out of the standbys while they are aborted, so that they cannot
+        become active meanwhile. Sessions with uncommitted changes are not aborted, and standby
+        sessions that fail to abort are replaced in the background.
+
+        :param idle_time: Only abort sessions that have not been used for at least this many seconds.
+        :return: A list of the standby sessions that were aborted.
+        """
+        with self.condition:
+            now = time.monotonic()
+            sessions = [session for session in self.standby_sessions if now - session.last_activity >= idle_time]
+            for session in sessions:
+                self.standby_sessions.remove(session)
+        aborted = []
+        for session in sessions:
+            try:
+                if not session.execute('System needsCommit').to_py:
+                    session.abort()
+                    aborted.append(session)
+            except (GemstoneError, InvalidSession):
+                self.replace_in_background(session)
+                continue
+            with self.condition:
+                is_kept = not self.closed.is_set() and len(self.standby_sessions) < self.standbys
+                if is_kept:
+                    self.standby_sessions.append(session)
+                    self.condition.notify_all()
+            if not is_kept:
+                self.log_out(session)
+                if session in aborted:
+                    aborted.remove(session)
+        return aborted
+
+    def log_out(self, session):
+        try:
+            session.log_out()
+        except (GemstoneError, InvalidSession):
+            pass
+
+    def close(self):
+        """Log out the active and standby sessions, and stop replacing broken sessions."""
+        self.closed.set()
+        with self.condition:
+            sessions = [self.active] + list(self.standby_sessions)
+            self.standby_sessions.clear()
+        for session in sessions:
+            self.log_out(session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
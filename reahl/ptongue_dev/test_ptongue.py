@@ -15,8 +15,13 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with parseltongue.  If not, see <https://www.gnu.org/licenses/>.
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+import gc
 import os
+import pickle
+import stat
 import threading
 import time
 import warnings
@@ -24,8 +29,11 @@ import warnings
 import pytest
 from reahl.tofu import expected, NoException
 
-from reahl.ptongue import GemObject, GemstoneError, NotSupported, InvalidSession, GemstoneApiError, GemstoneWarning, RPCSession, LinkedSession
+from reahl.ptongue import GemObject, ImmediateGemObject, PersistentReference, GemstoneError, GemstoneTimeout, ResultTooLarge, NotSupported, InvalidSession, GemstoneApiError, GemstoneWarning, RPCSession, LinkedSession, SessionPool, PoolExhausted, \
+    AsyncRPCSession, AsyncGemObject, GemExecutor, LinkedWorkerPool, WorkerError, AbortScheduler, WarmStandby
 from reahl.ptongue.gemstonecontrol import GemstoneInstallation, GemstoneService, NetLDI, Stone
+from reahl.ptongue.executor import index_ranges
+from reahl.ptongue.mux import SessionMultiplexer, MuxClient, MuxError, RemoteObject, message_header, max_message_size, receive_message
 
 #======================================================================================================================
 
@@ -122,6 +130,18 @@ def test_rpc_session_login_captive_os_user(guestmode_netldi):
         session.log_out()
 
 
+def test_rpc_sessions_share_their_library(guestmode_netldi):
+    """The GemStone library is loaded once per process, and its functions are only bound when first used."""
+    session = RPCSession('DataCurator', 'swordfish')
+    another_session = RPCSession('DataCurator', 'swordfish')
+    try:
+        assert session.gci is another_session.gci
+        assert 'GciTsLogin' in session.gci.__dict__
+    finally:
+        session.log_out()
+        another_session.log_out()
+
+
 def test_rpc_session_login_os_user(stone_fixture):
     with running_netldi(guest_mode=False):
         
@@ -178,6 +198,533 @@ def test_linked_session_is_remote_exception(invalid_linked_session):
         invalid_linked_session.is_remote
 
 
+#--[ pooling sessions ]------------------------------------------------------------
+
+def test_session_pool_reuses_sessions(guestmode_netldi):
+    with SessionPool('DataCurator', 'swordfish', min_size=2, max_size=2) as pool:
+        assert len(pool.idle_sessions) == 2
+        assert all(session.is_logged_in for session in pool.idle_sessions)
+
+        with pool.session() as session:
+            pass
+        with pool.session() as same_session:
+            assert same_session is session
+
+        first = pool.checkout()
+        second = pool.checkout()
+        with expected(PoolExhausted):
+            pool.checkout(timeout=0.1)
+
+        def give_back_later():
+            time.sleep(0.2)
+            pool.checkin(first)
+        thread = threading.Thread(target=give_back_later)
+        thread.start()
+        assert pool.checkout(timeout=5) is first
+        thread.join()
+
+        pool.checkin(first)
+        pool.checkin(second)
+    assert not first.is_logged_in
+    assert not second.is_logged_in
+
+
+def test_session_pool_aborts_returned_sessions(guestmode_netldi):
+    with SessionPool('DataCurator', 'swordfish', min_size=1, max_size=1) as pool:
+        with pool.session() as session:
+            session.begin()
+            session.execute('UserGlobals at: #pooltest put: 123')
+        with pool.session() as session:
+            assert session.execute('UserGlobals at: #pooltest ifAbsent: [nil]').to_py is None
+
+
+def test_session_pool_releases_objects_of_returned_sessions(guestmode_netldi, oop_true):
+    in_export_set = 'System testIf: self isInHiddenSet: 39'
+    with SessionPool('DataCurator', 'swordfish', min_size=1, max_size=1) as pool:
+        with pool.session() as session:
+            borrowed = session.execute("'borrowed' copy")
+            statement = session.prepare('3 + 4')
+            add = session.method('+')
+            borrowed_oop = borrowed.oop
+        with pool.session() as same_session:
+            assert same_session is session
+            assert borrowed_oop not in session.instances
+            assert not session.execute(in_export_set, context=borrowed).oop == oop_true
+            assert statement().to_py == 7
+            assert add(3, 4).to_py == 7
+            assert session.execute(in_export_set, context=add.selector_symbol).oop == oop_true
+
+        with expected(GemstoneApiError, test=r'.* is not checked out of this SessionPool'):
+            pool.checkin(session)
+        assert len(pool.idle_sessions) == 1
+
+
+def test_session_pool_replaces_broken_sessions(guestmode_netldi):
+    with SessionPool('DataCurator', 'swordfish', min_size=1, max_size=1) as pool:
+        broken_session = pool.checkout()
+        broken_session.log_out()
+        pool.checkin(broken_session)
+        assert pool.size == 0
+
+        with pool.session() as session:
+            assert session is not broken_session
+            assert session.is_logged_in
+            session.log_out()
+        with pool.session() as session:
+            assert session.is_logged_in
+        assert pool.size == 1
+
+
+#--[ asyncio sessions ]------------------------------------------------------------
+
+def test_async_rpc_session_executes_and_performs(guestmode_netldi):
+    async def check():
+        session = await AsyncRPCSession.log_in('DataCurator', 'swordfish')
+        try:
+            number = await session.execute('3 + 4')
+            assert isinstance(number, AsyncGemObject)
+            assert await number.to_py == 7
+            assert await (await number.perform('+', 1)).to_py == 8
+            assert await (await number.max(20)).to_py == 20
+
+            collection = session.from_py([1, 'two', {3}])
+            assert await collection.to_py == [1, 'two', {3}]
+            assert [await i.to_py for i in [i async for i in collection]] == [1, 'two', {3}]
+            assert await (await session.execute("Dictionary new at: 'a' put: 1; yourself")).to_py == {'a': 1}
+
+            with expected(GemstoneError, test=r'.*a ZeroDivide occurred'):
+                await session.execute('1/0')
+        finally:
+            session.log_out()
+    asyncio.run(check())
+
+
+def test_async_rpc_sessions_do_not_block_the_event_loop(guestmode_netldi):
+    async def check():
+        sessions = [await AsyncRPCSession.log_in('DataCurator', 'swordfish') for i in range(2)]
+        try:
+            ticks = []
+            async def tick():
+                while True:
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.05)
+            ticker = asyncio.create_task(tick())
+
+            start = time.monotonic()
+            results = await asyncio.gather(*[session.execute('(Delay forSeconds: 1) wait. 42') for session in sessions])
+            elapsed = time.monotonic() - start
+            ticker.cancel()
+
+            assert [await i.to_py for i in results] == [42, 42]
+            assert elapsed < 1.9
+            assert len(ticks) > 10
+        finally:
+            for session in sessions:
+                session.log_out()
+    asyncio.run(check())
+
+
+def test_cancelling_an_async_call_breaks_it(guestmode_netldi):
+    async def check():
+        session = await AsyncRPCSession.log_in('DataCurator', 'swordfish')
+        try:
+            call = asyncio.create_task(session.execute('(Delay forSeconds: 30) wait'))
+            await asyncio.sleep(0.5)
+            call.cancel()
+            with expected(asyncio.CancelledError):
+                await asyncio.wait_for(call, 5)
+            assert await (await session.execute('1 + 1')).to_py == 2
+        finally:
+            session.log_out()
+    asyncio.run(check())
+
+
+def test_async_rpc_session_shares_its_session_safely(guestmode_netldi):
+    async def check():
+        session = await AsyncRPCSession.log_in('DataCurator', 'swordfish')
+        try:
+            # Blocking calls are refused while an asynchronous call is in progress
+            call = asyncio.create_task(session.execute('(Delay forMilliseconds: 500) wait. 42'))
+            await asyncio.sleep(0.1)
+            with expected(GemstoneApiError, test=r'Cannot make a blocking call while an asynchronous call is in progress.*'):
+                session.from_py('abc')
+            assert await (await call).to_py == 42
+
+            # Other threads using the underlying RPCSession take turns with the event loop
+            loop = asyncio.get_running_loop()
+            in_thread = loop.run_in_executor(None, session.rpc_session.execute, '(Delay forMilliseconds: 500) wait. 1')
+            in_loop = asyncio.create_task(session.execute('2'))
+            assert (await in_thread).to_py == 1
+            assert await (await in_loop).to_py == 2
+
+            # LargeIntegers are converted asynchronously too
+            assert await (await session.execute('2 raisedTo: 100')).to_py == 2**100
+        finally:
+            session.log_out()
+    asyncio.run(check())
+
+
+#--[ threads ]------------------------------------------------------------
+
+def test_rpc_sessions_in_different_threads_run_in_parallel(guestmode_netldi):
+    sessions = [RPCSession('DataCurator', 'swordfish') for i in range(4)]
+    try:
+        def work(session):
+            session.execute('(Delay forMilliseconds: 500) wait')
+            return session.execute('3 + 4').to_py
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+            results = list(executor.map(work, sessions))
+        elapsed = time.monotonic() - start
+
+        assert results == [7] * len(sessions)
+        assert elapsed < 1.5
+    finally:
+        for session in sessions:
+            session.log_out()
+
+
+def test_rpc_session_shared_by_threads(rpc_session):
+    rpc_session.export_set_free_batch_size = 10
+    failures = []
+    add = rpc_session.method('+')
+
+    def work(thread_number):
+        try:
+            for i in range(200):
+                expected_string = '%s-%s' % (thread_number, i)
+                assert rpc_session.from_py(expected_string).to_py == expected_string
+                assert add(rpc_session.from_py(thread_number * 1000), i).to_py == thread_number * 1000 + i
+                collection = rpc_session.execute("OrderedCollection with: 'a' with: 'b'")
+                assert collection.size().to_py == 2
+                assert rpc_session.get_or_create_gem_object(collection.oop) is collection
+                assert rpc_session.UserGlobals is rpc_session.UserGlobals
+        except Exception as ex:
+            failures.append(ex)
+
+    threads = [threading.Thread(target=work, args=(thread_number,)) for thread_number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures
+
+    gc.collect()
+    rpc_session.remove_dead_gemstone_objects()
+    assert all(ref() is not None for ref in rpc_session.instances.refs.values())
+
+
+def test_rpc_session_probes_do_not_wait_for_calls_in_progress(rpc_session):
+    call = threading.Thread(target=rpc_session.execute, args=('(Delay forSeconds: 2) wait',))
+    call.start()
+    try:
+        time.sleep(0.3)
+        start = time.monotonic()
+        assert rpc_session.is_logged_in
+        rpc_session.is_remote
+        assert time.monotonic() - start < 1
+    finally:
+        call.join()
+
+
+def test_gem_executor_runs_calls_in_parallel_sessions(guestmode_netldi):
+    with GemExecutor('DataCurator', 'swordfish', max_workers=3) as executor:
+        def square(session, number):
+            session.execute('(Delay forMilliseconds: 500) wait')
+            return session.execute('%s * %s' % (number, number)).to_py
+
+        start = time.monotonic()
+        assert list(executor.map(square, [1, 2, 3])) == [1, 4, 9]
+        assert time.monotonic() - start < 1.4
+
+
+def test_index_ranges():
+    assert index_ranges(10, 3) == [(1, 4), (5, 7), (8, 10)]
+    assert index_ranges(2, 4) == [(1, 1), (2, 2)]
+    assert index_ranges(0, 4) == []
+
+
+def test_gem_executor_processes_a_collection_in_ranges(guestmode_netldi):
+    with GemExecutor('DataCurator', 'swordfish', max_workers=4) as executor:
+        def sum_range(session, collection, first, last):
+            return session.execute('| sum | sum := 0. self from: %s to: %s do: [:i | sum := sum + i]. sum' % (first, last),
+                                   context=collection).to_py
+
+        numbers = '(1 to: 1000) asArray'
+        assert executor.map_ranges(numbers, sum_range, merge=sum) == sum(range(1, 1001))
+        assert len(executor.map_ranges(numbers, sum_range, partitions=7)) == 7
+
+
+#--[ session multiplexer ]------------------------------------------------------------
+
+@pytest.fixture
+def session_multiplexer(guestmode_netldi, tmp_path):
+    socket_path = str(tmp_path / 'mux.sock')
+    with SessionPool('DataCurator', 'swordfish', min_size=1, max_size=1) as pool:
+        server = SessionMultiplexer(socket_path, pool, checkout_timeout=0.5)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            yield server
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+
+
+def test_session_multiplexer(session_multiplexer):
+    socket_path = session_multiplexer.server_address
+    with MuxClient(socket_path) as client:
+        number = client.execute('3 + 4')
+        assert isinstance(number, RemoteObject)
+        assert number.to_py == 7
+        assert number.perform('+', 1).to_py == 8
+        assert number.max(20).to_py == 20
+        assert client.execute('self + 1', context=number).to_py == 8
+
+        assert client.execute("Set with: 1 with: 'two'").to_py == {1, 'two'}
+        assert client.execute("Dictionary new at: 1 put: 'one'; yourself").to_py == {1: 'one'}
+        collection = client.execute('OrderedCollection new')
+        collection.add([1, 2])
+        assert collection.to_py == [[1, 2]]
+
+        with expected(MuxError, test=r'.*a ZeroDivide occurred'):
+            client.execute('1/0')
+
+        client.release(collection)
+        with expected(MuxError, test=r'.*No object with oop'):
+            collection.size()
+
+    with MuxClient(socket_path) as client:
+        assert client.execute('3 + 4').to_py == 7
+
+
+def test_session_multiplexer_answers_failures_as_errors(session_multiplexer):
+    socket_path = session_multiplexer.server_address
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) & 0o077 == 0
+
+    with MuxClient(socket_path) as client:
+        assert client.execute('#[1 2 3]').to_py == b'\x01\x02\x03'
+
+        # the only session in the pool is in use by client
+        with MuxClient(socket_path) as waiting_client:
+            with expected(MuxError, test=r'.*PoolExhausted: .*'):
+                waiting_client.execute('3 + 4')
+
+    with MuxClient(socket_path) as client:
+        client.connection.sendall(message_header.pack(max_message_size + 1))
+        with expected(MuxError, test=r'.*MuxError: Message of .* bytes is larger than .*'):
+            client.request('execute', source='3 + 4')
+        assert receive_message(client.connection) is None
+
+
+def test_session_multiplexer_discards_lost_sessions(session_multiplexer):
+    socket_path = session_multiplexer.server_address
+    with MuxClient(socket_path) as client:
+        string = client.execute("'abc' copy")
+        with expected(MuxError, test=r'.*the session was lost.*'):
+            client.execute('System logout')
+        with expected(MuxError, test=r'.*No object with oop'):
+            string.size()
+
+        # The next request is given a new session
+        assert client.execute('3 + 4').to_py == 7
+
+
+#--[ linked worker processes ]------------------------------------------------------------
+
+def add_in_worker(session, a, b=0):
+    return session.execute('%s + %s' % (a, b)).to_py
+
+def session_id_in_worker(session, i):
+    return session.c_session_id
+
+def fail_in_worker(session):
+    session.execute('1/0')
+
+def log_out_in_worker(session, fail):
+    session.log_out()
+    if fail:
+        raise ValueError('the original problem')
+    return 'done'
+
+
+def test_linked_worker_pool(stone_fixture):
+    with LinkedWorkerPool('DataCurator', 'swordfish', workers=2) as pool:
+        assert pool.apply(add_in_worker, 1, b=2) == 3
+        assert pool.submit(add_in_worker, 2, b=2).get() == 4
+        assert pool.map(add_in_worker, range(10)) == list(range(10))
+        assert list(pool.imap(add_in_worker, range(5))) == list(range(5))
+        assert sorted(pool.imap_unordered(add_in_worker, range(5))) == list(range(5))
+        assert 1 <= len(set(pool.map(session_id_in_worker, range(20)))) <= 2
+
+        with expected(WorkerError, test=r'.*a ZeroDivide occurred'):
+            pool.apply(fail_in_worker)
+        assert pool.apply(add_in_worker, 1) == 1
+
+
+def test_linked_worker_pool_survives_sessions_that_cannot_abort(stone_fixture):
+    with LinkedWorkerPool('DataCurator', 'swordfish', workers=1) as pool:
+        assert pool.apply(log_out_in_worker, False) == 'done'
+        with expected(ValueError, test='the original problem'):
+            pool.apply(log_out_in_worker, True)
+        assert pool.apply(add_in_worker, 1, b=2) == 3
+
+
+def test_linked_worker_pool_cannot_fork_a_logged_in_linked_session(linked_session):
+    with expected(GemstoneApiError, test=r'Cannot fork workers while this process has a logged in LinkedSession\.'):
+        LinkedWorkerPool('DataCurator', 'swordfish')
+
+
+#--[ aborting long-lived sessions ]------------------------------------------------------------
+
+def check_abort_scheduler_aborts_idle_sessions(session):
+    other_session = RPCSession('DataCurator', 'swordfish')
+    session.abort()
+    try:
+        assert session.execute('UserGlobals at: #abortSchedulerTest ifAbsent: [nil]').to_py is None
+        other_session.execute('UserGlobals at: #abortSchedulerTest put: 1')
+        other_session.commit()
+        assert session.execute('UserGlobals at: #abortSchedulerTest ifAbsent: [nil]').to_py is None
+
+        scheduler = AbortScheduler(idle_time=0.5)
+        scheduler.add(session)
+        aborted = []
+        scheduler.add_hook(aborted.append)
+
+        # Sessions that were used recently are left alone
+        assert scheduler.abort_sessions() == []
+        time.sleep(0.5)
+        assert scheduler.abort_sessions() == [session]
+        assert aborted == [session]
+        assert session.execute('UserGlobals at: #abortSchedulerTest ifAbsent: [nil]').to_py == 1
+
+        # Sessions with uncommitted changes are left alone
+        session.execute('UserGlobals at: #abortSchedulerUncommitted put: 1')
+        time.sleep(0.5)
+        assert scheduler.abort_sessions() == []
+        assert session.execute('UserGlobals at: #abortSchedulerUncommitted ifAbsent: [nil]').to_py == 1
+        session.abort()
+
+        # The scheduler does abort passes in a thread of its own
+        notified = threading.Event()
+        scheduler.add_hook(lambda aborted_session: notified.set())
+        time.sleep(0.5)
+        with scheduler:
+            scheduler.notify()
+            assert notified.wait(5)
+    finally:
+        other_session.execute('UserGlobals removeKey: #abortSchedulerTest ifAbsent: [nil]')
+        other_session.commit()
+        other_session.log_out()
+        session.abort()
+
+
+def test_rpc_abort_scheduler_aborts_idle_sessions(rpc_session):
+    check_abort_scheduler_aborts_idle_sessions(rpc_session)
+
+
+def test_linked_abort_scheduler_aborts_idle_sessions(linked_session, guestmode_netldi):
+    check_abort_scheduler_aborts_idle_sessions(linked_session)
+
+
+def test_abort_scheduler_aborts_idle_pooled_sessions(guestmode_netldi):
+    with SessionPool('DataCurator', 'swordfish', min_size=1, max_size=1) as pool:
+        with pool.session() as session:
+            pass
+        with pool.session() as other_session:
+            assert other_session is session
+
+        changing_session = RPCSession('DataCurator', 'swordfish')
+        try:
+            changing_session.execute('UserGlobals at: #abortSchedulerTest put: 2')
+            changing_session.commit()
+
+            scheduler = AbortScheduler(idle_time=0)
+            scheduler.add_pool(pool)
+            assert scheduler.abort_sessions() == [session]
+            with pool.session() as same_session:
+                assert same_session is session
+                assert session.execute('UserGlobals at: #abortSchedulerTest ifAbsent: [nil]').to_py == 2
+
+            # Sessions that are discarded because they cannot abort are not reported as aborted
+            with pool.session() as session:
+                pass
+            session.log_out()
+            assert scheduler.abort_sessions() == []
+        finally:
+            changing_session.execute('UserGlobals removeKey: #abortSchedulerTest ifAbsent: [nil]')
+            changing_session.commit()
+            changing_session.log_out()
+
+
+#--[ warm standby sessions ]------------------------------------------------------------
+
+def add_with(session, a, b):
+    return session.execute('%s + %s' % (a, b)).to_py
+
+
+def test_warm_standby_fails_over_to_a_standby_session(guestmode_netldi):
+    with WarmStandby('DataCurator', 'swordfish', standbys=1, initial_backoff=0.1) as standby:
+        first = standby.session
+        spare = standby.standby_sessions[0]
+        assert first.is_logged_in and spare.is_logged_in
+        assert standby.call(add_with, 3, 4) == 7
+
+        # Calls that are not idempotent raise the error, but the next call uses the standby
+        first.log_out()
+        with expected(GemstoneError):
+            standby.call(add_with, 3, 4)
+        assert standby.session is spare
+        assert standby.fail_over(first) is spare
+
+        # The broken session is replaced in the background
+        assert standby.wait_for_standbys(timeout=30)
+        replacement = standby.standby_sessions[0]
+        assert replacement.is_logged_in
+        assert replacement not in (first, spare)
+        assert not first.is_logged_in
+
+        # Idempotent calls are retried with the new active session
+        spare.log_out()
+        assert standby.call(add_with, 3, 4, idempotent=True) == 7
+        assert standby.session is replacement
+
+        # Errors that do not break the session are just raised
+        with expected(GemstoneError, test=r'.*a ZeroDivide occurred'):
+            standby.call(add_with, 1, '0 / 0', idempotent=True)
+        assert standby.session is replacement
+
+        assert standby.wait_for_standbys(timeout=30)
+        assert standby.abort_idle_sessions() == list(standby.standby_sessions)
+        sessions = [standby.session] + list(standby.standby_sessions)
+    assert not any(session.is_logged_in for session in sessions)
+
+
+def test_warm_standby_keeps_the_original_error_if_it_cannot_fail_over(guestmode_netldi):
+    with WarmStandby('DataCurator', 'swordfish', standbys=1, initial_backoff=0.1) as standby:
+        broken = standby.session
+        with standby.condition:
+            spare = standby.standby_sessions.popleft()
+        standby.log_out(spare)
+        standby.login_args['password'] = 'wrong password'
+
+        # The error of the call is raised, with the failed login as its cause
+        broken.log_out()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', GemstoneWarning)
+            with expected(GemstoneError, test=lambda e: isinstance(e.__cause__, GemstoneError) and e.__cause__ is not e):
+                standby.call(add_with, 3, 4, idempotent=True)
+            assert standby.session is broken
+
+            # A standby is logged in in the background once logging in works again
+            standby.login_args['password'] = 'swordfish'
+            assert standby.wait_for_standbys(timeout=30)
+        assert standby.call(add_with, 3, 4, idempotent=True) == 7
+        assert standby.session is not broken
+
+
 #--[ singleton linked session ]------------------------------------------------------------
 
 def test_linked_singleton_error(linked_session):
@@ -289,6 +836,52 @@ def test_rpc_session_resolve_symbol_object(rpc_session):
 def test_linked_session_resolve_symbol_object(linked_session):
     check_resolve_symbol_object(linked_session)
 
+
+def check_resolved_symbols_are_cached(session):
+    """Resolved symbols are remembered until the cache is cleared, or until a transaction boundary."""
+    user_globals = session.resolve_symbol('UserGlobals')
+    some_key = session.new_symbol('cachedValue')
+
+    user_globals.at_put(some_key, 1)
+    assert session.resolve_symbol('cachedValue').to_py == 1
+
+    user_globals.at_put(some_key, 2)
+    assert session.resolve_symbol('cachedValue').to_py == 1
+
+    session.clear_symbol_cache()
+    assert session.resolve_symbol('cachedValue').to_py == 2
+
+    session.abort()
+    with expected(GemstoneError):
+        session.resolve_symbol('cachedValue')
+
+
+def test_rpc_session_resolved_symbols_are_cached(rpc_session):
+    check_resolved_symbols_are_cached(rpc_session)
+
+
+def test_linked_session_resolved_symbols_are_cached(linked_session):
+    check_resolved_symbols_are_cached(linked_session)
+
+
+def check_preloading_symbols(session):
+    preloaded = session.preload(['OrderedCollection', 'Dictionary', 'DoesNotExist'])
+
+    assert set(preloaded.keys()) == {'OrderedCollection', 'Dictionary'}
+    assert preloaded['Dictionary'] is session.resolve_symbol('Dictionary')
+    assert str(session.OrderedCollection) == 'OrderedCollection'
+
+    with expected(GemstoneError):
+        session.resolve_symbol('DoesNotExist')
+
+
+def test_rpc_session_preloading_symbols(rpc_session):
+    check_preloading_symbols(rpc_session)
+
+
+def test_linked_session_preloading_symbols(linked_session):
+    check_preloading_symbols(linked_session)
+
         
 #--[ performing selectors and executing arbitrary code ]------------------------------------------------------------
         
@@ -355,6 +948,117 @@ def test_rpc_session_perform_exception(rpc_session):
 def test_linked_session_perform_exception(linked_session):
     check_perform_exception(linked_session)
 
+
+def check_call_sites(session):
+    user_globals = session.resolve_symbol('UserGlobals')
+    some_key = session.new_symbol('akey')
+
+    at_put = session.method('at:put:')
+    at_put(user_globals, some_key, 123)
+    assert user_globals.at(some_key).to_py == 123
+
+    plus = session.method('+')
+    assert plus(session.from_py(1), 2).to_py == 3
+
+    yourself = session.method('yourself')
+    assert yourself(user_globals) is user_globals
+
+    with expected(TypeError, test=r'at:put: takes exactly 2 arguments \(1 given\)'):
+        at_put(user_globals, some_key)
+
+
+def test_rpc_session_call_sites(rpc_session):
+    check_call_sites(rpc_session)
+
+
+def test_linked_session_call_sites(linked_session):
+    check_call_sites(linked_session)
+
+
+def check_batched_sends(session):
+    user_globals = session.resolve_symbol('UserGlobals')
+    some_key = session.new_symbol('akey')
+    user_globals.at_put(some_key, 'a value')
+    date_class = session.resolve_symbol('Date')
+
+    with session.batch() as batch:
+        batch.perform(user_globals, 'at:', some_key)
+        batch.perform(date_class, 'yourself')
+        batch.perform(date_class, 'asFloat')
+        batch.perform(session.from_py(3), '+', 4)
+
+    value, date, error, sum = batch.results
+    assert value.to_py == 'a value'
+    assert date is date_class
+    assert isinstance(error, GemstoneError)
+    assert error.number == 2010
+    assert 'asFloat' in error.message
+    assert sum.to_py == 7
+
+
+def test_rpc_session_batched_sends(rpc_session):
+    check_batched_sends(rpc_session)
+
+
+def test_linked_session_batched_sends(linked_session):
+    check_batched_sends(linked_session)
+
+
+def check_helper_library(session):
+    assert session.find_helper_library() is None
+
+    library = session.install_helper_library()
+    assert session.find_helper_library().oop == library.oop
+    assert session.helper('describe') == (library, 'describe:with:')
+
+    with session.batch() as batch:
+        batch.perform(session.from_py(3), '+', 4)
+    [sum] = batch.results
+    assert sum.to_py == 7
+    assert session.from_py('abc').perform_to_py(',', 'd') == 'abcd'
+    assert str(session.resolve_symbol('OrderedCollection')) == 'OrderedCollection'
+
+    session.abort()
+    assert session.find_helper_library() is None
+
+
+def test_rpc_session_helper_library(rpc_session):
+    check_helper_library(rpc_session)
+
+
+def test_linked_session_helper_library(linked_session):
+    check_helper_library(linked_session)
+
+
+def check_deferred_sends(session):
+    user_globals = session.resolve_symbol('UserGlobals')
+    some_key = session.new_symbol('akey')
+    user_globals.at_put(some_key, session.execute("OrderedCollection with: 'one' with: 'two'"))
+
+    second = user_globals.lazy().at(some_key).at(2)
+    assert second.to_py == 'two'
+    assert second.resolve() is second.resolve()
+
+    size = user_globals.lazy().at(some_key).size()
+    assert user_globals.at(some_key).at(size).to_py == 'two'
+
+    # Deferred arguments are resolved before any of the arguments are passed
+    pair = session.execute('Array new: 2')
+    pair.at_put(user_globals.lazy().at(some_key).size(), user_globals.lazy().at(some_key).at(1))
+    assert pair.at(2).to_py == 'one'
+
+    missing = user_globals.lazy().at(session.new_symbol('doesnotexist'))
+    with expected(GemstoneError):
+        missing.resolve()
+
+
+def test_rpc_session_deferred_sends(rpc_session):
+    check_deferred_sends(rpc_session)
+
+
+def test_linked_session_deferred_sends(linked_session):
+    check_deferred_sends(linked_session)
+
         
 def check_execute(session):
     date_class = session.execute('Date')
@@ -411,6 +1115,89 @@ def test_rpc_session_execute_exception(rpc_session):
 def test_linked_session_execute_exception(linked_session):
     check_session_execute_exception(linked_session)
 
+
+def check_execute_and_fetch(session):
+    assert session.execute_to_bytes('#[1 2 3]') == bytes([1, 2, 3])
+    assert session.execute_to_str('| a | a := 123. a printString') == '123'
+    assert session.execute_to_str('self , (String with: (Character codePoint: 235))',
+                                  context=session.from_py('abc')) == 'abcë'
+
+    with expected(ResultTooLarge, test=r'The result may be larger than 3 bytes'):
+        session.execute_to_bytes('#[1 2 3]', max_size=3)
+
+    with expected(GemstoneError):
+        session.execute_to_str('invalid smalltalk code')
+
+
+def test_rpc_session_execute_and_fetch(rpc_session):
+    check_execute_and_fetch(rpc_session)
+
+
+def test_linked_session_execute_and_fetch(linked_session):
+    check_execute_and_fetch(linked_session)
+
+
+def check_prepared_statements(session):
+    add = session.prepare('a + b', ['a', 'b'])
+    assert add(1, 2).to_py == 3
+    assert add(3, b=session.from_py(4)).to_py == 7
+    assert session.prepare('a + b', ['a', 'b']) is add
+
+    add_many = session.prepare('a + b + c + d + e', ['a', 'b', 'c', 'd', 'e'])
+    assert add_many(1, 2, 3, 4, 5).to_py == 15
+
+    today = session.prepare('Date today')
+    assert today().is_kind_of(session.resolve_symbol('Date'))
+
+    with expected(TypeError, test=r'PreparedStatement takes exactly the arguments a, b'):
+        add(1)
+
+    with expected(TypeError, test=r'PreparedStatement takes exactly the arguments a, b'):
+        add(1, 2, c=3)
+
+
+def test_rpc_session_prepared_statements(rpc_session):
+    check_prepared_statements(rpc_session)
+
+
+def test_linked_session_prepared_statements(linked_session):
+    check_prepared_statements(linked_session)
+
+
+def check_prepared_statement_cache_is_bounded(session):
+    session.prepared_statement_cache_size = 2
+    try:
+        first = session.prepare('1')
+        second = session.prepare('2')
+        assert session.prepare('1') is first
+        third = session.prepare('3')
+
+        # The least recently used statement made way for the new one
+        assert len(session.prepared_statements) == 2
+        assert session.prepare('1') is first
+        assert session.prepare('3') is third
+        assert session.prepare('2') is not second
+
+        # A dropped statement's block is released once it is not referred to anymore
+        block_oop = second.block.oop
+        del second
+        gc.collect()
+        assert block_oop in session.deallocated_unfreed_gemstone_objects
+
+        session.prepared_statement_cache_size = 0
+        assert session.prepare('1') is not session.prepare('1')
+        assert not session.prepared_statements
+    finally:
+        session.prepared_statement_cache_size = 256
+
+
+def test_rpc_session_prepared_statement_cache_is_bounded(rpc_session):
+    check_prepared_statement_cache_is_bounded(rpc_session)
+
+
+def test_linked_session_prepared_statement_cache_is_bounded(linked_session):
+    check_prepared_statement_cache_is_bounded(linked_session)
+
         
 #--[ transaction handling ]------------------------------------------------------------
 
@@ -442,6 +1229,44 @@ def test_rpc_session_transactions(rpc_session):
 def test_linked_session_transactions(linked_session):
     check_transactions(linked_session)
 
+
+def check_persistent_references(session):
+    user_globals = session.resolve_symbol('UserGlobals')
+    first = session.execute("OrderedCollection with: 'first'")
+    second = session.execute("OrderedCollection with: 'second'")
+    user_globals.at_put('persistentReferenceTest', session.from_py([first, second]))
+    session.commit()
+    try:
+        reference = pickle.loads(pickle.dumps(first.persistent_reference()))
+        assert reference == PersistentReference(first.oop, session.repository)
+        references = session.persistent_references([first, second, session.from_py(3)])
+
+        other_session = RPCSession('DataCurator', 'swordfish')
+        try:
+            attached = other_session.attach(reference)
+            assert attached.oop == first.oop
+            assert attached.to_py == ['first']
+            assert [i.to_py for i in other_session.attach_all(references)] == [['first'], ['second'], 3]
+
+            with expected(GemstoneApiError, test=r'Reference to oop .* is for repository elsewhere, not .*'):
+                other_session.attach(PersistentReference(first.oop, 'elsewhere'))
+        finally:
+            other_session.log_out()
+
+        with expected(GemstoneApiError, test=r'1 of the objects have not been committed'):
+            session.execute('Object new').persistent_reference()
+    finally:
+        user_globals.removeKey('persistentReferenceTest')
+        session.commit()
+
+
+def test_rpc_session_persistent_references(rpc_session):
+    check_persistent_references(rpc_session)
+
+
+def test_linked_session_persistent_references(linked_session, guestmode_netldi):
+    check_persistent_references(linked_session)
+
        
 def check_session_transactional_exceptions(invalid_session, error_message):
     with expected(GemstoneError, test=error_message):
@@ -512,6 +1337,114 @@ def test_rpc_session_identity_of_objects_not_guaranteed_if_not_referenced(rpc_se
 def test_linked_session_identity_of_objects_not_guaranteed_if_not_referenced(linked_session):
     check_identity_of_objects_not_guaranteed_if_not_referenced(linked_session)
 
+
+def check_identity_map_forgets_dead_gem_objects(session):
+    """GemObjects are compact (they have no __dict__), and the session's identity map
+       forgets them once they have died and their objects are released."""
+    date = session.resolve_symbol('Date')
+    date_oop = date.oop
+    assert type(date).__dictoffset__ == 0
+    assert session.instances.get(date_oop) is date
+
+    del(date)
+    assert session.instances.get(date_oop) is None
+    assert date_oop in session.instances.refs
+    session.remove_dead_gemstone_objects()
+    assert date_oop not in session.instances.refs
+
+
+def test_rpc_session_identity_map_forgets_dead_gem_objects(rpc_session):
+    check_identity_map_forgets_dead_gem_objects(rpc_session)
+
+
+def test_linked_session_identity_map_forgets_dead_gem_objects(linked_session):
+    check_identity_map_forgets_dead_gem_objects(linked_session)
+
+
+def check_special_objects_are_not_tracked(session):
+    """Special objects (like SmallIntegers, Characters, nil, true and false) are never in
+       the export set, so the session does not track or release them."""
+    three = session.from_py(3)
+    another_three = session.execute('1 + 2')
+    assert isinstance(three, ImmediateGemObject)
+    assert three == another_three
+    assert three.oop not in session.instances.refs
+
+    del(three)
+    del(another_three)
+    assert not session.deallocated_unfreed_gemstone_objects
+
+    assert session.from_py(None) is session.execute('nil')
+    assert session.from_py(True) is session.execute('true')
+    assert isinstance(session.execute('$a'), ImmediateGemObject)
+    assert not isinstance(session.execute('Date'), ImmediateGemObject)
+
+
+def test_rpc_session_special_objects_are_not_tracked(rpc_session):
+    check_special_objects_are_not_tracked(rpc_session)
+
+
+def test_linked_session_special_objects_are_not_tracked(linked_session):
+    check_special_objects_are_not_tracked(linked_session)
+
+
+def check_special_objects_behave_like_python_values(session):
+    three = session.execute('3')
+    four = session.execute('4')
+
+    assert three < four
+    assert three + four == 7
+    assert 10 - three == 7
+    assert three == 3
+    assert three != four
+    assert int(three) == 3
+    assert float(three) == 3.0
+    assert ['a', 'b', 'c', 'd'][three] == 'd'
+    assert hash(three) == hash(3)
+
+    assert session.execute('$a') == 'a'
+    assert session.execute('1.5') * 2 == 3.0
+
+    assert session.execute('true')
+    assert not session.execute('false')
+    assert not session.execute('nil')
+    assert not session.execute('0')
+
+    assert not three == session.resolve_symbol('Date')
+
+    # Only values of the same kind are equal
+    assert session.execute('1') != session.execute('true')
+    assert session.execute('true') != 1
+    assert session.execute('0') != False
+    assert session.execute('nil') != 0
+    assert session.execute('1') == session.execute('1.0')
+
+    # SmallDoubles are decoded from their oops, as the Gem does
+    for source in ['1.5', '-2.25', '0.1', '1.0e30', '0.0']:
+        small_double = session.execute(source)
+        assert isinstance(small_double, ImmediateGemObject)
+        assert small_double.to_py == session.object_float_to_py(small_double)
+
+    # Special objects that are not decoded locally (SmallFractions in GemStone 3.6 and later)
+    # are only equal to the same object, and hashing them does not ask the Gem
+    fraction = session.execute('1/3')
+    if isinstance(fraction, ImmediateGemObject):
+        same_fraction = session.execute('2/6')
+        assert fraction == same_fraction and hash(fraction) == hash(same_fraction)
+        assert fraction != session.execute('1/4')
+        assert fraction not in [1, True, None]
+        assert fraction
+        with expected(TypeError):
+            fraction + 1
+
+
+def test_rpc_session_special_objects_behave_like_python_values(rpc_session):
+    check_special_objects_behave_like_python_values(rpc_session)
+
+
+def test_linked_session_special_objects_behave_like_python_values(linked_session):
+    check_special_objects_behave_like_python_values(linked_session)
+
 def check_session_remove_unreferenced_gemstone_objects_from_gemstone_set(session, oop_true):
     """GemStone holds GemObjects that are returned to Python-side in an "export set" to ensure
        that they are not garbage collected when they're not referenced from inside GemStone while
@@ -525,7 +1458,7 @@ def check_session_remove_unreferenced_gemstone_objects_from_gemstone_set(session
     del(date)
     # Fetch enough objects from GemStone to trigger a batch, and stop referencing them from Python:
     for index in range(session.export_set_free_batch_size):
-        converted_index = session.execute('{}'.format(index))
+        converted_index = session.execute("'{}'".format(index))
         del(converted_index)
     assert not session.execute('System testIf: Date isInHiddenSet: 39').oop == oop_true
 
@@ -537,6 +1470,96 @@ def test_linked_session_remove_unreferenced_gemstone_objects_from_gemstone_set(l
 def test_rpc_session_remove_unreferenced_gemstone_objects_from_gemstone_set(rpc_session, oop_true):
     check_session_remove_unreferenced_gemstone_objects_from_gemstone_set(rpc_session, oop_true)
 
+
+def check_unreferenced_gemstone_objects_are_only_released_at_safe_points(session, oop_true):
+    """Dropping a GemObject merely queues its object for release; the queue is released
+       before later calls once it has waited long enough, and at transaction boundaries.
+    """
+    date = session.resolve_symbol('Date')
+    date_oop = date.oop
+    del(date)
+    assert date_oop in session.deallocated_unfreed_gemstone_objects
+    assert session.execute('System testIf: Date isInHiddenSet: 39').oop == oop_true
+
+    session.abort()
+    assert not session.deallocated_unfreed_gemstone_objects
+    assert not session.execute('System testIf: Date isInHiddenSet: 39').oop == oop_true
+
+    date = session.resolve_symbol('Date')
+    del(date)
+    session.export_set_free_interval = 0
+    assert not session.execute('System testIf: Date isInHiddenSet: 39').oop == oop_true
+
+
+def test_linked_session_unreferenced_gemstone_objects_are_only_released_at_safe_points(linked_session, oop_true):
+    check_unreferenced_gemstone_objects_are_only_released_at_safe_points(linked_session, oop_true)
+
+
+def test_rpc_session_unreferenced_gemstone_objects_are_only_released_at_safe_points(rpc_session, oop_true):
+    check_unreferenced_gemstone_objects_are_only_released_at_safe_points(rpc_session, oop_true)
+
+
+def check_object_scopes(session, oop_true):
+    in_export_set = 'System testIf: self isInHiddenSet: 39'
+    with session.object_scope() as scope:
+        temporary = session.execute("'temporary' copy")
+        kept = scope.keep(session.execute("'kept' copy"))
+        assert session.execute(in_export_set, context=temporary).oop == oop_true
+    assert session.execute(in_export_set, context=kept).oop == oop_true
+    assert not session.execute(in_export_set, context=temporary).oop == oop_true
+
+    with session.object_scope() as outer:
+        with session.object_scope() as inner:
+            kept = inner.keep(session.execute("'kept' copy"))
+        assert session.execute(in_export_set, context=kept).oop == oop_true
+    assert not session.execute(in_export_set, context=kept).oop == oop_true
+
+    date = session.resolve_symbol('Date')
+    with session.object_scope(release_all=True):
+        temporary = session.execute("'temporary' copy")
+    assert session.execute(in_export_set, context=date).oop == oop_true
+    assert not session.execute(in_export_set, context=temporary).oop == oop_true
+
+
+def test_linked_session_object_scopes(linked_session, oop_true):
+    check_object_scopes(linked_session, oop_true)
+
+
+def test_rpc_session_object_scopes(rpc_session, oop_true):
+    check_object_scopes(rpc_session, oop_true)
+
+
+def test_rpc_session_object_scopes_of_threads_are_separate(rpc_session, oop_true):
+    """Scopes opened in different threads sharing a session only release the objects of their own thread."""
+    in_export_set = 'System testIf: self isInHiddenSet: 39'
+    both_created = threading.Barrier(2)
+    first_released = threading.Event()
+    failures = []
+
+    def create_in_nested_scopes(name, before_release, after_release):
+        try:
+            with rpc_session.object_scope():
+                with rpc_session.object_scope() as inner:
+                    temporary = rpc_session.execute("'%s' copy" % name)
+                    kept = inner.keep(rpc_session.execute("'%s kept' copy" % name))
+                    both_created.wait(10)
+                    before_release()
+                    assert rpc_session.execute(in_export_set, context=temporary).oop == oop_true
+                assert rpc_session.execute(in_export_set, context=kept).oop == oop_true
+                assert not rpc_session.execute(in_export_set, context=temporary).oop == oop_true
+            assert not rpc_session.execute(in_export_set, context=kept).oop == oop_true
+            after_release()
+        except Exception as ex:
+            failures.append(ex)
+
+    first = threading.Thread(target=create_in_nested_scopes, args=('first', lambda: None, first_released.set))
+    second = threading.Thread(target=create_in_nested_scopes, args=('second', lambda: first_released.wait(10), lambda: None))
+    for thread in (first, second):
+        thread.start()
+    for thread in (first, second):
+        thread.join()
+    assert not failures
+
     
 def check_raising_of_gemstone_exceptions(session, oop_true):
     rt_err_generic_error = 2318
@@ -562,6 +1585,27 @@ def test_rpc_session_raising_of_gemstone_exceptions(rpc_session, oop_true):
 def test_linked_session_raising_of_gemstone_exceptions(linked_session, oop_true):
     check_raising_of_gemstone_exceptions(linked_session, oop_true)
 
+
+def check_gemstone_errors_keep_their_details(session):
+    """Errors are reported into a buffer that is reused; a GemstoneError keeps its own copy."""
+    try:
+        session.execute("System error: 'first'")
+    except GemstoneError as error:
+        first_error = error
+    first_message = first_error.message
+
+    with expected(GemstoneError, test=r'.*second'):
+        session.execute("System error: 'second'")
+    assert first_error.message == first_message
+
+
+def test_rpc_session_gemstone_errors_keep_their_details(rpc_session):
+    check_gemstone_errors_keep_their_details(rpc_session)
+
+
+def test_linked_session_gemstone_errors_keep_their_details(linked_session):
+    check_gemstone_errors_keep_their_details(linked_session)
+
     
 #--[ special methods ]------------------------------------------------------------
         
@@ -995,6 +2039,37 @@ def test_rpc_session_str_methods(rpc_session):
 def test_linked_session_str_methods(linked_session):
     check_str_methods(linked_session)
 
+
+def check_fused_perform_and_fetch(session):
+    some_bytes = session.execute('#[1 2 3]')
+    assert some_bytes.perform_bytes('reverse') == bytes([3, 2, 1])
+
+    a_string = session.from_py('abc')
+    assert a_string.perform_to_py('reverse') == 'cba'
+    assert a_string.perform_to_py(',', 'dë') == 'abcdë'
+    assert a_string.perform_to_py('copyReplaceAll:with:', 'b', 'xx') == 'axxc'
+
+    with expected(GemstoneError):
+        a_string.perform_to_py('thisMethodDoesNotExist')
+
+    # Selector Symbols are only looked up once
+    assert session.selector_symbol('reverse') is session.selector_symbol('reverse')
+
+    # Results that do not fit in the fused fetch are fetched separately
+    session.fused_fetch_size = 4
+    assert a_string.perform_to_py(',', 'defg') == 'abcdefg'
+    assert a_string.perform_to_py('reverse') == 'cba'
+    assert str(session.resolve_symbol('OrderedCollection')) == 'OrderedCollection'
+    assert session.execute("SessionTemps current at: #ParseltongueLargeResult ifAbsent: [nil]").to_py is None
+
+
+def test_rpc_fused_perform_and_fetch(rpc_session):
+    check_fused_perform_and_fetch(rpc_session)
+
+
+def test_linked_fused_perform_and_fetch(linked_session):
+    check_fused_perform_and_fetch(linked_session)
+
     
 def check_mapping_method_names(session):
     user_globals = session.resolve_symbol('UserGlobals')
@@ -1188,3 +2263,76 @@ def test_rpc_hard_break_while_idle_is_harmless(rpc_session):
 def test_linked_hard_break_while_idle_is_harmless(linked_session):
     check_hard_break_while_idle_is_harmless(linked_session)
 
+
+def check_deadline_breaks_off_long_running_calls(session):
+    """A call made inside a deadline that is still running when the deadline passes is
+       broken off with a GemstoneTimeout, and the session can be used afterwards."""
+    with expected(GemstoneTimeout, test=lambda e: e.seconds == 0.5):
+        with session.deadline(0.5):
+            session.execute('[true] whileTrue: [nil]')
+    assert session.execute('3 + 4').to_py == 7
+
+    # Calls that finish in time are not affected
+    with session.deadline(5):
+        assert session.execute('3 + 4').to_py == 7
+
+    # Other errors are not turned into timeouts
+    with expected(GemstoneError, test=lambda e: not isinstance(e, GemstoneTimeout)):
+        with session.deadline(5):
+            session.execute('1/0')
+
+def test_rpc_deadline_breaks_off_long_running_calls(rpc_session):
+    check_deadline_breaks_off_long_running_calls(rpc_session)
+
+def test_linked_deadline_breaks_off_long_running_calls(linked_session):
+    check_deadline_breaks_off_long_running_calls(linked_session)
+
+
+def check_deadline_escalates_to_hard_break(session):
+    """If a call ignores the soft break sent at its deadline, a hard break is sent after the grace period."""
+    with expected(GemstoneTimeout):
+        with session.deadline(0.5, grace=0.5):
+            session.execute('[[true] whileTrue: [nil]] on: SoftBreak do: [:ex | ex retry]')
+    assert session.execute('3 + 4').to_py == 7
+
+def test_rpc_deadline_escalates_to_hard_break(rpc_session):
+    check_deadline_escalates_to_hard_break(rpc_session)
+
+def test_linked_deadline_escalates_to_hard_break(linked_session):
+    check_deadline_escalates_to_hard_break(linked_session)
+
+
+def check_deadline_sends_no_break_after_the_block_ends(session):
+    """A deadline that passes just as its block ends does not break off calls made after the block."""
+    for i in range(20):
+        try:
+            with session.deadline(0.01, grace=0.01):
+                session.execute('(Delay forMilliseconds: 10) wait')
+        except GemstoneTimeout:
+            pass
+        assert session.execute('(Delay forMilliseconds: 30) wait. 3 + 4').to_py == 7
+
+def test_rpc_deadline_sends_no_break_after_the_block_ends(rpc_session):
+    check_deadline_sends_no_break_after_the_block_ends(rpc_session)
+
+def test_linked_deadline_sends_no_break_after_the_block_ends(linked_session):
+    check_deadline_sends_no_break_after_the_block_ends(linked_session)
+
+
+def check_timeout_on_execute_and_perform(session):
+    """execute and perform can be given a timeout, which sets a deadline for just that call."""
+    with expected(GemstoneTimeout):
+        session.execute('[true] whileTrue: [nil]', timeout=0.5)
+    assert session.execute('3 + 4', timeout=5).to_py == 7
+
+    block = session.execute('[[true] whileTrue: [nil]]')
+    with expected(GemstoneTimeout):
+        block.perform('value', timeout=0.5)
+    assert session.from_py(3).perform('+', 4, timeout=5).to_py == 7
+
+def test_rpc_timeout_on_execute_and_perform(rpc_session):
+    check_timeout_on_execute_and_perform(rpc_session)
+
+def test_linked_timeout_on_execute_and_perform(linked_session):
+    check_timeout_on_execute_and_perform(linked_session)
+